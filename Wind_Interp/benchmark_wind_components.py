@@ -0,0 +1,60 @@
+"""
+Benchmark wind-component conversion on a year of synthetic 1-minute station observations.
+Compares the original per-row iterrows/MetPy loop (timed on a subset and extrapolated, since the
+full year takes many minutes) with the batch MetPy and pure-NumPy paths of wind_components_array.
+Usage: python benchmark_wind_components.py [--rows N] [--loop-rows N]
+"""
+
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from interp_obs_wind_to_era5_grid import calculate_wind_components, wind_components_array
+
+def make_observations(n_rows, seed=0):
+    """Synthetic 1-minute speed/direction record starting 2012-01-01."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range('2012-01-01', periods=n_rows, freq='1min')
+    return pd.DataFrame({'speed': rng.uniform(0, 30, n_rows),
+                         'direction': rng.uniform(0, 360, n_rows)}, index=index)
+
+def per_row_loop(wind_df):
+    """The original process_wind_observations loop."""
+    u_series, v_series = [], []
+    for idx, row in wind_df.iterrows():
+        u, v = calculate_wind_components(row['speed'], row['direction'])
+        u_series.append(u)
+        v_series.append(v)
+    return np.array(u_series), np.array(v_series)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark wind component conversion")
+    parser.add_argument('--rows', type=int, default=366 * 24 * 60, help="observations (default: 1 year at 1 min)")
+    parser.add_argument('--loop-rows', type=int, default=5000, help="rows timed for the per-row loop")
+    args = parser.parse_args()
+
+    wind_df = make_observations(args.rows)
+    speed = wind_df['speed'].to_numpy()
+    direction = wind_df['direction'].to_numpy()
+
+    subset = wind_df.iloc[:args.loop_rows]
+    t0 = time.perf_counter()
+    u_loop, v_loop = per_row_loop(subset)
+    t_loop = (time.perf_counter() - t0) * len(wind_df) / len(subset)
+
+    t0 = time.perf_counter()
+    u_metpy, v_metpy = wind_components_array(speed, direction, use_metpy=True)
+    t_metpy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    u_np, v_np = wind_components_array(speed, direction)
+    t_np = time.perf_counter() - t0
+
+    n = len(subset)
+    assert np.allclose(u_loop, u_np[:n]) and np.allclose(v_loop, v_np[:n])
+    assert np.allclose(u_metpy, u_np) and np.allclose(v_metpy, v_np)
+
+    print(f"{len(wind_df)} observations")
+    print(f"per-row MetPy loop : {t_loop:10.3f} s (extrapolated from {n} rows)")
+    print(f"batch MetPy        : {t_metpy:10.3f} s ({t_loop / t_metpy:,.0f}x)")
+    print(f"batch NumPy        : {t_np:10.3f} s ({t_loop / t_np:,.0f}x)")
@@ -0,0 +1,209 @@
+"""
+Chunked, compressed NetCDF or Zarr output for the Wind_Interp forcing fields.
+Chunk shapes are chosen for the expected access pattern: whole-grid time slices (plotting,
+CDEPS/sflux staging), long time series at a few points (validation), or a balance of both.
+Zarr stores are written chunk by chunk in parallel by dask.
+Existing outputs can be extended along time (append_output) for real-time cycles.
+"""
+
+import os
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from sflux_writer import time_index
+
+# Target uncompressed chunk size in bytes
+TARGET_CHUNK_BYTES = 1 << 20
+
+# Timesteps per chunk for the balanced layout
+BALANCED_CHUNK_TIME = 24
+
+CHUNKINGS = ['none', 'time', 'point', 'balanced']
+COMPRESSIONS = ['none', 'zlib', 'zstd']
+
+def chunk_shape(shape, chunking, itemsize=4, target_bytes=TARGET_CHUNK_BYTES):
+    """
+    Chunk shape for a (time, latitude, longitude) variable.
+
+    time: one whole grid per chunk, so reading a time slice touches one chunk
+    point: all (or as many as fit) timesteps of a small spatial tile, so a point series is one read
+    balanced: BALANCED_CHUNK_TIME timesteps of the whole grid
+    none: None (contiguous)
+    """
+    ntime, nlat, nlon = shape
+    if chunking == 'none':
+        return None
+    if chunking == 'time':
+        return (1, nlat, nlon)
+    if chunking == 'balanced':
+        return (min(BALANCED_CHUNK_TIME, ntime), nlat, nlon)
+    if chunking == 'point':
+        nt = max(1, min(ntime, target_bytes // itemsize))
+        tile = max(1, int(np.sqrt(target_bytes / (itemsize * nt))))
+        return (nt, min(tile, nlat), min(tile, nlon))
+    raise ValueError(f"Unknown chunking {chunking!r} (expected one of {CHUNKINGS})")
+
+def netcdf_encoding(ds, encoding, chunking='none', compression='none', complevel=4):
+    """
+    Add chunk sizes and compression to a to_netcdf encoding for every 3-D field.
+
+    :param encoding: Base encoding (dtype, _FillValue) that is extended and returned
+    """
+    encoding = {name: dict(value) for name, value in encoding.items()}
+    for name, var in ds.data_vars.items():
+        if var.ndim != 3:
+            continue
+        enc = encoding.setdefault(name, {})
+        itemsize = np.dtype(enc.get('dtype', var.dtype)).itemsize
+        chunks = chunk_shape(var.shape, chunking, itemsize)
+        if chunks is not None:
+            enc['chunksizes'] = chunks
+        if compression != 'none':
+            enc['compression'] = compression
+            enc['complevel'] = complevel
+            enc['shuffle'] = True
+    return encoding
+
+def zarr_encoding(ds, encoding, chunking='balanced', compression='zstd', complevel=4):
+    """Equivalent encoding for to_zarr (zarr v3 codecs, or numcodecs for zarr v2)."""
+    encoding = {name: dict(value) for name, value in encoding.items()}
+    try:
+        from zarr.codecs import ZstdCodec as Zstd, GzipCodec as Zlib
+        key = 'compressors'
+    except ImportError:
+        from numcodecs import Zstd, Zlib
+        key = 'compressor'
+    # 'none' disables compression rather than falling back to the zarr default
+    compressor = {'zstd': Zstd, 'zlib': Zlib}[compression](level=complevel) if compression != 'none' else None
+    for name, var in ds.data_vars.items():
+        if var.ndim != 3:
+            continue
+        enc = encoding.setdefault(name, {})
+        itemsize = np.dtype(enc.get('dtype', var.dtype)).itemsize
+        chunks = chunk_shape(var.shape, 'balanced' if chunking == 'none' else chunking, itemsize)
+        enc['chunks'] = chunks
+        enc[key] = [compressor] if key == 'compressors' and compressor is not None else compressor
+    return encoding
+
+def _native_integers(ds):
+    """
+    zarr v3 matches dtypes by class: numpy's longlong (how the time axis comes out of
+    pandas on some platforms) is int64 but has no Zarr data type, so normalize integers.
+    """
+    return ds.assign({name: var.astype(var.dtype.str) for name, var in ds.variables.items()
+                      if var.dtype.kind in 'iu'})
+
+def write_output(ds, path, encoding, fmt='netcdf', chunking='none', compression='none', complevel=4, workers=None,
+                 unlimited=False):
+    """
+    Write ds as NetCDF or as a Zarr store (computed in parallel by dask).
+
+    :param encoding: Base encoding (dtype, _FillValue) of the variables
+    :param workers: dask worker threads for Zarr output (None: dask default)
+    :param unlimited: Make time an unlimited NetCDF dimension so append_output can extend the file
+    """
+    try:
+        if fmt == 'zarr':
+            import dask
+            ds = _native_integers(ds)
+            encoding = zarr_encoding(ds, encoding, chunking, compression, complevel)
+            # dask chunks must line up with the Zarr chunks so each task writes whole chunks
+            chunks = {}
+            for name, enc in encoding.items():
+                if 'chunks' in enc and name in ds:
+                    chunks.update(dict(zip(ds[name].dims, enc['chunks'])))
+            with dask.config.set(num_workers=workers) if workers else dask.config.set({}):
+                ds.chunk(chunks).to_zarr(path, mode='w', encoding=encoding)
+        else:
+            if unlimited and chunking == 'none':
+                # Unlimited dimensions cannot be contiguous; one grid per chunk suits appending
+                chunking = 'time'
+            ds.to_netcdf(path, encoding=netcdf_encoding(ds, encoding, chunking, compression, complevel),
+                         unlimited_dims=['time'] if unlimited else None)
+    except Exception as e:
+        raise Exception(f"Error writing {path}: {str(e)}")
+
+def output_last_time(path, fmt='netcdf'):
+    """Last time in an existing output as a Timestamp (None if the output does not exist or is empty)."""
+    if not os.path.exists(path):
+        return None
+    if fmt == 'zarr':
+        import xarray as xr
+        times = xr.open_zarr(path, consolidated=False)['time'].values
+        return pd.Timestamp(times[-1]) if len(times) else None
+    from netCDF4 import Dataset, num2date
+    with Dataset(path, 'r') as nc:
+        time = nc.variables['time']
+        if not len(time):
+            return None
+        last = num2date(time[-1], time.units, getattr(time, 'calendar', 'standard'),
+                        only_use_cftime_datetimes=False, only_use_python_datetimes=True)
+        return pd.Timestamp(last)
+
+def _history(previous, ds):
+    """History attribute extended with a line recording the appended records."""
+    times = time_index(ds)
+    line = (f"{datetime.now():%Y-%m-%d %H:%M:%S}: appended {len(times)} records "
+            f"({times[0]} .. {times[-1]}) by interp_obs_wind_to_era5_grid.py")
+    return f"{previous}\n{line}" if previous else line
+
+def append_output(ds, path, fmt='netcdf', workers=None):
+    """
+    Extend an existing output in place along time with the records of ds (which must all be
+    later than the output's last time, on the same grid).
+    NetCDF outputs need an unlimited time dimension (write_output(..., unlimited=True)).
+
+    :return: Number of records appended
+    """
+    try:
+        ntimes = ds.sizes['time']
+        if not ntimes:
+            return 0
+        if fmt == 'zarr':
+            import dask
+            import zarr
+            group = zarr.open_group(path, mode='r')
+            history = group.attrs.get('history')
+            ds = _native_integers(ds)
+            # The first dask chunk fills the partly written last Zarr chunk, so no two tasks
+            # write to the same chunk
+            for name, var in ds.data_vars.items():
+                if 'time' in var.dims and name in group:
+                    size = group[name].chunks[var.dims.index('time')]
+                    first = min(size - group[name].shape[var.dims.index('time')] % size, ntimes)
+                    rest = ntimes - first
+                    chunks = [first] + [size] * (rest // size) + ([rest % size] if rest % size else [])
+                    ds = ds.chunk({'time': tuple(chunks)})
+                    break
+            with dask.config.set(num_workers=workers) if workers else dask.config.set({}):
+                ds.to_zarr(path, mode='a', append_dim='time')
+            zarr.open_group(path, mode='r+').attrs['history'] = _history(history, ds)
+            return ntimes
+
+        from netCDF4 import Dataset, date2num
+        with Dataset(path, 'a') as nc:
+            if not nc.dimensions['time'].isunlimited():
+                raise ValueError(f"time is not an unlimited dimension in {path}; "
+                                 f"recreate it in append mode to extend it later")
+            for coord in ('latitude', 'longitude'):
+                if not np.allclose(nc.variables[coord][:], ds[coord].values):
+                    raise ValueError(f"{coord} of {path} does not match the new records")
+            time = nc.variables['time']
+            start = len(time)
+            times = time_index(ds)
+            time[start:start + ntimes] = date2num(times.to_pydatetime(), time.units,
+                                                  getattr(time, 'calendar', 'standard'))
+            for name, var in ds.data_vars.items():
+                if 'time' not in var.dims or name not in nc.variables:
+                    continue
+                out = nc.variables[name]
+                values = var.transpose(*out.dimensions).values
+                fill = getattr(out, '_FillValue', None)
+                if fill is not None:
+                    # xarray writes NaN as _FillValue; netCDF4 would store NaN as is
+                    values = np.where(np.isnan(values), fill, values)
+                out[start:start + ntimes] = values
+            nc.history = _history(getattr(nc, 'history', None), ds)
+        return ntimes
+    except Exception as e:
+        raise Exception(f"Error appending to {path}: {str(e)}")
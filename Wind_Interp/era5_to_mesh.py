@@ -0,0 +1,154 @@
+"""
+Interpolate ERA5 (or obs-blended ERA5) wind and pressure from the lat/lon grid to the SCHISM
+mesh nodes of hgrid.ll.
+Bilinear grid-to-node weights are built once and cached on disk keyed by the hashes of both
+grids (boundary_forcing.load_or_build_weights), then applied to blocks of timesteps as one
+sparse matrix product per block, writing each block straight to the output file.
+"""
+
+import os
+import sys
+import argparse
+import numpy as np
+import xarray as xr
+from netCDF4 import Dataset
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'diagnostic_scripts'))
+from repo_modules import repo_module
+boundary_forcing = repo_module('boundary_forcing')
+hgrid_reader = repo_module('hgrid_reader')
+
+# Timesteps interpolated and written per block
+DEFAULT_CHUNK_TIME = 48
+
+def time_dimension(ds):
+    """Name of the time dimension ('time' after renaming, 'valid_time' in raw ERA5 files)."""
+    for name in ('time', 'valid_time'):
+        if name in ds.dims:
+            return name
+    raise ValueError(f"No time or valid_time dimension in {list(ds.dims)}")
+
+def check_extent(node_lon, node_lat, grid_lon, grid_lat):
+    """
+    Raise ValueError if mesh nodes fall outside the grid, where bilinear_weights would
+    silently repeat the edge values (e.g. a 0..360 longitude grid for a -180..180 mesh).
+    """
+    for name, nodes, axis in (('longitude', node_lon, grid_lon), ('latitude', node_lat, grid_lat)):
+        lo, hi = np.min(axis), np.max(axis)
+        outside = np.count_nonzero((nodes < lo) | (nodes > hi))
+        if outside:
+            raise ValueError(f"{outside} mesh nodes have {name} outside the grid ({np.min(nodes):g} .. "
+                             f"{np.max(nodes):g} vs {lo:g} .. {hi:g}); check the grid covers the mesh "
+                             f"and uses the same longitude convention")
+
+def mesh_weights(node_lon, node_lat, ds, cache_dir=None):
+    """
+    Bilinear weights (nnodes, nlat * nlon) from the dataset grid to the mesh nodes, cached by grid hashes.
+    """
+    check_extent(node_lon, node_lat, ds['longitude'].values, ds['latitude'].values)
+    return boundary_forcing.load_or_build_weights(node_lon, node_lat, ds['longitude'].values, ds['latitude'].values,
+                                 gridded=True, cache_dir=cache_dir)
+
+def iter_mesh_blocks(ds, weights, variables, chunk_time=DEFAULT_CHUNK_TIME):
+    """
+    Yield (t0, t1, {var: (t1 - t0, nnodes) array}) for consecutive blocks of timesteps.
+    Only one block of the gridded fields is loaded at a time (lazily for dask-backed datasets).
+    """
+    time = time_dimension(ds)
+    ntimes = ds.sizes[time]
+    for t0 in range(0, ntimes, chunk_time):
+        t1 = min(t0 + chunk_time, ntimes)
+        block = ds[variables].isel({time: slice(t0, t1)})
+        fields = {}
+        for var in variables:
+            values = block[var].transpose(time, 'latitude', 'longitude').values
+            fields[var] = boundary_forcing.apply_weights(weights, values.reshape(t1 - t0, -1))
+        yield t0, t1, fields
+
+def interpolate_to_mesh(ds, node_lon, node_lat, variables=('u10', 'v10', 'msl'), chunk_time=DEFAULT_CHUNK_TIME,
+                        cache_dir=None):
+    """
+    Interpolate gridded fields to mesh nodes in memory.
+
+    :return: xarray Dataset with (time, node) variables
+    """
+    try:
+        variables = [v for v in variables if v in ds]
+        weights = mesh_weights(node_lon, node_lat, ds, cache_dir)
+        time = time_dimension(ds)
+        out = {var: np.empty((ds.sizes[time], len(node_lon)), dtype='f4') for var in variables}
+        for t0, t1, fields in iter_mesh_blocks(ds, weights, variables, chunk_time):
+            for var in variables:
+                out[var][t0:t1] = fields[var]
+        return xr.Dataset({var: ((time, 'node'), out[var], ds[var].attrs) for var in variables},
+                          coords={time: ds[time], 'lon': ('node', node_lon), 'lat': ('node', node_lat)})
+    except Exception as e:
+        raise Exception(f"Error interpolating to mesh nodes: {str(e)}")
+
+def write_mesh_forcing(output, ds, node_lon, node_lat, variables=('u10', 'v10', 'msl'),
+                       chunk_time=DEFAULT_CHUNK_TIME, cache_dir=None, wind_speed=True):
+    """
+    Interpolate block by block and write a node-level NetCDF (memory bounded by one block).
+
+    :param wind_speed: Also write the node wind speed sqrt(u10^2 + v10^2)
+    :return: Number of timesteps written
+    """
+    try:
+        variables = [v for v in variables if v in ds]
+        weights = mesh_weights(node_lon, node_lat, ds, cache_dir)
+        time = time_dimension(ds)
+        with Dataset(output, 'w', format='NETCDF4') as nc:
+            nc.createDimension('time', None)
+            nc.createDimension('nSCHISM_hgrid_node', len(node_lon))
+            times = ds[time].values
+            if times.dtype.kind == 'M':
+                # Decoded times are written back as seconds since 1970, like interp_obs_wind_to_era5_grid.py
+                times = (times - np.datetime64('1970-01-01')) // np.timedelta64(1, 's')
+            tvar = nc.createVariable('time', 'i8', ('time',))
+            tvar.setncatts({k: v for k, v in ds[time].attrs.items() if not k.startswith('_')})
+            if ds[time].dtype.kind == 'M':
+                tvar.units = 'seconds since 1970-01-01 00:00:00'
+            nc.createVariable('SCHISM_hgrid_node_x', 'f8', ('nSCHISM_hgrid_node',))[:] = node_lon
+            nc.createVariable('SCHISM_hgrid_node_y', 'f8', ('nSCHISM_hgrid_node',))[:] = node_lat
+            names = variables + (['wind_speed'] if wind_speed and {'u10', 'v10'} <= set(variables) else [])
+            for var in names:
+                out = nc.createVariable(var, 'f4', ('time', 'nSCHISM_hgrid_node'), zlib=True,
+                                        chunksizes=(1, len(node_lon)), fill_value=np.float32(-9999.0))
+                if var in ds:
+                    out.setncatts({k: v for k, v in ds[var].attrs.items() if not k.startswith('_')})
+                else:
+                    out.units = 'm s**-1'
+                    out.long_name = '10 metre wind speed'
+
+            for t0, t1, fields in iter_mesh_blocks(ds, weights, variables, chunk_time):
+                tvar[t0:t1] = times[t0:t1]
+                for var in variables:
+                    nc.variables[var][t0:t1] = fields[var]
+                if 'wind_speed' in names:
+                    nc.variables['wind_speed'][t0:t1] = np.hypot(fields['u10'], fields['v10'])
+            nc.history = "Created by era5_to_mesh.py"
+        return len(times)
+    except Exception as e:
+        raise Exception(f"Error writing mesh forcing: {str(e)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interpolate ERA5 wind/pressure to SCHISM mesh nodes")
+    parser.add_argument('--input', default='era5_data_30min_obs_wind_rot_fix_filled2.nc',
+                        help="gridded wind/pressure file (output of interp_obs_wind_to_era5_grid.py or ERA5)")
+    parser.add_argument('--hgrid', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..',
+                                                        'fixed_files', 'hgrid.ll'),
+                        help="hgrid.ll with node longitudes/latitudes")
+    parser.add_argument('--output', default='era5_on_mesh.nc', help="node-level output file")
+    parser.add_argument('--chunk-time', type=int, default=DEFAULT_CHUNK_TIME, help="timesteps per block")
+    parser.add_argument('--weights-cache', default='weights', help="directory for cached grid-to-node weights")
+    args = parser.parse_args()
+
+    try:
+        grid = hgrid_reader.read_hgrid(args.hgrid)
+        # An explicit engine skips xarray's backend discovery (which imports every installed plugin)
+        ds = xr.open_dataset(args.input, engine='netcdf4', chunks={})
+        ntimes = write_mesh_forcing(args.output, ds, grid.coords[:, 0], grid.coords[:, 1],
+                                    chunk_time=args.chunk_time, cache_dir=args.weights_cache)
+        print(f"Wrote {ntimes} timesteps on {len(grid.coords)} nodes to {args.output}")
+    except Exception as e:
+        print(f"Error in main execution: {str(e)}")
@@ -1,31 +1,43 @@
+import sys
+import argparse
 import xarray as xr
 import pandas as pd
 import numpy as np
 from metpy.units import units
 from metpy.calc import wind_components
+from sflux_writer import ascending_latitude, write_sflux_air
+from chunked_output import CHUNKINGS, COMPRESSIONS, write_output, output_last_time, append_output
+from wind_qc import (load_observations, qc_flags, gap_mask, FLAG_RANGE, FLAG_SPIKE, FLAG_RATE, FLAG_STUCK,
+                     SPIKE_SPEED, MAX_RATE, STUCK_COUNT)
 
-def read_wind_data(filename):
+# Time steps per dask chunk when observed winds are expanded lazily to the ERA5 grid
+LAZY_CHUNK_TIME = 48
+
+def read_wind_data(filename, qc=None, cache_dir=None):
     """
     Read wind data from file with improved error handling and validation.
+    Observations with NaN or out-of-range speed/direction are always dropped.
+
+    :param qc: dict of wind_qc.qc_flags thresholds (spike, max_rate, stuck_count) to also drop
+               observations failing the spike, rate-of-change and stuck-sensor checks
+    :param cache_dir: Directory for the Parquet cache of the parsed file (None parses the text)
     """
     try:
-        df = pd.read_csv(filename, sep='\s+', names=['date', 'time', 'speed', 'direction'])
-        
-        # Convert to numeric, replacing invalid values with NaN
-        df['speed'] = pd.to_numeric(df['speed'], errors='coerce')
-        df['direction'] = pd.to_numeric(df['direction'], errors='coerce')
-        
-        # Drop any rows with NaN values
-        df = df.dropna()
-        
-        # Validate ranges
-        df = df[(df['speed'] >= 0) & (df['speed'] < 100) &  # reasonable wind speed range
-                (df['direction'] >= 0) & (df['direction'] <= 360)]  # valid direction range
-        
-        # Create datetime index
-        df['datetime'] = pd.to_datetime(df['date'] + ' ' + df['time'])
-        df = df.set_index('datetime')
-        
+        df = load_observations(filename, cache_dir)
+        df = df[df.index.notna()]
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind='stable')
+
+        if qc is None:
+            flags = qc_flags(df, spike=None, max_rate=None, stuck_count=None)
+        else:
+            flags = qc_flags(df, **qc)
+            counts = {name: int(np.count_nonzero(flags & bit)) for name, bit in
+                      (('range', FLAG_RANGE), ('spike', FLAG_SPIKE), ('rate', FLAG_RATE), ('stuck', FLAG_STUCK))}
+            print(f"QC {filename}: {len(df)} observations, flagged " +
+                  ", ".join(f"{count} {name}" for name, count in counts.items()))
+        df = df[flags == 0]
+
         if df.empty:
             raise ValueError("No valid wind data after filtering")
             
@@ -46,30 +58,141 @@ def calculate_wind_components(speed, direction):
     except Exception as e:
         raise Exception(f"Error calculating wind components: {str(e)}")
 
-def process_wind_observations(wind_df):
+def wind_components_array(speed, direction, use_metpy=False):
+    """
+    Calculate U and V components for whole speed/direction arrays at once.
+    The default pure-NumPy path uses the same meteorological convention as MetPy
+    (direction the wind blows from, degrees clockwise from north) without building pint Quantities.
+    """
+    speed = np.clip(np.asarray(speed, dtype='f8'), 0, 100)  # clip to reasonable range
+    direction = np.clip(np.asarray(direction, dtype='f8'), 0, 360)
+    if use_metpy:
+        u, v = wind_components(speed * units('m/s'), direction * units('degrees'))
+        return np.asarray(u.magnitude), np.asarray(v.magnitude)
+    rad = np.deg2rad(direction)
+    return -speed * np.sin(rad), -speed * np.cos(rad)
+
+def process_wind_observations(wind_df, use_metpy=False):
     """
     Process wind observations to create time series of U and V components
     """
-    u_series = []
-    v_series = []
-    
-    for idx, row in wind_df.iterrows():
-        u, v = calculate_wind_components(row['speed'], row['direction'])
-        u_series.append(u)
-        v_series.append(v)
+    try:
+        u, v = wind_components_array(wind_df['speed'].to_numpy(), wind_df['direction'].to_numpy(),
+                                     use_metpy=use_metpy)
+    except Exception as e:
+        raise Exception(f"Error calculating wind components: {str(e)}")
     
-    wind_df['u10'] = u_series
-    wind_df['v10'] = v_series
+    wind_df['u10'] = u
+    wind_df['v10'] = v
     
     return wind_df
 
-def interpolate_era5_with_obs_wind(ds, wind_df, n_timesteps=None):
+def broadcast_series_to_grid(series, grid_shape, lazy=False, chunk_time=LAZY_CHUNK_TIME):
+    """
+    Expand a 1-D time series to (time,) + grid_shape with the same value in every cell.
+    With lazy=True the result is a dask array built from broadcast views, so nothing
+    grid-sized is allocated until a chunk is written.
     """
-    Interpolate ERA5 data to 30-minute intervals with fixed MSL interpolation
+    values = np.asarray(series, dtype='f8')
+    shape = (len(values),) + tuple(grid_shape)
+    if lazy:
+        import dask.array as da
+        column = da.from_array(values, chunks=chunk_time)[:, None, None]
+        return da.broadcast_to(column, shape, chunks=(chunk_time,) + tuple(grid_shape))
+    return np.broadcast_to(values[:, None, None], shape).copy()
+
+def time_interp_weights(src_seconds, new_seconds):
+    """
+    Left source index and linear weight for every target time. Works for irregular
+    source axes; targets outside the source record are clamped to its ends.
+    """
+    src_seconds = np.asarray(src_seconds, dtype='f8')
+    new_seconds = np.asarray(new_seconds, dtype='f8')
+    if len(src_seconds) < 2:
+        return np.zeros(len(new_seconds), dtype=int), np.zeros(len(new_seconds))
+    i0 = np.clip(np.searchsorted(src_seconds, new_seconds, side='right') - 1, 0, len(src_seconds) - 2)
+    w = (new_seconds - src_seconds[i0]) / (src_seconds[i0 + 1] - src_seconds[i0])
+    return i0, np.clip(w, 0, 1)
+
+def _cubic_resample(data, src_seconds, new_seconds):
+    """
+    Cubic spline along axis 0; dask arrays are processed block by block over space.
+    The spline needs the whole time axis in each block, so the spatial axes are split instead
+    (dask's configured chunk size bounds every block).
+    """
+    from scipy.interpolate import CubicSpline
+
+    def spline(block):
+        return CubicSpline(src_seconds, block, axis=0)(new_seconds).astype(block.dtype)
+
+    if hasattr(data, 'map_blocks'):
+        data = data.rechunk({0: -1, **{axis: 'auto' for axis in range(1, data.ndim)}})
+        return data.map_blocks(spline, chunks=((len(new_seconds),),) + data.chunks[1:], dtype=data.dtype)
+    return spline(np.asarray(data))
+
+def resample_time(ds, variables, src_seconds, new_seconds, method='linear', time_dim='valid_time'):
+    """
+    Resample variables of ds from src_seconds to new_seconds (any cadence, including
+    irregular source or target axes) in one vectorized pass per variable. Numpy and dask
+    backed variables are both supported; non-float variables use the nearest record.
+    Returns a dict of name -> DataArray on the new time axis.
+    """
+    if method not in ('linear', 'cubic'):
+        raise ValueError(f"Unknown time interpolation method: {method}")
+    src_seconds = np.asarray(src_seconds, dtype='f8')
+    new_seconds = np.asarray(new_seconds, dtype='f8')
+    i0, w = time_interp_weights(src_seconds, new_seconds)
+    i1 = np.minimum(i0 + 1, len(src_seconds) - 1)
+
+    resampled = {}
+    for var in variables:
+        arr = ds[var].transpose(time_dim, ...)
+        data = arr.data
+        if not np.issubdtype(arr.dtype, np.floating):
+            new = data[np.where(w < 0.5, i0, i1)]
+        elif method == 'cubic' and len(src_seconds) > 3:
+            new = _cubic_resample(data, src_seconds, new_seconds)
+        else:
+            wb = w.reshape((-1,) + (1,) * (data.ndim - 1)).astype(arr.dtype)
+            new = data[i0] * (1 - wb) + data[i1] * wb
+        resampled[var] = xr.DataArray(new, dims=arr.dims, attrs=arr.attrs)
+    return resampled
+
+def obs_on_time_axis(wind_df, time_new, max_gap=None):
+    """
+    Interpolate observed wind components in time onto time_new, using every observation
+    (including ones that do not fall exactly on a target time).
+    With max_gap, target times in observation gaps longer than max_gap (or outside the
+    observed record) are NaN instead of being interpolated across the gap.
+    """
+    wind_df = process_wind_observations(wind_df)
+    obs = wind_df[['u10', 'v10']]
+    obs = obs[~obs.index.duplicated()].sort_index()
+    result = obs.reindex(obs.index.union(time_new)).interpolate(method='time').reindex(time_new)
+    if max_gap is not None:
+        result[gap_mask(obs.index, time_new, max_gap)] = np.nan
+    return result
+
+def interpolate_era5_with_obs_wind(ds, wind_df, n_timesteps=None, lazy=False, freq='30min', method='linear',
+                                   stations=None, blend_radius_km=None, idw_k=4, idw_power=2.0,
+                                   weights_cache=None, start=None, qc=None, obs_cache=None, max_gap=None):
+    """
+    Interpolate ERA5 data to `freq` intervals (any pandas frequency, e.g. '30min' or '10min')
+    using linear or cubic time interpolation for every time-dependent ERA5 variable.
+    With lazy=True the observed u10/v10 stay a 1-D time series and are expanded to the
+    lat/lon grid chunk by chunk when the dataset is written.
+    With stations (a station_blending.read_station_list table), u10/v10 are blended from all
+    listed stations by inverse distance instead of broadcasting wind_df, and relax to the ERA5
+    background beyond blend_radius_km.
+    With start (the last time of an existing output), only later times are produced, from the
+    ERA5 records and observations that bracket them; returns None if there are none.
+    qc and obs_cache are passed to read_wind_data for the station files. With max_gap, times in
+    observation gaps longer than max_gap use the ERA5 u10/v10 instead of bridging the gap (with
+    stations, in the cells where every contributing station is in a gap).
     """
     try:
         # Validate inputs
-        if ds is None or wind_df is None or wind_df.empty:
+        if ds is None or (stations is None and (wind_df is None or wind_df.empty)):
             raise ValueError("Invalid input data")
 
         # Set n_timesteps if not provided
@@ -81,23 +204,35 @@ def interpolate_era5_with_obs_wind(ds, wind_df, n_timesteps=None):
         # Limit to specified number of timesteps
         ds = ds.isel(valid_time=slice(0, n_timesteps))
 
-        # Create new time array with 30-min intervals
+        # Create new time array with `freq` intervals
         time_orig = pd.to_datetime(ds.valid_time.values, unit='s')
-        time_new = pd.date_range(start=time_orig[0], end=time_orig[-1], freq='30min')
-
-        # Process wind observations
-        wind_df = process_wind_observations(wind_df)
-        
-        # Ensure wind observations cover the required time period
-        wind_df = wind_df.reindex(pd.date_range(start=time_orig[0],
-                                               end=time_orig[-1],
-                                               freq='30min'))
-        
-        # Interpolate wind components
-        wind_df = wind_df.interpolate(method='linear')
+        time_new = pd.date_range(start=time_orig[0], end=time_orig[-1], freq=freq)
+
+        # Append mode: keep the full-record time grid but only the new times, and trim the
+        # inputs to what those times need
+        if start is not None:
+            time_new = time_new[time_new > start]
+            if len(time_new) == 0:
+                return None
+            i0 = max(int(np.searchsorted(time_orig, time_new[0], side='right')) - 1, 0)
+            ds = ds.isel(valid_time=slice(i0, None))
+            time_orig = time_orig[i0:]
+            if wind_df is not None:
+                before = wind_df.index[wind_df.index <= time_new[0]]
+                if len(before):
+                    wind_df = wind_df[wind_df.index >= before.max()].copy()
+            print(f"Appending {len(time_new)} timesteps after {start}")
+
+        # Process wind observations and interpolate them onto the new time axis
+        if stations is None:
+            wind_df = obs_on_time_axis(wind_df, time_new, max_gap)
+        else:
+            station_obs = [obs_on_time_axis(read_wind_data(path, qc, obs_cache), time_new, max_gap)
+                           for path in stations['path']]
 
         # Convert times to unix timestamp for xarray
         time_new_unix = (time_new - pd.Timestamp("1970-01-01")) // pd.Timedelta("1s")
+        time_orig_unix = (time_orig - pd.Timestamp("1970-01-01")) / pd.Timedelta("1s")
 
         # Initialize new dataset
         ds_new = xr.Dataset(
@@ -108,39 +243,62 @@ def interpolate_era5_with_obs_wind(ds, wind_df, n_timesteps=None):
             }
         )
 
-        # Interpolate MSL using manual interpolation
-        print("Interpolating msl...")
-        msl_data = ds['msl'].values
-        new_msl = np.zeros((len(time_new),) + msl_data.shape[1:])
-
-        # Manual interpolation for MSL
-        for i in range(len(msl_data)-1):
-            idx = i * 2
-            new_msl[idx] = msl_data[i]
-            if idx + 1 < len(time_new):
-                new_msl[idx + 1] = (msl_data[i] + msl_data[i + 1]) / 2
-        if len(time_new) > 0:
-            new_msl[-1] = msl_data[-1]
-
-        # Add MSL to new dataset with proper dimensions
-        ds_new['msl'] = (('valid_time', 'latitude', 'longitude'), new_msl)
-        ds_new['msl'].attrs = ds['msl'].attrs
-
-        # Create wind component arrays
-        u_data = np.zeros((len(time_new),) + ds['u10'].shape[1:])
-        v_data = np.zeros((len(time_new),) + ds['v10'].shape[1:])
-
-        print(f"Creating new file with {len(time_new)} 30-minute timesteps")
-        print(f"Available wind data has {len(wind_df)} entries")
-
-        # Fill wind component arrays with interpolated observations
-        for t in range(len(time_new)):
-            u_data[t,:,:] = wind_df['u10'].iloc[t]
-            v_data[t,:,:] = wind_df['v10'].iloc[t]
-
-            if t % 10 == 0:  # Reduce output frequency
+        # Interpolate msl and any other time-dependent ERA5 variables in one pass
+        # (u10/v10 are replaced by the observations below)
+        time_vars = [var for var in ds.variables
+                     if 'valid_time' in ds[var].dims and var not in ['u10', 'v10', 'valid_time']]
+        print(f"Interpolating {', '.join(time_vars)} ({method})...")
+        for var, data in resample_time(ds, time_vars, time_orig_unix, time_new_unix, method=method).items():
+            ds_new[var] = data
+
+        print(f"Creating new file with {len(time_new)} {freq} timesteps")
+
+        if stations is None:
+            print(f"Available wind data has {len(wind_df)} entries")
+
+            # Expand the interpolated observations to every grid cell
+            u_data = broadcast_series_to_grid(wind_df['u10'], ds['u10'].shape[1:], lazy=lazy)
+            v_data = broadcast_series_to_grid(wind_df['v10'], ds['v10'].shape[1:], lazy=lazy)
+
+            # Times in observation gaps take the ERA5 winds (np.where dispatches to dask when lazy)
+            gaps = wind_df['u10'].isna().to_numpy()
+            if max_gap is not None and gaps.any():
+                print(f"{gaps.sum()} timesteps fall in observation gaps longer than {max_gap}; using ERA5 u10/v10")
+                background = resample_time(ds, ['u10', 'v10'], time_orig_unix, time_new_unix, method=method)
+                u_data = np.where(gaps[:, None, None], background['u10'].data, u_data)
+                v_data = np.where(gaps[:, None, None], background['v10'].data, v_data)
+
+            for t in range(0, len(time_new), 10):  # Reduce output frequency
                 print(f"Timestep {t+1}/{len(time_new)}")
                 print(f"U10={wind_df['u10'].iloc[t]:.2f} m/s, V10={wind_df['v10'].iloc[t]:.2f} m/s")
+        else:
+            from station_blending import idw_weight_matrix, background_taper, blend_station_winds
+
+            print(f"Blending {len(stations)} stations (k={idw_k}, power={idw_power}, radius={blend_radius_km} km)")
+            weights, dist_km = idw_weight_matrix(stations['lon'].to_numpy(), stations['lat'].to_numpy(),
+                                                 ds.longitude.values, ds.latitude.values,
+                                                 k=idw_k, power=idw_power, cache_dir=weights_cache)
+            alpha = background_taper(dist_km, blend_radius_km)
+            grid_shape = ds['u10'].shape[1:]
+
+            # With max_gap the ERA5 winds are also the background for cells whose stations are
+            # all in a gap (without a radius, alpha is 1 wherever a station is valid)
+            background = {'u10': None, 'v10': None}
+            if blend_radius_km is not None or max_gap is not None:
+                background = resample_time(ds, ['u10', 'v10'], time_orig_unix, time_new_unix, method=method)
+
+            u_obs = np.column_stack([obs['u10'].to_numpy() for obs in station_obs])
+            v_obs = np.column_stack([obs['v10'].to_numpy() for obs in station_obs])
+            gaps = np.isnan(u_obs).any(axis=1)
+            if max_gap is not None and gaps.any():
+                print(f"{gaps.sum()} timesteps have stations in observation gaps longer than {max_gap}; "
+                      f"cells without a valid station use ERA5 u10/v10")
+            u_data = blend_station_winds(u_obs, weights, alpha, grid_shape,
+                                         None if background['u10'] is None else background['u10'].data,
+                                         chunk_time=LAZY_CHUNK_TIME if lazy else None)
+            v_data = blend_station_winds(v_obs, weights, alpha, grid_shape,
+                                         None if background['v10'] is None else background['v10'].data,
+                                         chunk_time=LAZY_CHUNK_TIME if lazy else None)
 
         # Add wind components to new dataset
         ds_new['u10'] = (('valid_time', 'latitude', 'longitude'), u_data)
@@ -150,9 +308,9 @@ def interpolate_era5_with_obs_wind(ds, wind_df, n_timesteps=None):
         ds_new['u10'].attrs = ds['u10'].attrs
         ds_new['v10'].attrs = ds['v10'].attrs
 
-        # Copy remaining variables
+        # Copy remaining (time-independent) variables
         for var in ds.variables:
-            if var not in ['u10', 'v10', 'msl', 'valid_time', 'latitude', 'longitude']:
+            if var not in ['u10', 'v10', 'valid_time', 'latitude', 'longitude'] and var not in time_vars:
                 ds_new[var] = ds[var]
 
         # Copy coordinate attributes
@@ -176,36 +334,102 @@ def interpolate_era5_with_obs_wind(ds, wind_df, n_timesteps=None):
         raise Exception(f"Error in interpolation: {str(e)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interpolate observed wind onto the ERA5 grid")
+    parser.add_argument('--era5', default='era5_data_20121027_20121029.nc', help="input ERA5 file")
+    parser.add_argument('--wind', default='spd_dir2.txt', help="observed wind speed/direction file")
+    parser.add_argument('--output', default='era5_data_30min_obs_wind_rot_fix_filled2.nc', help="output file")
+    parser.add_argument('--lazy', action='store_true',
+                        help="expand observed winds to the grid lazily and write chunk by chunk")
+    parser.add_argument('--freq', default='30min', help="output time interval (pandas frequency)")
+    parser.add_argument('--method', default='linear', choices=['linear', 'cubic'],
+                        help="time interpolation for ERA5 fields")
+    parser.add_argument('--stations', help="station list (name lon lat file) to blend instead of --wind")
+    parser.add_argument('--blend-radius', type=float, help="km over which stations relax to the ERA5 background")
+    parser.add_argument('--idw-k', type=int, default=4, help="nearest stations per grid cell")
+    parser.add_argument('--idw-power', type=float, default=2.0, help="inverse-distance exponent")
+    parser.add_argument('--weights-cache', help="directory for cached station-to-grid weights")
+    parser.add_argument('--format', choices=['netcdf', 'zarr'],
+                        help="output format (default: zarr if --output ends in .zarr, else netcdf)")
+    parser.add_argument('--chunking', choices=CHUNKINGS, default='none',
+                        help="chunk layout: time (whole-grid slices), point (long point series), balanced")
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='none', help="compression codec")
+    parser.add_argument('--complevel', type=int, default=4, help="compression level")
+    parser.add_argument('--workers', type=int, help="dask threads for parallel Zarr writes")
+    parser.add_argument('--qc', action='store_true',
+                        help="drop observations failing the spike, rate-of-change and stuck-sensor checks")
+    parser.add_argument('--spike', type=float, default=SPIKE_SPEED,
+                        help="--qc spike threshold (m/s from the mean of the neighbouring observations)")
+    parser.add_argument('--max-rate', type=float, default=MAX_RATE, help="--qc rate limit (m/s per minute)")
+    parser.add_argument('--stuck-count', type=int, default=STUCK_COUNT,
+                        help="--qc identical consecutive readings flagged as a stuck sensor")
+    parser.add_argument('--max-gap', help="observation gaps longer than this (e.g. 3h) use the ERA5 winds")
+    parser.add_argument('--obs-cache', help="directory for the Parquet cache of parsed observation files")
+    parser.add_argument('--append', action='store_true',
+                        help="extend --output in place with the times after its last time "
+                             "(created with an unlimited time dimension if it does not exist)")
+    parser.add_argument('--sflux', help="write SCHISM sflux_air_1.NNNN.nc files (one per day) to this "
+                                        "directory instead of --output")
+    args = parser.parse_args()
+    if args.append and args.sflux:
+        parser.error("--append extends --output; it cannot be combined with --sflux")
+    fmt = args.format or ('zarr' if args.output.rstrip('/').endswith('.zarr') else 'netcdf')
+
     try:
         print("Reading ERA5 data...")
-        ds = xr.open_dataset('era5_data_20121027_20121029.nc')
+        if args.lazy:
+            ds = xr.open_dataset(args.era5, chunks={'valid_time': LAZY_CHUNK_TIME})
+        else:
+            ds = xr.open_dataset(args.era5)
 
         print("Reading wind observations...")
-        wind_df = read_wind_data('spd_dir2.txt')
+        stations = None
+        wind_df = None
+        qc = dict(spike=args.spike, max_rate=args.max_rate, stuck_count=args.stuck_count) if args.qc else None
+        if args.stations:
+            from station_blending import read_station_list
+            stations = read_station_list(args.stations)
+        else:
+            wind_df = read_wind_data(args.wind, qc, args.obs_cache)
+
+        start = output_last_time(args.output, fmt) if args.append else None
 
         print("Performing interpolation and wind component calculation...")
-        ds_30min = interpolate_era5_with_obs_wind(ds, wind_df)
+        ds_30min = interpolate_era5_with_obs_wind(ds, wind_df, lazy=args.lazy, freq=args.freq, method=args.method,
+                                                  stations=stations, blend_radius_km=args.blend_radius,
+                                                  idw_k=args.idw_k, idw_power=args.idw_power,
+                                                  weights_cache=args.weights_cache, start=start, qc=qc,
+                                                  obs_cache=args.obs_cache, max_gap=args.max_gap)
+        if ds_30min is None:
+            print(f"{args.output} is up to date (last time {start}); nothing to append")
+            sys.exit(0)
 
         print("Renaming valid_time to time...")
         ds_30min = ds_30min.rename({'valid_time': 'time'})
 
         print("Inverting latitudes...")
-        ds_30min = ds_30min.reindex(latitude=ds_30min.latitude[::-1])
-
-        # Flip data arrays along latitude dimension
-        for var in ds_30min.data_vars:
-            if 'latitude' in ds_30min[var].dims:
-                ds_30min[var] = ds_30min[var].reindex(latitude=ds_30min.latitude)
-
-        print("Saving interpolated data...")
-        encoding = {
-            'time': {'dtype': 'int64', '_FillValue': None},
-            'u10': {'dtype': 'float32', '_FillValue': -9999.0},
-            'v10': {'dtype': 'float32', '_FillValue': -9999.0},
-            'msl': {'dtype': 'float32', '_FillValue': -9999.0}
-        }
+        # Reversed-slice view of every variable along latitude (no reindex copies)
+        ds_30min = ascending_latitude(ds_30min)
+
+        if args.sflux:
+            print(f"Writing day-sized sflux_air files to {args.sflux}...")
+            paths = write_sflux_air(ds_30min, args.sflux)
+            print(f"Wrote {len(paths)} sflux_air files and sflux_inputs.txt")
+        else:
+            print("Saving interpolated data...")
+            encoding = {
+                'time': {'dtype': 'int64', '_FillValue': None},
+                'u10': {'dtype': 'float32', '_FillValue': -9999.0},
+                'v10': {'dtype': 'float32', '_FillValue': -9999.0},
+                'msl': {'dtype': 'float32', '_FillValue': -9999.0}
+            }
 
-        ds_30min.to_netcdf('era5_data_30min_obs_wind_rot_fix_filled2.nc', encoding=encoding)
+            if start is not None:
+                ntimes = append_output(ds_30min, args.output, fmt, workers=args.workers)
+                print(f"Appended {ntimes} timesteps to {args.output}")
+            else:
+                write_output(ds_30min, args.output, encoding, fmt=fmt, chunking=args.chunking,
+                             compression=args.compression, complevel=args.complevel, workers=args.workers,
+                             unlimited=args.append)
 
         print("Done!")
         print(f"Original times: {len(ds.valid_time)} points")
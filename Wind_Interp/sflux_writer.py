@@ -0,0 +1,127 @@
+"""
+Write SCHISM atmospheric forcing (sflux_air_1.NNNN.nc, one file per day, and sflux_inputs.txt)
+directly from the interpolated ERA5/observed-wind dataset.
+Each day is selected, computed (dask) and written on its own, so a long storm never needs the
+whole forcing in memory. Latitude is put in ascending order with a reversed-slice view
+rather than a reindex copy.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from netCDF4 import Dataset
+
+# sflux_air variable -> source variable in the interpolated dataset
+SFLUX_AIR_VARS = {'uwind': 'u10', 'vwind': 'v10', 'prmsl': 'msl', 'stmp': 't2m'}
+
+# Used when the source has no 2 m temperature / dew point (SCHISM reads stmp and spfh)
+DEFAULT_STMP = 293.15
+DEFAULT_SPFH = 0.0
+
+def ascending_latitude(ds, lat='latitude'):
+    """Return ds with latitude increasing, as a reversed view (no copy) if it is stored descending."""
+    if ds[lat].size > 1 and ds[lat].values[0] > ds[lat].values[-1]:
+        return ds.isel({lat: slice(None, None, -1)})
+    return ds
+
+def time_index(ds, time='time'):
+    """Times of ds as a DatetimeIndex (decoded, or numeric seconds since 1970-01-01)."""
+    values = ds[time].values
+    if np.issubdtype(values.dtype, np.datetime64):
+        return pd.DatetimeIndex(values)
+    return pd.to_datetime(values, unit='s')
+
+def specific_humidity(d2m, msl):
+    """Specific humidity (kg/kg) from 2 m dew point (K) and pressure (Pa), Bolton (1980)."""
+    td = d2m - 273.15
+    e = 611.2 * np.exp(17.67 * td / (td + 243.5))
+    return 0.622 * e / (msl - 0.378 * e)
+
+def write_sflux_inputs(directory):
+    """Write the (empty) sflux_inputs.txt namelist."""
+    with open(os.path.join(directory, 'sflux_inputs.txt'), 'w') as f:
+        f.write("&sflux_inputs\n/\n")
+
+def write_sflux_air_day(path, day, times, lon, lat, fields):
+    """
+    Write one day of sflux_air.
+
+    :param day: Timestamp of the file's base date (midnight)
+    :param times: DatetimeIndex of the records in this file
+    :param lon, lat: 1D ascending grid coordinates
+    :param fields: dict of sflux variable name -> (time, lat, lon) array
+    """
+    lon2d, lat2d = np.meshgrid(lon, lat)
+    with Dataset(path, 'w', format='NETCDF4') as nc:
+        nc.createDimension('time', None)
+        nc.createDimension('ny_grid', len(lat))
+        nc.createDimension('nx_grid', len(lon))
+
+        time = nc.createVariable('time', 'f4', ('time',))
+        time.long_name = "Time"
+        time.standard_name = "time"
+        time.units = f"days since {day:%Y-%m-%d %H:%M:%S}"
+        time.base_date = np.array([day.year, day.month, day.day, day.hour], dtype='i4')
+        time[:] = (times - day).total_seconds().to_numpy() / 86400.0
+
+        for name, values, long_name, standard_name in (('lon', lon2d, "Longitude", "longitude"),
+                                                        ('lat', lat2d, "Latitude", "latitude")):
+            var = nc.createVariable(name, 'f4', ('ny_grid', 'nx_grid'))
+            var.long_name = long_name
+            var.standard_name = standard_name
+            var.units = f"degrees_{'east' if name == 'lon' else 'north'}"
+            var[:] = values
+
+        attrs = {'uwind': ("Surface Eastward Air Velocity (10m AGL)", "eastward_wind", "m/s"),
+                 'vwind': ("Surface Northward Air Velocity (10m AGL)", "northward_wind", "m/s"),
+                 'prmsl': ("Pressure reduced to MSL", "air_pressure_at_sea_level", "Pa"),
+                 'stmp': ("Surface Air Temperature (2m AGL)", "air_temperature", "K"),
+                 'spfh': ("Surface Specific Humidity (2m AGL)", "specific_humidity", "1")}
+        for name in ('uwind', 'vwind', 'prmsl', 'stmp', 'spfh'):
+            var = nc.createVariable(name, 'f4', ('time', 'ny_grid', 'nx_grid'), zlib=True)
+            var.long_name, var.standard_name, var.units = attrs[name]
+            var[:] = fields[name]
+
+def write_sflux_air(ds, directory='sflux', time='time', stmp=DEFAULT_STMP, spfh=DEFAULT_SPFH):
+    """
+    Split ds into day-sized sflux_air_1.NNNN.nc files and write sflux_inputs.txt.
+
+    :param ds: Dataset with u10, v10, msl (optionally t2m, d2m) on (time, latitude, longitude)
+    :param stmp, spfh: Constants used when t2m / d2m are not in ds
+    :return: List of written file paths
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+        ds = ascending_latitude(ds)
+        times = time_index(ds, time)
+        lon = ds['longitude'].values
+        lat = ds['latitude'].values
+        missing = [v for v in ('t2m', 'd2m') if v not in ds]
+        if missing:
+            print(f"No {', '.join(missing)} in the source; writing constant stmp={stmp} / spfh={spfh}")
+
+        paths = []
+        days = times.normalize().unique()
+        for number, day in enumerate(days, start=1):
+            index = np.nonzero(times.normalize() == day)[0]
+            day_ds = ds.isel({time: slice(int(index[0]), int(index[-1]) + 1)})
+            shape = (len(index), len(lat), len(lon))
+
+            # Only this day's records are computed (and loaded, for dask-backed fields)
+            fields = {name: np.asarray(day_ds[source].values, dtype='f4')
+                      for name, source in SFLUX_AIR_VARS.items() if source in day_ds}
+            fields.setdefault('stmp', np.broadcast_to(np.float32(stmp), shape))
+            if 'd2m' in day_ds:
+                fields['spfh'] = specific_humidity(day_ds['d2m'].values, day_ds['msl'].values).astype('f4')
+            else:
+                fields['spfh'] = np.broadcast_to(np.float32(spfh), shape)
+
+            path = os.path.join(directory, f'sflux_air_1.{number:04d}.nc')
+            write_sflux_air_day(path, day, times[index], lon, lat, fields)
+            paths.append(path)
+
+        write_sflux_inputs(directory)
+        return paths
+
+    except Exception as e:
+        raise Exception(f"Error writing sflux files: {str(e)}")
@@ -0,0 +1,146 @@
+"""
+Blend wind observations from several stations onto the ERA5 grid.
+Inverse-distance weights from the stations to every grid cell are built once with a KD-tree
+(and optionally cached on disk), then applied to all timesteps as one sparse matrix product.
+Far from the stations the field relaxes to the ERA5 background with a Gaussian distance taper.
+
+Station list file (whitespace separated, '#' comments):
+    name  lon  lat  path_to_speed_direction_file
+"""
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+EARTH_RADIUS_KM = 6371.0
+
+def read_station_list(filename):
+    """
+    Read the station list; relative observation paths are resolved against the list's directory.
+    """
+    stations = pd.read_csv(filename, sep=r'\s+', comment='#', names=['name', 'lon', 'lat', 'path'])
+    if stations.empty:
+        raise ValueError(f"No stations listed in {filename}")
+    base = os.path.dirname(os.path.abspath(filename))
+    stations['path'] = [p if os.path.isabs(p) else os.path.join(base, p) for p in stations['path']]
+    return stations
+
+def _unit_xyz(lon, lat):
+    lon = np.deg2rad(np.asarray(lon, dtype='f8'))
+    lat = np.deg2rad(np.asarray(lat, dtype='f8'))
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+def _weights_key(station_lon, station_lat, grid_lon, grid_lat, k, power):
+    h = hashlib.sha1()
+    for a in (station_lon, station_lat, grid_lon, grid_lat):
+        h.update(np.ascontiguousarray(a, dtype='f8').tobytes())
+    h.update(f'{k}-{power}'.encode())
+    return h.hexdigest()[:16]
+
+def idw_weight_matrix(station_lon, station_lat, grid_lon, grid_lat, k=4, power=2.0, cache_dir=None):
+    """
+    Inverse-distance weights from stations to the cells of a regular lat/lon grid.
+
+    :param station_lon, station_lat: 1D station coordinates
+    :param grid_lon, grid_lat: 1D grid axes; cells are ordered (lat, lon) as in ERA5 fields
+    :param k: Number of nearest stations per cell
+    :param power: IDW exponent
+    :param cache_dir: Directory for cached weights (None disables caching)
+    :return: (weights, dist_km) with weights a CSR matrix (ncells, nstations) whose rows sum
+             to 1 and dist_km the distance from each cell to its nearest station
+    """
+    cache_path = None
+    if cache_dir is not None:
+        key = _weights_key(station_lon, station_lat, grid_lon, grid_lat, k, power)
+        cache_path = os.path.join(cache_dir, f'station_idw_{key}.npz')
+        if os.path.exists(cache_path):
+            cached = np.load(cache_path)
+            weights = sparse.csr_matrix((cached['data'], cached['indices'], cached['indptr']),
+                                        shape=tuple(cached['shape']))
+            return weights, cached['dist_km']
+
+    nstations = len(station_lon)
+    k = min(k, nstations)
+    lon2d, lat2d = np.meshgrid(grid_lon, grid_lat)
+    tree = cKDTree(_unit_xyz(station_lon, station_lat))
+    chord, nearest = tree.query(_unit_xyz(lon2d.ravel(), lat2d.ravel()), k=k)
+    chord = chord.reshape(-1, k)
+    nearest = nearest.reshape(-1, k)
+    dist_km = 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0, 1))
+
+    w = 1.0 / np.maximum(dist_km, 1e-6) ** power
+    w /= w.sum(axis=1, keepdims=True)
+    ncells = len(w)
+    weights = sparse.csr_matrix((w.ravel(), (np.repeat(np.arange(ncells), k), nearest.ravel())),
+                                shape=(ncells, nstations))
+
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.savez(cache_path, data=weights.data, indices=weights.indices, indptr=weights.indptr,
+                 shape=np.array(weights.shape), dist_km=dist_km[:, 0])
+    return weights, dist_km[:, 0]
+
+def background_taper(dist_km, radius_km=None):
+    """
+    Weight of the station field per cell: 1 at a station, exp(-(d/radius)^2) away from it.
+    radius_km=None uses the stations everywhere (no ERA5 background).
+    """
+    if radius_km is None:
+        return np.ones_like(dist_km)
+    return np.exp(-(np.asarray(dist_km) / radius_km) ** 2)
+
+def _blend(obs, weights, alpha, background):
+    """Blend a (time, nstations) block with a (time, ncells) background block."""
+    valid = np.isfinite(obs)
+    num = weights.dot(np.where(valid, obs, 0).T).T
+    den = weights.dot(valid.T.astype('f8')).T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        station_field = num / den
+    # Cells whose stations are all missing at this time fall back to the background
+    a = np.where(den > 0, alpha[None, :], 0.0)
+    if background is None:
+        return np.where(den > 0, station_field, np.nan)
+    return a * np.nan_to_num(station_field) + (1 - a) * background
+
+def blend_station_winds(obs, weights, alpha, grid_shape, background=None, chunk_time=None):
+    """
+    Apply the station-to-grid weights to every timestep.
+
+    :param obs: (time, nstations) array of one wind component, NaN where a station is missing
+    :param weights: CSR matrix (ncells, nstations) from idw_weight_matrix
+    :param alpha: (ncells,) station weight from background_taper
+    :param grid_shape: (nlat, nlon)
+    :param background: Optional (time, nlat, nlon) numpy or dask array of ERA5 values
+    :param chunk_time: Without a background, blend lazily in dask chunks of this many timesteps
+                       (None computes the numpy result at once)
+    :return: (time, nlat, nlon) array (dask if background is dask or chunk_time is given)
+    """
+    obs = np.asarray(obs, dtype='f8')
+    ntime = obs.shape[0]
+    ncells = weights.shape[0]
+
+    if background is not None and hasattr(background, 'map_blocks'):
+        bg = background.rechunk({1: -1, 2: -1})
+
+        def blend_block(bg_block, block_info=None):
+            t0, t1 = block_info[0]['array-location'][0]
+            out = _blend(obs[t0:t1], weights, alpha, bg_block.reshape(t1 - t0, ncells))
+            return out.reshape(bg_block.shape)
+
+        return bg.map_blocks(blend_block, dtype='f8')
+
+    if background is None and chunk_time is not None:
+        import dask.array as da
+        obs_blocks = da.from_array(obs, chunks=(chunk_time, -1))
+
+        def blend_obs_block(obs_block):
+            return _blend(obs_block, weights, alpha, None).reshape((len(obs_block),) + tuple(grid_shape))
+
+        return obs_blocks.map_blocks(blend_obs_block, dtype='f8', new_axis=2,
+                                     chunks=(obs_blocks.chunks[0], (grid_shape[0],), (grid_shape[1],)))
+
+    bg = None if background is None else np.asarray(background, dtype='f8').reshape(ntime, ncells)
+    return _blend(obs, weights, alpha, bg).reshape((ntime,) + tuple(grid_shape))
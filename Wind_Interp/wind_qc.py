@@ -0,0 +1,170 @@
+"""
+Ingest and quality control of station wind observations (date time speed direction text files).
+Timestamps are parsed from their fixed YYYY-MM-DD HH:MM:SS layout with integer arithmetic on
+the raw bytes instead of string concatenation + pd.to_datetime. Parsed records are cached in
+Parquet (keyed by the file's path, size and mtime), so re-runs skip the text parsing.
+The range, spike, rate-of-change and stuck-sensor checks are vectorized over the whole record
+and return QARTOD-style bit flags; gap_mask marks target times that fall in observation gaps
+so the time interpolation does not bridge them.
+"""
+
+import os
+import hashlib
+import numpy as np
+import pandas as pd
+
+# QC flag bits (0 = passed every check)
+FLAG_RANGE = 1
+FLAG_SPIKE = 2
+FLAG_RATE = 4
+FLAG_STUCK = 8
+
+# Default thresholds
+MAX_SPEED = 100.0    # m/s, exclusive (as the original range filter)
+SPIKE_SPEED = 10.0   # m/s departure from the mean of the two neighbouring observations
+MAX_RATE = 2.0       # m/s per minute between consecutive observations
+STUCK_COUNT = 6      # identical consecutive (speed, direction) readings
+
+def parse_fixed_datetime(date, time):
+    """
+    Parse YYYY-MM-DD and HH:MM:SS string arrays to datetime64[ns].
+    The digits are read straight from the fixed byte positions; rows that do not match the
+    layout fall back to pd.to_datetime (NaT if they cannot be parsed at all).
+    """
+    date = np.asarray(date)
+    time = np.asarray(time)
+    # One byte past the layout: it is NUL padding only if the field is not longer, so fields
+    # of another width (e.g. fractional seconds) go to the fallback instead of being truncated
+    d = np.frombuffer(date.astype('S11').tobytes(), dtype='u1').reshape(-1, 11)
+    t = np.frombuffer(time.astype('S9').tobytes(), dtype='u1').reshape(-1, 9)
+    ok = (d[:, 10] == 0) & (t[:, 8] == 0)
+    ok &= (d[:, 4] == ord('-')) & (d[:, 7] == ord('-')) & (t[:, 2] == ord(':')) & (t[:, 5] == ord(':'))
+
+    def number(raw, *columns):
+        # Non-digit bytes wrap around to >= 10 in uint8 and mark the row as not matching
+        value = np.zeros(len(raw), dtype='i8')
+        for c in columns:
+            digit = raw[:, c] - np.uint8(ord('0'))
+            ok[digit > 9] = False
+            value = value * 10 + digit
+        return value
+
+    year, month, day = number(d, 0, 1, 2, 3), number(d, 5, 6), number(d, 8, 9)
+    seconds = number(t, 0, 1) * 3600 + number(t, 3, 4) * 60 + number(t, 6, 7)
+    ok &= (month >= 1) & (month <= 12) & (seconds < 86400)
+
+    months = np.where(ok, (year - 1970) * 12 + month - 1, 0).astype('datetime64[M]')
+    first_day = months.astype('datetime64[D]')
+    # Days in each month (leap years included), so e.g. 2012-02-30 is not rolled into March
+    month_length = ((months + 1).astype('datetime64[D]') - first_day).astype('i8')
+    ok &= (day >= 1) & (day <= month_length)
+    result = (first_day + np.where(ok, day - 1, 0)).astype('datetime64[s]') \
+        + np.where(ok, seconds, 0).astype('timedelta64[s]')
+    result = result.astype('datetime64[ns]')
+
+    if not ok.all():
+        bad = ~ok
+        text = pd.Series(date[bad].astype(str)) + ' ' + pd.Series(time[bad].astype(str))
+        result[bad] = pd.to_datetime(text, format='mixed', errors='coerce').to_numpy(dtype='datetime64[ns]')
+    return result
+
+def read_observation_text(filename):
+    """
+    Parse a 'date time speed direction' file.
+
+    :return: DataFrame with float speed and direction (NaN where not numeric), indexed by datetime
+    """
+    df = pd.read_csv(filename, sep=r'\s+', names=['date', 'time', 'speed', 'direction'],
+                     dtype={'date': str, 'time': str})
+    index = pd.DatetimeIndex(parse_fixed_datetime(df['date'].to_numpy(), df['time'].to_numpy()), name='datetime')
+    return pd.DataFrame({'speed': pd.to_numeric(df['speed'], errors='coerce').to_numpy(),
+                         'direction': pd.to_numeric(df['direction'], errors='coerce').to_numpy()},
+                        index=index)
+
+def _cache_path(filename, cache_dir):
+    """Parquet cache file for filename, keyed by its absolute path, size and modification time."""
+    stat = os.stat(filename)
+    key = hashlib.sha1(f"{os.path.abspath(filename)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.basename(filename)}.{key}.parquet")
+
+def load_observations(filename, cache_dir=None):
+    """
+    Parsed observations of filename, from the Parquet cache when the file is unchanged.
+
+    :param cache_dir: Directory for the Parquet cache (None disables caching)
+    """
+    if cache_dir is None:
+        return read_observation_text(filename)
+    cache_path = _cache_path(filename, cache_dir)
+    if os.path.exists(cache_path):
+        return pd.read_parquet(cache_path)
+    df = read_observation_text(filename)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        df.to_parquet(cache_path + '.part', engine='pyarrow')
+        os.replace(cache_path + '.part', cache_path)
+    except ImportError as e:
+        print(f"Not caching {filename} ({str(e)})")
+    return df
+
+def _stuck_runs(*columns, count=STUCK_COUNT):
+    """True for observations in runs of at least count identical consecutive values of all columns."""
+    n = len(columns[0])
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+    change = np.ones(n, dtype=bool)
+    change[1:] = np.logical_or.reduce([np.diff(c) != 0 for c in columns])
+    run = np.cumsum(change) - 1
+    return np.bincount(run)[run] >= count
+
+def qc_flags(df, max_speed=MAX_SPEED, spike=SPIKE_SPEED, max_rate=MAX_RATE, stuck_count=STUCK_COUNT):
+    """
+    Vectorized QC of a time-sorted observation record.
+
+    range: NaN, speed outside [0, max_speed) or direction outside [0, 360]
+    spike: speed departs from the mean of its neighbours by more than spike (m/s)
+    rate: speed changes faster than max_rate (m/s per minute) from the previous observation
+    stuck: at least stuck_count identical consecutive non-zero (speed, direction) readings
+    The spike, rate and stuck checks only use observations that passed the range check.
+    A threshold of None disables that check.
+
+    :return: uint8 array of FLAG_* bits
+    """
+    speed = df['speed'].to_numpy(dtype='f8')
+    direction = df['direction'].to_numpy(dtype='f8')
+    flags = np.zeros(len(df), dtype='u1')
+
+    bad_range = ~((speed >= 0) & (speed < max_speed) & (direction >= 0) & (direction <= 360))
+    flags[bad_range] |= FLAG_RANGE
+    good = np.nonzero(~bad_range)[0]
+    s = speed[good]
+    minutes = (df.index.to_numpy()[good] - np.datetime64(0, 's')) / np.timedelta64(1, 'm')
+
+    if spike is not None and len(s) > 2:
+        reference = (s[:-2] + s[2:]) / 2
+        flags[good[1:-1][np.abs(s[1:-1] - reference) > spike]] |= FLAG_SPIKE
+    if max_rate is not None and len(s) > 1:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = np.abs(np.diff(s)) / np.diff(minutes)
+        flags[good[1:][rate > max_rate]] |= FLAG_RATE
+    if stuck_count is not None and len(s) >= stuck_count:
+        stuck = _stuck_runs(s, direction[good], count=stuck_count) & (s > 0)
+        flags[good[stuck]] |= FLAG_STUCK
+    return flags
+
+def gap_mask(obs_times, target_times, max_gap):
+    """
+    True for target times inside a gap between consecutive observations longer than max_gap
+    (or before the first / after the last observation), which must not be interpolated across.
+
+    :param max_gap: pandas Timedelta or string such as '3h'
+    """
+    obs = np.sort(pd.DatetimeIndex(obs_times).to_numpy())
+    target = pd.DatetimeIndex(target_times).to_numpy()
+    if len(obs) == 0:
+        return np.ones(len(target), dtype=bool)
+    i = np.searchsorted(obs, target, side='left')
+    exact = (i < len(obs)) & (obs[np.minimum(i, len(obs) - 1)] == target)
+    outside = (i == 0) | (i == len(obs))
+    span = obs[np.minimum(i, len(obs) - 1)] - obs[np.maximum(i - 1, 0)]
+    return ~exact & (outside | (span > pd.Timedelta(max_gap).to_timedelta64()))
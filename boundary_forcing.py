@@ -0,0 +1,244 @@
+"""
+Spatially varying open boundary forcing for elev2D.th.nc.
+Interpolates water elevation from a gridded parent-model file, a multi-station file or tidal
+constituents to every open boundary node of hgrid.gr3 in one vectorized operation. The
+node-to-source weight matrix is built once and cached on disk, keyed by the node and source
+coordinates, so daily cycles reuse it.
+
+Source file (NetCDF) layout:
+  - gridded:   lon(lon), lat(lat), time(time), elev(time, lat, lon)
+  - stations:  lon(station), lat(station), time(time), elev(time, station)
+  - tides:     lon, lat as above, frequency(constituent) [rad/s],
+               amp(constituent, ...) [m], phase(constituent, ...) [degrees]
+"""
+
+import os
+import hashlib
+import numpy as np
+from netCDF4 import Dataset, num2date
+from scipy import sparse
+
+# Number of source time records interpolated per block
+SOURCE_BLOCK_SIZE = 256
+
+def open_boundary_indexes(hgrid):
+    """
+    Return the 0-based node indexes of all open boundary nodes, in boundary order.
+
+    :param hgrid: Gr3Grid from hgrid_reader.read_hgrid
+    """
+    return np.concatenate([np.asarray(boundary, dtype=int) for boundary in hgrid.open_boundaries])
+
+def coords_hash(*arrays):
+    """
+    Hash coordinate arrays so cached weights are only reused for identical geometry.
+    """
+    h = hashlib.sha1()
+    for a in arrays:
+        a = np.ascontiguousarray(a, dtype='f8')
+        h.update(str(a.shape).encode())
+        h.update(a.tobytes())
+    return h.hexdigest()[:16]
+
+def bilinear_weights(lon, lat, src_lon, src_lat):
+    """
+    Bilinear weights from a regular lon/lat grid to points.
+
+    :param lon, lat: 1D arrays of target point coordinates
+    :param src_lon, src_lat: 1D grid axes (either may be descending)
+    :return: sparse CSR matrix of shape (npoints, nlat * nlon), rows sum to 1
+    """
+    src_lon = np.asarray(src_lon, dtype='f8')
+    src_lat = np.asarray(src_lat, dtype='f8')
+    nlat, nlon = len(src_lat), len(src_lon)
+
+    def axis_weights(x, axis):
+        # Work on an ascending copy of the axis and map indexes back at the end
+        if len(axis) == 1:
+            # A single source column/row: every point takes it, there is nothing to interpolate
+            zero = np.zeros(len(x), dtype=np.int64)
+            return zero, zero, np.zeros(len(x))
+        descending = axis[0] > axis[-1]
+        a = axis[::-1] if descending else axis
+        x = np.clip(x, a[0], a[-1])
+        i0 = np.clip(np.searchsorted(a, x, side='right') - 1, 0, len(a) - 2)
+        w1 = (x - a[i0]) / (a[i0 + 1] - a[i0])
+        i1 = i0 + 1
+        if descending:
+            i0, i1 = len(a) - 1 - i0, len(a) - 1 - i1
+        return i0, i1, w1
+
+    ix0, ix1, wx = axis_weights(np.asarray(lon, dtype='f8'), src_lon)
+    iy0, iy1, wy = axis_weights(np.asarray(lat, dtype='f8'), src_lat)
+
+    npts = len(ix0)
+    rows = np.repeat(np.arange(npts), 4)
+    cols = np.stack([iy0 * nlon + ix0, iy0 * nlon + ix1,
+                     iy1 * nlon + ix0, iy1 * nlon + ix1], axis=1).ravel()
+    data = np.stack([(1 - wy) * (1 - wx), (1 - wy) * wx,
+                     wy * (1 - wx), wy * wx], axis=1).ravel()
+    return sparse.csr_matrix((data, (rows, cols)), shape=(npts, nlat * nlon))
+
+def idw_weights(lon, lat, src_lon, src_lat, power=2.0, k=4):
+    """
+    Inverse-distance weights from scattered stations to points, using the k nearest stations.
+
+    :return: sparse CSR matrix of shape (npoints, nstations), rows sum to 1
+    """
+    lon = np.asarray(lon, dtype='f8')
+    lat = np.asarray(lat, dtype='f8')
+    src_lon = np.asarray(src_lon, dtype='f8')
+    src_lat = np.asarray(src_lat, dtype='f8')
+    k = min(k, len(src_lon))
+
+    # Local equirectangular distance is adequate at boundary-to-station scales
+    coslat = np.cos(np.deg2rad(lat))[:, None]
+    dist = np.hypot((lon[:, None] - src_lon[None, :]) * coslat, lat[:, None] - src_lat[None, :])
+    nearest = np.argsort(dist, axis=1)[:, :k]
+    d = np.take_along_axis(dist, nearest, axis=1)
+
+    w = 1.0 / np.maximum(d, 1e-12) ** power
+    w /= w.sum(axis=1, keepdims=True)
+
+    rows = np.repeat(np.arange(len(lon)), k)
+    return sparse.csr_matrix((w.ravel(), (rows, nearest.ravel())), shape=(len(lon), len(src_lon)))
+
+def load_or_build_weights(lon, lat, src_lon, src_lat, gridded, cache_dir=None, power=2.0, k=4):
+    """
+    Return the node-to-source weight matrix, reading it from cache_dir when available.
+    """
+    method = 'bilinear' if gridded else f'idw{power:g}k{k}'
+    key = coords_hash(lon, lat, src_lon, src_lat)
+    cache_path = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        cache_path = os.path.join(cache_dir, f'bnd_weights_{method}_{key}.npz')
+        if os.path.exists(cache_path):
+            return sparse.load_npz(cache_path)
+
+    if gridded:
+        weights = bilinear_weights(lon, lat, src_lon, src_lat)
+    else:
+        weights = idw_weights(lon, lat, src_lon, src_lat, power=power, k=k)
+
+    if cache_path is not None:
+        sparse.save_npz(cache_path, weights)
+    return weights
+
+def apply_weights(weights, values):
+    """
+    Interpolate source values to the target points.
+
+    NaN source values (e.g. parent-model land cells) are dropped and the remaining weights
+    renormalized, so boundary nodes next to land still get a value.
+
+    :param weights: sparse matrix of shape (npoints, nsource)
+    :param values: array of shape (..., nsource)
+    :return: array of shape (..., npoints)
+    """
+    values = np.asarray(values)
+    flat = values.reshape(-1, values.shape[-1])
+    valid = np.isfinite(flat)
+    num = weights.dot(np.where(valid, flat, 0).T).T
+    den = weights.dot(valid.T.astype('f8')).T
+    with np.errstate(invalid='ignore', divide='ignore'):
+        out = np.where(den > 0, num / den, np.nan)
+    return out.reshape(values.shape[:-1] + (weights.shape[0],))
+
+def time_weights(src_time, target_time):
+    """
+    Linear interpolation indexes and weights from the source time axis to target times.
+    Targets outside the source record are clamped to its first/last value.
+    """
+    src_time = np.asarray(src_time, dtype='f8')
+    target_time = np.clip(np.asarray(target_time, dtype='f8'), src_time[0], src_time[-1])
+    if len(src_time) == 1:
+        zeros = np.zeros(len(target_time), dtype=int)
+        return zeros, zeros, np.zeros(len(target_time))
+    i0 = np.clip(np.searchsorted(src_time, target_time, side='right') - 1, 0, len(src_time) - 2)
+    w1 = (target_time - src_time[i0]) / (src_time[i0 + 1] - src_time[i0])
+    return i0, i0 + 1, w1
+
+def synthesize_tides(target_time, amp, phase, frequency):
+    """
+    Sum tidal constituents at each point.
+
+    :param target_time: 1D array of seconds since the start of the run
+    :param amp: array (constituent, npoints) of amplitudes [m]
+    :param phase: array (constituent, npoints) of phases [degrees]
+    :param frequency: 1D array (constituent,) of angular frequencies [rad/s]
+    :return: array (time, npoints)
+    """
+    arg = np.asarray(target_time, dtype='f8')[:, None] * np.asarray(frequency)[None, :]
+    cos_arg, sin_arg = np.cos(arg), np.sin(arg)
+    phase = np.deg2rad(phase)
+    # amp*cos(wt - g) = amp*cos(g)*cos(wt) + amp*sin(g)*sin(wt)
+    return cos_arg @ (amp * np.cos(phase)) + sin_arg @ (amp * np.sin(phase))
+
+def _source_seconds(time_var, start_date):
+    """Source times in seconds since start_date, or as stored when start_date is None."""
+    values = time_var[:].astype('f8')
+    if start_date is None or not hasattr(time_var, 'units'):
+        return values
+    dates = num2date(values, units=time_var.units, only_use_cftime_datetimes=False,
+                     only_use_python_datetimes=True)
+    return np.array([(d - start_date).total_seconds() for d in dates])
+
+def interpolate_boundary_elev(lon, lat, source_path, target_time, var='elev', start_date=None,
+                              cache_dir=None, power=2.0, k=4):
+    """
+    Interpolate a source file to the open boundary nodes on the target time axis.
+
+    :param lon, lat: 1D arrays of open boundary node coordinates
+    :param source_path: NetCDF source file (gridded, stations or tidal constituents)
+    :param target_time: 1D array of seconds since the start of the run
+    :param var: Name of the elevation variable in the source file
+    :param start_date: datetime of the run start, used to convert source times with units
+    :param cache_dir: Directory for cached weight matrices (None disables caching)
+    :return: array of shape (time, nOpenBndNodes)
+    """
+    target_time = np.asarray(target_time, dtype='f8')
+    with Dataset(source_path, 'r') as src:
+        src_lon = src.variables['lon'][:].astype('f8')
+        src_lat = src.variables['lat'][:].astype('f8')
+        gridded = src.variables['lon'].dimensions != src.variables['lat'].dimensions
+
+        if gridded:
+            grid_lon, grid_lat = src_lon, src_lat
+        else:
+            grid_lon, grid_lat = src_lon.ravel(), src_lat.ravel()
+        weights = load_or_build_weights(lon, lat, grid_lon, grid_lat, gridded,
+                                        cache_dir=cache_dir, power=power, k=k)
+        nsource = weights.shape[1]
+
+        if 'amp' in src.variables and 'phase' in src.variables:
+            nconst = src.dimensions[src.variables['amp'].dimensions[0]].size
+            amp = np.ma.filled(src.variables['amp'][:].astype('f8'), np.nan).reshape(nconst, nsource)
+            phase = np.deg2rad(np.ma.filled(src.variables['phase'][:].astype('f8'), np.nan)).reshape(nconst, nsource)
+            # Interpolate the complex harmonic amplitudes so phases wrap correctly
+            re = apply_weights(weights, amp * np.cos(phase))
+            im = apply_weights(weights, amp * np.sin(phase))
+            node_amp = np.hypot(re, im)
+            node_phase = np.rad2deg(np.arctan2(im, re))
+            frequency = src.variables['frequency'][:].astype('f8')
+            return synthesize_tides(target_time, node_amp, node_phase, frequency)
+
+        src_time = _source_seconds(src.variables['time'], start_date)
+        i0, i1, w1 = time_weights(src_time, target_time)
+        elev_var = src.variables[var]
+
+        node_elev = np.empty((len(target_time), weights.shape[0]), dtype='f8')
+        nsrc_time = len(src_time)
+        first, last = int(i0.min()), int(i0.max())
+        # Read the source in time blocks (overlapping by one record so every interval
+        # [i0, i1] lies inside a single block) to keep memory bounded for long records
+        for t_lo in range(first, last + 1, SOURCE_BLOCK_SIZE):
+            t_hi = min(t_lo + SOURCE_BLOCK_SIZE, last + 1)
+            t_end = min(t_hi + 1, nsrc_time)
+            values = np.ma.filled(elev_var[t_lo:t_end].astype('f8'), np.nan).reshape(t_end - t_lo, nsource)
+            src_nodes = apply_weights(weights, values)
+
+            sel = (i0 >= t_lo) & (i0 < t_hi)
+            node_elev[sel] = ((1 - w1[sel, None]) * src_nodes[i0[sel] - t_lo]
+                              + w1[sel, None] * src_nodes[i1[sel] - t_lo])
+        return node_elev
@@ -0,0 +1,284 @@
+"""
+Python replacement for the combine_output11_MPI step in combine_schism.sh.
+Reads the per-rank local_to_global_* maps once, then merges only the requested variables
+(and optionally a time window) of each per-rank output stack (schout_<rank>_<stack>.nc) into
+one global file per stack, e.g. schout_elev_<stack>.nc. Stacks are combined in parallel across
+a process pool (and SLURM tasks), written as chunked, compressed NetCDF or Zarr, and already
+combined stacks are skipped, so plotting can start while the run is still producing output.
+Usage: python combine_schism.py -b 1 -e 17 -v elev -o schout_elev --nprocs 8
+"""
+
+import os
+import re
+import glob
+import shutil
+import argparse
+from functools import partial
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from netCDF4 import Dataset, num2date
+
+from parallel_frames import add_parallel_args
+from repo_modules import repo_module
+
+# Time records read from every rank and written per block
+DEFAULT_BLOCK_TIME = 24
+
+# Horizontal dimensions of the per-rank files and the local-to-global map used for each
+LOCAL_DIMS = {'nSCHISM_hgrid_node': 'node', 'nSCHISM_hgrid_face': 'elem', 'nSCHISM_hgrid_edge': 'side'}
+
+def read_local_to_global(path):
+    """
+    Read one rank's local_to_global file.
+
+    :return: (global sizes {'elem', 'node', 'side'}, 0-based global indexes of the rank's
+             local elements, nodes and sides as a dict with the same keys)
+    """
+    with open(path) as f:
+        ns_global, ne_global, np_global = (int(v) for v in f.readline().split()[:3])
+        f.readline()  # 'local to global mapping:'
+        maps = {}
+        for name in ('elem', 'node', 'side'):
+            count = int(f.readline().split()[0])
+            table = np.array([line.split()[:2] for line in islice(f, count)], dtype=np.int64).reshape(-1, 2)
+            maps[name] = table[:, 1] - 1
+    return {'elem': ne_global, 'node': np_global, 'side': ns_global}, maps
+
+def read_all_local_to_global(directory='.'):
+    """Read every local_to_global_<rank> file; returns (global sizes, {rank: maps})."""
+    maps = {}
+    sizes = None
+    for path in glob.glob(os.path.join(directory, 'local_to_global_*')):
+        match = re.search(r'local_to_global_(\d+)$', path)
+        if match is None:
+            continue
+        sizes, maps[int(match.group(1))] = read_local_to_global(path)
+    if not maps:
+        raise FileNotFoundError(f"No local_to_global_* files in {directory}")
+    return sizes, maps
+
+def rank_files(directory, prefix, stack):
+    """Per-rank output files of one stack as {rank: path}."""
+    files = {}
+    for path in glob.glob(os.path.join(directory, f'{prefix}_*_{stack}.nc')):
+        match = re.search(rf'{re.escape(prefix)}_(\d+)_{stack}\.nc$', path)
+        if match is not None:
+            files[int(match.group(1))] = path
+    return files
+
+def read_geometry(hgrid_path=None, ncs=None, maps=None, sizes=None):
+    """
+    Global node coordinates and 0-based face nodes (ne, 4; -1 for triangles).
+    Taken from hgrid.gr3/hgrid.ll if given, otherwise scattered from the per-rank files.
+    """
+    if hgrid_path is not None:
+        grid = repo_module('hgrid_reader').read_hgrid(hgrid_path)
+        return grid.coords[:, 0], grid.coords[:, 1], np.asarray(grid.elements)
+
+    x = np.zeros(sizes['node'])
+    y = np.zeros(sizes['node'])
+    faces = np.full((sizes['elem'], 4), -1, dtype=np.int64)
+    for rank, nc in ncs.items():
+        nodes = maps[rank]['node']
+        x[nodes] = nc.variables['SCHISM_hgrid_node_x'][:]
+        y[nodes] = nc.variables['SCHISM_hgrid_node_y'][:]
+        local = np.ma.filled(nc.variables['SCHISM_hgrid_face_nodes'][:], 0).astype(np.int64)
+        ncol = local.shape[1]
+        faces[maps[rank]['elem'], :ncol] = np.where(local > 0, nodes[np.maximum(local - 1, 0)], -1)
+    return x, y, faces
+
+def select_times(time_var, ntime, start_date=None, end_date=None):
+    """Record range [t0, t1) of the (monotonic) time axis inside [start_date, end_date]."""
+    if start_date is None and end_date is None:
+        return 0, ntime
+    times = pd.to_datetime(num2date(time_var[:ntime], units=time_var.units, only_use_cftime_datetimes=False,
+                                    only_use_python_datetimes=True))
+    t0 = 0 if start_date is None else int(times.searchsorted(pd.Timestamp(start_date), side='left'))
+    t1 = ntime if end_date is None else int(times.searchsorted(pd.Timestamp(end_date), side='right'))
+    return t0, max(t0, t1)
+
+def output_records(path):
+    """Number of time records in an existing combined output (0 if unreadable)."""
+    try:
+        if path.endswith('.zarr'):
+            import xarray as xr
+            with xr.open_zarr(path) as ds:
+                return ds.sizes['time']
+        with Dataset(path, 'r') as nc:
+            return nc.dimensions['time'].size
+    except Exception:
+        return 0
+
+def _global_shape(var, sizes):
+    """Map a per-rank variable's dims to (dims, global shape, horizontal kind)."""
+    dims = var.dimensions
+    if dims[0] != 'time' or len(dims) < 2 or dims[1] not in LOCAL_DIMS:
+        raise ValueError(f"{var.name} is not a (time, horizontal, ...) variable: {dims}")
+    kind = LOCAL_DIMS[dims[1]]
+    return dims, (sizes[kind],) + var.shape[2:], kind
+
+def _create_netcdf(path, x, y, faces, time_var, templates, sizes, zlib, complevel):
+    """Create the combined NetCDF with geometry and empty, chunked output variables."""
+    nc = Dataset(path, 'w', format='NETCDF4')
+    nc.createDimension('nSCHISM_hgrid_node', sizes['node'])
+    nc.createDimension('nSCHISM_hgrid_face', sizes['elem'])
+    nc.createDimension('nSCHISM_hgrid_edge', sizes['side'])
+    nc.createDimension('nMaxSCHISM_hgrid_face_nodes', 4)
+    nc.createDimension('time', None)
+    nc.createVariable('SCHISM_hgrid_node_x', 'f8', ('nSCHISM_hgrid_node',))[:] = x
+    nc.createVariable('SCHISM_hgrid_node_y', 'f8', ('nSCHISM_hgrid_node',))[:] = y
+    face_nodes = nc.createVariable('SCHISM_hgrid_face_nodes', 'i4', ('nSCHISM_hgrid_face', 'nMaxSCHISM_hgrid_face_nodes'),
+                                   fill_value=-1)
+    face_nodes.start_index = 1
+    face_nodes[:] = np.where(faces >= 0, faces + 1, -1)
+
+    time = nc.createVariable('time', 'f8', ('time',))
+    time.setncatts({name: time_var.getncattr(name) for name in time_var.ncattrs()})
+    for name, (var, dims, shape) in templates.items():
+        for dim, size in zip(dims[2:], shape[1:]):
+            if dim not in nc.dimensions:
+                nc.createDimension(dim, size)
+        attrs = {a: var.getncattr(a) for a in var.ncattrs() if a != '_FillValue'}
+        fill = getattr(var, '_FillValue', None)
+        # One chunk per time step, so a map frame is a single read
+        out = nc.createVariable(name, var.dtype, dims, zlib=zlib, complevel=complevel, shuffle=True,
+                                chunksizes=(1,) + shape, fill_value=fill)
+        out.setncatts(attrs)
+    nc.history = "Combined from per-rank outputs by combine_schism.py"
+    return nc
+
+def _write_zarr(path, t0, times, time_var, blocks, templates, geometry):
+    """Write (t0 == 0) or append one time block to a Zarr store."""
+    import xarray as xr
+    data_vars = {name: (templates[name][1], block, {a: templates[name][0].getncattr(a)
+                                                    for a in templates[name][0].ncattrs() if a != '_FillValue'})
+                 for name, block in blocks.items()}
+    data_vars['time'] = (('time',), times, {a: time_var.getncattr(a) for a in time_var.ncattrs()})
+    if t0 == 0:
+        x, y, faces = geometry
+        data_vars['SCHISM_hgrid_node_x'] = (('nSCHISM_hgrid_node',), x)
+        data_vars['SCHISM_hgrid_node_y'] = (('nSCHISM_hgrid_node',), y)
+        data_vars['SCHISM_hgrid_face_nodes'] = (('nSCHISM_hgrid_face', 'nMaxSCHISM_hgrid_face_nodes'),
+                                                np.where(faces >= 0, faces + 1, -1).astype('i4'), {'start_index': 1})
+        ds = xr.Dataset(data_vars)
+        encoding = {name: {'chunks': (1,) + templates[name][2]} for name in blocks}
+        ds.to_zarr(path, mode='w', encoding=encoding)
+    else:
+        xr.Dataset(data_vars).to_zarr(path, append_dim='time')
+
+def combine_stack(stack, variables, output_prefix, sizes, maps, directory='.', prefix='schout', hgrid_path=None,
+                  start_date=None, end_date=None, block_time=DEFAULT_BLOCK_TIME, fmt='netcdf', zlib=True,
+                  complevel=4, overwrite=False):
+    """
+    Combine the requested variables of one stack into a global file.
+
+    :param variables: Variable names to merge (e.g. ['elev'])
+    :param output_prefix: Output file prefix; stack N is written to <output_prefix>_N.nc (or .zarr)
+    :param sizes, maps: From read_all_local_to_global
+    :param start_date, end_date: Optional time window (inclusive)
+    :param block_time: Time records read from every rank per write
+    :param fmt: 'netcdf' or 'zarr'
+    :return: Output path, or None if the stack was skipped
+    """
+    files = rank_files(directory, prefix, stack)
+    missing = sorted(set(maps) - set(files))
+    if missing:
+        print(f"Stack {stack}: missing ranks {missing[:5]}{'...' if len(missing) > 5 else ''}, skipping")
+        return None
+
+    ext = '.zarr' if fmt == 'zarr' else '.nc'
+    output = f'{output_prefix}_{stack}{ext}'
+    ncs = {rank: Dataset(files[rank], 'r') for rank in sorted(maps)}
+    try:
+        # A stack that is still being written has fewer records on some ranks
+        ntime = min(nc.dimensions['time'].size for nc in ncs.values())
+        time_var = ncs[min(ncs)].variables['time']
+        t0, t1 = select_times(time_var, ntime, start_date, end_date)
+        if t1 <= t0:
+            print(f"Stack {stack}: no records in the requested time range, skipping")
+            return None
+        if os.path.exists(output) and not overwrite and output_records(output) >= t1 - t0:
+            print(f"Stack {stack}: {output} already combined, skipping")
+            return None
+
+        templates = {}
+        for name in variables:
+            var = ncs[min(ncs)].variables[name]
+            dims, shape, kind = _global_shape(var, sizes)
+            templates[name] = (var, dims, shape, kind)
+        geometry = read_geometry(hgrid_path, ncs, maps, sizes)
+
+        tmp = f'{output}.part'
+        if os.path.isdir(tmp):
+            shutil.rmtree(tmp)
+        elif os.path.exists(tmp):
+            os.remove(tmp)
+        out = None
+        if fmt != 'zarr':
+            out = _create_netcdf(tmp, *geometry, time_var, {n: t[:3] for n, t in templates.items()},
+                                 sizes, zlib, complevel)
+        try:
+            for b0 in range(t0, t1, block_time):
+                b1 = min(b0 + block_time, t1)
+                blocks = {}
+                for name, (var, dims, shape, kind) in templates.items():
+                    block = np.zeros((b1 - b0,) + shape, dtype=var.dtype)
+                    for rank, nc in ncs.items():
+                        block[:, maps[rank][kind]] = nc.variables[name][b0:b1]
+                    blocks[name] = block
+                if out is not None:
+                    out.variables['time'][b0 - t0:b1 - t0] = time_var[b0:b1]
+                    for name, block in blocks.items():
+                        out.variables[name][b0 - t0:b1 - t0] = block
+                else:
+                    _write_zarr(tmp, b0 - t0, time_var[b0:b1], time_var, blocks,
+                                {n: t[:3] for n, t in templates.items()}, geometry)
+        finally:
+            if out is not None:
+                out.close()
+    finally:
+        for nc in ncs.values():
+            nc.close()
+
+    if os.path.isdir(output):
+        shutil.rmtree(output)
+    os.replace(tmp, output)
+    print(f"Stack {stack}: wrote {t1 - t0} records of {', '.join(variables)} to {output}")
+    return output
+
+if __name__ == "__main__":
+    parser = add_parallel_args(argparse.ArgumentParser(description="Combine per-rank SCHISM outputs"))
+    parser.add_argument('-b', '--begin', type=int, required=True, help="first stack")
+    parser.add_argument('-e', '--end', type=int, required=True, help="last stack")
+    parser.add_argument('-v', '--variables', default='elev', help="comma-separated variables to combine")
+    parser.add_argument('-o', '--output', default='schout_elev', help="output prefix")
+    parser.add_argument('--dir', default='.', help="directory with the per-rank outputs and local_to_global_*")
+    parser.add_argument('--prefix', default='schout', help="per-rank file prefix (<prefix>_<rank>_<stack>.nc)")
+    parser.add_argument('--hgrid', help="hgrid.gr3/hgrid.ll for geometry (default: from the per-rank files)")
+    parser.add_argument('--start-date', help="first time to combine (e.g. 2012-10-28T00:00)")
+    parser.add_argument('--end-date', help="last time to combine")
+    parser.add_argument('--block-time', type=int, default=DEFAULT_BLOCK_TIME, help="time records per write")
+    parser.add_argument('--format', choices=['netcdf', 'zarr'], default='netcdf', help="output format")
+    parser.add_argument('--complevel', type=int, default=4, help="zlib compression level (0 disables)")
+    args = parser.parse_args()
+
+    sizes, maps = read_all_local_to_global(args.dir)
+    print(f"{len(maps)} ranks, {sizes['node']} nodes, {sizes['elem']} elements")
+
+    # Stacks are independent, so they can be split across tasks and processes
+    stacks = list(range(args.begin, args.end + 1))
+    stacks = stacks[len(stacks) * args.task_id // args.ntasks:len(stacks) * (args.task_id + 1) // args.ntasks]
+    combine = partial(combine_stack, variables=args.variables.split(','), output_prefix=args.output,
+                      sizes=sizes, maps=maps, directory=args.dir, prefix=args.prefix, hgrid_path=args.hgrid,
+                      start_date=args.start_date, end_date=args.end_date, block_time=args.block_time,
+                      fmt=args.format, zlib=args.complevel > 0, complevel=args.complevel, overwrite=args.overwrite)
+    if args.nprocs <= 1:
+        outputs = [combine(stack) for stack in stacks]
+    else:
+        with Pool(args.nprocs) as pool:
+            outputs = pool.map(combine, stacks, chunksize=1)
+
+    print(f"Combined {sum(o is not None for o in outputs)} of {len(stacks)} stacks.")
@@ -0,0 +1,233 @@
+"""
+Model-to-model comparison of two SCHISM runs (e.g. UFS-Coastal build vs standalone reference).
+Output flavors are matched automatically (out2d_N.nc 'elevation' vs schout_N.nc 'elev'), the
+runs are compared on their common output times, and per-node bias, RMSE and maximum absolute
+difference plus a per-time statistics table are accumulated over time blocks in parallel.
+Writes a difference-map NetCDF (with the mesh), a CSV table, optional PNG maps, and exits
+non-zero when --tolerance is exceeded, so a regression check is one command.
+Usage: python compare_runs.py REFERENCE_DIR TEST_DIR --var elevation --tolerance 1e-3
+"""
+
+import os
+import sys
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+from netCDF4 import Dataset
+
+from mesh_plot import read_output_faces
+from schism_stacks import discover_stacks, open_stacks
+
+# Output flavors tried in order when a run directory is given without a prefix
+PREFIXES = ['out2d', 'schout_elev', 'schout', 'schout_wind']
+
+# Names of the same quantity in the different output flavors; a tuple names the X/Y component
+# variables of a vector (out2d), compared as the vector magnitude like schout's 2-component ones
+VARIABLE_ALIASES = {
+    'elevation': ['elevation', 'elev'],
+    'wind_speed': [('windSpeedX', 'windSpeedY'), 'wind_speed'],
+    'depth_averaged_velocity': [('depthAverageVelX', 'depthAverageVelY'), 'dahv'],
+    'significant_wave_height': ['sigWaveHeight', 'WWM_1'],
+}
+
+# Common records compared per task
+DEFAULT_BLOCK_TIME = 96
+
+def resolve_run(directory, var, prefix=None):
+    """
+    Find the stack prefix and variable name of var in a run directory.
+
+    :param var: Canonical name (key of VARIABLE_ALIASES) or a literal output variable name
+    :return: (prefix, variable name or (X, Y) component names)
+    """
+    names = VARIABLE_ALIASES.get(var, [var])
+    for candidate in [prefix] if prefix else PREFIXES:
+        stacks = discover_stacks(candidate, directory)
+        if not stacks:
+            continue
+        with Dataset(stacks[0], 'r') as nc:
+            for name in names:
+                if all(component in nc.variables for component in np.atleast_1d(name)):
+                    return candidate, name
+    raise ValueError(f"No {' / '.join(_label(name) for name in names)} in {directory} ({prefix or ', '.join(PREFIXES)} stacks)")
+
+def _label(name):
+    """Printable variable name ('windSpeedX/windSpeedY' for a component pair)."""
+    return name if isinstance(name, str) else '/'.join(name)
+
+def align_times(ref_times, test_times):
+    """Record indexes of the common output times of two runs."""
+    common, ref_index, test_index = np.intersect1d(ref_times.values, test_times.values, return_indices=True)
+    if len(common) == 0:
+        raise ValueError(f"No common output times: {ref_times[0]}..{ref_times[-1]} vs {test_times[0]}..{test_times[-1]}")
+    return pd.DatetimeIndex(common), ref_index, test_index
+
+def _read_records(dataset, var, index):
+    """
+    Read the given (sorted) global records as one contiguous span; vectors (2-component
+    variables or an (X, Y) pair of variables) are read as their magnitude.
+    """
+    span = slice(int(index[0]), int(index[-1]) + 1)
+    if isinstance(var, str):
+        values = dataset.read(var, time=span)
+    else:
+        values = np.stack([dataset.read(component, time=span) for component in var], axis=-1)
+    values = values[index - index[0]]
+    if values.ndim == 3:
+        values = np.sqrt((values ** 2).sum(axis=-1))
+    return values
+
+def block_difference(ref, test, ref_index, test_index):
+    """
+    Difference statistics of one block of common records (runs in a worker process).
+
+    :param ref, test: (directory, prefix, var) of each run
+    :return: dict of per-node sums and per-time statistics; 'nonfinite' counts the values that
+             are NaN/inf in exactly one run (e.g. a blown-up test run), which cannot be differenced
+    """
+    ref_values = _read_records(open_stacks(ref[1], ref[0]), ref[2], ref_index)
+    test_values = _read_records(open_stacks(test[1], test[0]), test[2], test_index)
+    diff = test_values - ref_values
+    finite = np.isfinite(diff)
+    nonfinite = np.isfinite(ref_values) != np.isfinite(test_values)
+    diff0 = np.where(finite, diff, 0)
+    count_t = finite.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return {
+            'sum': diff0.sum(axis=0), 'sum2': (diff0 ** 2).sum(axis=0), 'count': finite.sum(axis=0),
+            'maxabs': np.abs(diff0).max(axis=0), 'nonfinite': nonfinite.sum(axis=0),
+            'table': np.column_stack([diff0.sum(axis=1) / count_t, np.sqrt((diff0 ** 2).sum(axis=1) / count_t),
+                                      np.abs(diff0).max(axis=1), count_t, nonfinite.sum(axis=1)]),
+        }
+
+def _block_task(task):
+    return block_difference(*task)
+
+def compare_runs(ref, test, var, block_time=DEFAULT_BLOCK_TIME, nprocs=1):
+    """
+    Compare var between two runs on their common output times.
+
+    :param ref, test: (directory, prefix or None) of each run
+    :return: (per-node DataFrame with bias/rmse/max_abs_diff/count/nonfinite, per-time DataFrame, (x, y, faces))
+    """
+    runs = []
+    for directory, prefix in (ref, test):
+        prefix, name = resolve_run(directory, var, prefix)
+        runs.append((directory, prefix, name))
+    ref_ds, test_ds = (open_stacks(prefix, directory) for directory, prefix, _ in runs)
+    if ref_ds.nnodes != test_ds.nnodes:
+        raise ValueError(f"Runs are on different meshes ({ref_ds.nnodes} vs {test_ds.nnodes} nodes)")
+    times, ref_index, test_index = align_times(ref_ds.times, test_ds.times)
+    print(f"Comparing {_label(runs[1][2])} ({runs[1][0]}) with {_label(runs[0][2])} ({runs[0][0]}) at {len(times)} common times")
+
+    tasks = [(runs[0], runs[1], ref_index[t0:t0 + block_time], test_index[t0:t0 + block_time])
+             for t0 in range(0, len(times), block_time)]
+    if nprocs <= 1:
+        blocks = [block_difference(*task) for task in tasks]
+    else:
+        with Pool(nprocs) as pool:
+            blocks = pool.map(_block_task, tasks, chunksize=1)
+
+    total = sum(block['sum'] for block in blocks)
+    total2 = sum(block['sum2'] for block in blocks)
+    count = sum(block['count'] for block in blocks)
+    maxabs = np.max([block['maxabs'] for block in blocks], axis=0)
+    nonfinite = sum(block['nonfinite'] for block in blocks)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        nodes = pd.DataFrame({'bias': total / count, 'rmse': np.sqrt(total2 / count),
+                              'max_abs_diff': np.where(count > 0, maxabs, np.nan), 'count': count,
+                              'nonfinite': nonfinite})
+    table = pd.DataFrame(np.concatenate([block['table'] for block in blocks]), index=times.rename('time'),
+                         columns=['bias', 'rmse', 'max_abs_diff', 'count', 'nonfinite'])
+    x, y = ref_ds.coords
+    return nodes, table, (x, y, read_output_faces(ref_ds.files[0]))
+
+def write_difference_maps(output, nodes, mesh, attrs):
+    """Write per-node bias/RMSE/max |diff| with the mesh, for mesh_plot."""
+    x, y, faces = mesh
+    with Dataset(output, 'w', format='NETCDF4') as nc:
+        nc.createDimension('nSCHISM_hgrid_node', len(x))
+        nc.createVariable('SCHISM_hgrid_node_x', 'f8', ('nSCHISM_hgrid_node',))[:] = x
+        nc.createVariable('SCHISM_hgrid_node_y', 'f8', ('nSCHISM_hgrid_node',))[:] = y
+        if faces is not None:
+            nc.createDimension('nSCHISM_hgrid_face', len(faces))
+            nc.createDimension('nMaxSCHISM_hgrid_face_nodes', faces.shape[1])
+            face_nodes = nc.createVariable('SCHISM_hgrid_face_nodes', 'i4',
+                                           ('nSCHISM_hgrid_face', 'nMaxSCHISM_hgrid_face_nodes'), fill_value=-1)
+            face_nodes.start_index = 1
+            face_nodes[:] = np.where(faces >= 0, faces + 1, -1)
+        for name in ('bias', 'rmse', 'max_abs_diff'):
+            nc.createVariable(name, 'f8', ('nSCHISM_hgrid_node',), zlib=True, fill_value=np.nan)[:] = nodes[name].values
+        nonfinite = nc.createVariable('nonfinite', 'i4', ('nSCHISM_hgrid_node',), zlib=True)
+        nonfinite.long_name = "records that are NaN/inf in exactly one run"
+        nonfinite[:] = nodes['nonfinite'].values
+        nc.setncatts(attrs)
+
+def plot_difference_maps(prefix, nodes, mesh):
+    """Save <prefix>_bias.png and <prefix>_rmse.png on the model mesh."""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.tri as mtri
+    from mesh_plot import split_faces, mask_dry
+    x, y, faces = mesh
+    if faces is None:
+        print("No SCHISM_hgrid_face_nodes in the outputs, skipping PNG maps")
+        return
+    triangulation = mtri.Triangulation(x, y, split_faces(faces))
+    for name, cmap in (('bias', 'RdBu_r'), ('rmse', 'viridis')):
+        values = nodes[name].values
+        limit = np.nanmax(np.abs(values)) or 1.0
+        levels = np.linspace(-limit, limit, 41) if name == 'bias' else np.linspace(0, limit, 41)
+        fig, ax = plt.subplots(figsize=(10, 8))
+        cf = ax.tricontourf(mask_dry(triangulation, values), values, levels=levels, cmap=cmap)
+        fig.colorbar(cf, ax=ax, label=name)
+        ax.set_title(f"{name} (test - reference)")
+        ax.set_aspect('equal')
+        fig.savefig(f'{prefix}_{name}.png', dpi=150, bbox_inches='tight')
+        plt.close(fig)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare a SCHISM run against a reference run")
+    parser.add_argument('reference', help="reference run output directory")
+    parser.add_argument('test', help="run output directory to check")
+    parser.add_argument('--var', default='elevation', help=f"variable ({', '.join(VARIABLE_ALIASES)} or an output name)")
+    parser.add_argument('--ref-prefix', help="stack prefix of the reference run (default: auto)")
+    parser.add_argument('--test-prefix', help="stack prefix of the test run (default: auto)")
+    parser.add_argument('--block-time', type=int, default=DEFAULT_BLOCK_TIME, help="common records per task")
+    parser.add_argument('--nprocs', type=int, default=int(os.environ.get('SLURM_CPUS_PER_TASK', 1)),
+                        help="worker processes")
+    parser.add_argument('-o', '--output', default='compare', help="output prefix (.nc maps, _times.csv table)")
+    parser.add_argument('--plot', action='store_true', help="also save bias/RMSE PNG maps")
+    parser.add_argument('--tolerance', type=float,
+                        help="fail if any |test - reference| exceeds this or a value is NaN/inf in only one run")
+    args = parser.parse_args()
+
+    nodes, table, mesh = compare_runs((args.reference, args.ref_prefix), (args.test, args.test_prefix), args.var,
+                                      args.block_time, args.nprocs)
+    write_difference_maps(f'{args.output}.nc', nodes, mesh,
+                          {'reference': os.path.abspath(args.reference), 'test': os.path.abspath(args.test),
+                           'variable': args.var, 'history': "Created by compare_runs.py"})
+    table.to_csv(f'{args.output}_times.csv')
+    if args.plot:
+        plot_difference_maps(args.output, nodes, mesh)
+
+    valid = nodes['count'] > 0
+    overall_bias = nodes['bias'][valid].mul(nodes['count'][valid]).sum() / nodes['count'][valid].sum()
+    overall_rmse = np.sqrt((nodes['rmse'][valid] ** 2).mul(nodes['count'][valid]).sum() / nodes['count'][valid].sum())
+    max_abs = nodes['max_abs_diff'].max()
+    nonfinite = int(nodes['nonfinite'].sum())
+    print(f"bias {overall_bias:.6g}, RMSE {overall_rmse:.6g}, max |diff| {max_abs:.6g} "
+          f"over {len(table)} times and {int(valid.sum())} nodes")
+    print(f"NaN/inf in only one run: {nonfinite} values at {int((nodes['nonfinite'] > 0).sum())} nodes")
+    print(f"Difference maps written to {args.output}.nc, statistics table to {args.output}_times.csv")
+
+    if args.tolerance is not None:
+        # NaN max |diff| means nothing could be compared; never let that pass
+        if nonfinite or np.isnan(max_abs) or max_abs > args.tolerance:
+            print(f"FAIL: max |diff| {max_abs:.6g} (tolerance {args.tolerance:g}), "
+                  f"{nonfinite} values NaN/inf in only one run")
+            sys.exit(1)
+        print(f"PASS: max |diff| within tolerance {args.tolerance:g}")
@@ -0,0 +1,150 @@
+"""
+Time series at stations (e.g. the Duck FRF pier gauge) from all stacks of a SCHISM output.
+Each station is located once in its containing mesh triangle (KD-tree over triangle centroids,
+then a barycentric containment test) and the resulting (nstations, nnodes) interpolation
+matrix is cached on disk. Extraction then reads only the 3 nodes per station from each stack,
+for all stations in one pass, instead of whole elevation arrays.
+Usage: python extract_stations.py --prefix out2d --var elevation --stations stations.txt -o stations.csv
+"""
+
+import os
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from mesh_plot import read_output_faces, read_hgrid_faces, split_faces
+from schism_stacks import StackDataset
+
+# Default station: NOAA 8651370 Duck, NC (FRF pier)
+DUCK_FRF_PIER = ('duck_frf_pier', -75.7467, 36.1833)
+
+# Candidate triangles tested per station (nearest centroids)
+CANDIDATES = 16
+
+def read_stations(path):
+    """Read 'name lon lat' lines (# starts a comment) into a list of (name, lon, lat)."""
+    stations = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#')[0].strip()
+            if line:
+                name, lon, lat = line.split()[:3]
+                stations.append((name, float(lon), float(lat)))
+    return stations
+
+def _key(x, y, triangles, px, py):
+    h = hashlib.sha1()
+    for array in (x, y, px, py):
+        h.update(np.ascontiguousarray(array, dtype='f8').tobytes())
+    h.update(np.ascontiguousarray(triangles, dtype=np.int64).tobytes())
+    return h.hexdigest()[:16]
+
+def locate_points(x, y, triangles, px, py, candidates=CANDIDATES):
+    """
+    Find the containing triangle of each point and its barycentric weights.
+
+    :param x, y: Node coordinates
+    :param triangles: (ntri, 3) 0-based node indexes
+    :param px, py: Point coordinates
+    :return: CSR matrix (npoints, nnodes); rows of points outside the mesh are empty
+    """
+    triangles = np.asarray(triangles, dtype=np.int64)
+    points = np.column_stack([px, py])
+    centroids = np.column_stack([x[triangles].mean(axis=1), y[triangles].mean(axis=1)])
+    _, candidate = cKDTree(centroids).query(points, k=min(candidates, len(triangles)))
+    candidate = candidate.reshape(len(points), -1)
+
+    # Barycentric coordinates of every point in each of its candidate triangles
+    tri = triangles[candidate]                      # (npoints, k, 3)
+    x0, y0 = x[tri[..., 0]], y[tri[..., 0]]
+    x1, y1 = x[tri[..., 1]], y[tri[..., 1]]
+    x2, y2 = x[tri[..., 2]], y[tri[..., 2]]
+    det = (y1 - y2) * (x0 - x2) + (x2 - x1) * (y0 - y2)
+    dx, dy = points[:, 0:1] - x2, points[:, 1:2] - y2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        b0 = ((y1 - y2) * dx + (x2 - x1) * dy) / det
+        b1 = ((y2 - y0) * dx + (x0 - x2) * dy) / det
+    bary = np.stack([b0, b1, 1 - b0 - b1], axis=-1)
+    inside = (bary >= -1e-9).all(axis=-1) & np.isfinite(bary).all(axis=-1)
+
+    found = inside.any(axis=1)
+    first = inside.argmax(axis=1)
+    rows = np.repeat(np.nonzero(found)[0], 3)
+    cols = tri[found, first[found]].ravel()
+    weights = bary[found, first[found]].ravel()
+    return sparse.csr_matrix((weights, (rows, cols)), shape=(len(points), len(x)))
+
+def station_weights(x, y, triangles, px, py, cache_dir='.station_cache'):
+    """Interpolation matrix for the stations, from the disk cache or built fresh."""
+    key = _key(x, y, triangles, px, py)
+    cache_path = None if cache_dir is None else os.path.join(cache_dir, f'stations_{key}.npz')
+    if cache_path is not None and os.path.exists(cache_path):
+        return sparse.load_npz(cache_path)
+    weights = locate_points(x, y, triangles, px, py)
+    if cache_path is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        sparse.save_npz(cache_path, weights)
+    return weights
+
+def extract_stations(dataset, var, stations, time=None, hgrid_path=None, cache_dir='.station_cache'):
+    """
+    Interpolated time series of var at each station.
+
+    :param dataset: schism_stacks.StackDataset
+    :param stations: List of (name, lon, lat)
+    :param time: Time selection (see StackDataset.time_range)
+    :param hgrid_path: hgrid.gr3 for connectivity if the outputs lack SCHISM_hgrid_face_nodes
+    :return: DataFrame indexed by time with one column per station (NaN outside the mesh)
+    """
+    x, y = dataset.coords
+    faces = read_output_faces(dataset.files[0])
+    if faces is None:
+        if hgrid_path is None:
+            raise ValueError(f"{dataset.files[0]} has no SCHISM_hgrid_face_nodes; pass hgrid_path")
+        faces = read_hgrid_faces(hgrid_path)
+    names = [name for name, _, _ in stations]
+    px = np.array([lon for _, lon, _ in stations])
+    py = np.array([lat for _, _, lat in stations])
+    weights = station_weights(x, y, split_faces(faces), px, py, cache_dir)
+
+    outside = np.diff(weights.indptr) == 0
+    for name in np.array(names)[outside]:
+        print(f"Warning: station {name} is outside the mesh")
+
+    # Read only the nodes the stations need, then interpolate all stations at once
+    nodes = np.unique(weights.indices)
+    columns = weights[:, nodes]
+    if len(nodes):
+        values = dataset.read(var, time=time, nodes=nodes)
+        series = columns.dot(values.T).T
+    else:
+        t0, t1 = dataset.time_range(time)
+        series = np.zeros((t1 - t0, len(stations)))
+    series[:, outside] = np.nan
+
+    t0, t1 = dataset.time_range(time)
+    return pd.DataFrame(series, index=dataset.times[t0:t1].rename('time'), columns=names)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Extract station time series from SCHISM outputs")
+    parser.add_argument('--prefix', default='out2d', help="output stack prefix (<prefix>_N.nc)")
+    parser.add_argument('--dir', default='.', help="directory with the output stacks")
+    parser.add_argument('--var', default='elevation', help="variable to extract")
+    parser.add_argument('--stations', help="'name lon lat' station list (default: Duck FRF pier)")
+    parser.add_argument('--start-date', help="first time to extract")
+    parser.add_argument('--end-date', help="last time to extract")
+    parser.add_argument('--hgrid', help="hgrid.gr3 for element connectivity if outputs lack SCHISM_hgrid_face_nodes")
+    parser.add_argument('--cache-dir', default='.station_cache', help="station locator cache")
+    parser.add_argument('-o', '--output', default='stations.csv', help="output CSV")
+    args = parser.parse_args()
+
+    stations = read_stations(args.stations) if args.stations else [DUCK_FRF_PIER]
+    with StackDataset(args.prefix, args.dir) as dataset:
+        result = extract_stations(dataset, args.var, stations, time=slice(args.start_date, args.end_date),
+                                  hgrid_path=args.hgrid, cache_dir=args.cache_dir)
+    result.to_csv(args.output)
+    print(f"Wrote {len(result)} records for {len(stations)} stations to {args.output}")
@@ -0,0 +1,69 @@
+"""
+Figure pipeline that builds the map figure once and only swaps the data artists per frame.
+The projection, extent, gridlines, colorbar, labels and title object are created by a
+script-specific setup() on the first frame; draw() then adds the frame's contour/tripcolor
+artists, which are removed again before the next frame. Frames can be saved as PNGs or
+streamed straight into an MP4/GIF writer.
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+from matplotlib import animation
+
+class FrameRenderer:
+    """
+    Reusable figure for a sequence of frames.
+
+    setup(frame) -> dict with at least 'fig'; holds the static figure state
+    draw(state, frame) -> list of artists to remove before the next frame
+    """
+
+    def __init__(self, setup, draw, dpi=300):
+        self.setup = setup
+        self.draw = draw
+        self.dpi = dpi
+        self.state = None
+        self.artists = []
+        self.writer = None
+        self.movie_file = None
+        self.movie_started = False
+
+    def render(self, frame):
+        """Draw frame into the (possibly newly built) figure."""
+        if self.state is None:
+            self.state = self.setup(frame)
+        for artist in self.artists:
+            artist.remove()
+        self.artists = self.draw(self.state, frame)
+
+    def save(self, output_file):
+        """Save the current frame atomically as a PNG."""
+        tmp = f"{output_file}.part"
+        self.state['fig'].savefig(tmp, dpi=self.dpi, bbox_inches='tight', format='png')
+        os.replace(tmp, output_file)
+
+    def start_movie(self, output_file, fps=4):
+        """Stream subsequent frames into an MP4 (ffmpeg) or GIF (Pillow) file."""
+        if output_file.lower().endswith('.gif'):
+            self.writer = animation.PillowWriter(fps=fps)
+        else:
+            self.writer = animation.FFMpegWriter(fps=fps)
+        self.movie_file = output_file
+
+    def grab(self):
+        """Append the current frame to the movie."""
+        if not self.movie_started:
+            self.writer.setup(self.state['fig'], self.movie_file, dpi=self.dpi)
+            self.movie_started = True
+        self.writer.grab_frame()
+
+    def finish(self):
+        """Finish the movie (if any) and close the figure."""
+        if self.movie_started:
+            self.writer.finish()
+            self.movie_started = False
+        if self.state is not None:
+            plt.close(self.state['fig'])
+        self.state = None
+        self.artists = []
@@ -0,0 +1,76 @@
+"""
+Native triangular-mesh plotting for SCHISM outputs.
+Builds one matplotlib.tri.Triangulation from the model's own element connectivity
+(SCHISM_hgrid_face_nodes in the output file, or the elements of hgrid.gr3) and reuses it for
+every frame and variable, so plots keep the real mesh resolution without regridding to a
+raster or re-running a Delaunay triangulation.
+"""
+
+import numpy as np
+import matplotlib.tri as mtri
+from netCDF4 import Dataset
+
+from repo_modules import repo_module
+
+# Triangulations keyed by node count; all output files of a run share one mesh
+_TRIANGULATIONS = {}
+
+def split_faces(faces):
+    """
+    Split 0-based SCHISM faces (nface, 3 or 4; -1 marks a missing 4th node) into triangles.
+    """
+    faces = np.asarray(faces, dtype=np.int64)
+    tri = faces[:, :3]
+    if faces.shape[1] < 4:
+        return tri
+    quads = faces[faces[:, 3] >= 0]
+    return np.concatenate([tri, quads[:, [0, 2, 3]]])
+
+def read_output_faces(file_path):
+    """0-based face nodes from an output file, or None if it has no connectivity."""
+    with Dataset(file_path, 'r') as nc:
+        if 'SCHISM_hgrid_face_nodes' not in nc.variables:
+            return None
+        var = nc.variables['SCHISM_hgrid_face_nodes']
+        var.set_auto_mask(False)
+        faces = np.asarray(var[:], dtype=np.int64)
+        fill = getattr(var, '_FillValue', None)
+        start_index = int(getattr(var, 'start_index', 1))
+    if fill is not None:
+        faces[faces == fill] = start_index - 1
+    faces = faces - start_index
+    faces[faces < 0] = -1
+    return faces
+
+def read_hgrid_faces(hgrid_path):
+    """0-based elements from hgrid.gr3 via the cached reader in the repository root."""
+    return np.asarray(repo_module('hgrid_reader').read_hgrid(hgrid_path).elements)
+
+def get_triangulation(frame, hgrid_path=None):
+    """
+    Return the Triangulation for a frame's mesh, building it once per process.
+
+    :param frame: schism_frames.Frame (x, y and the file to read connectivity from)
+    :param hgrid_path: hgrid.gr3 to use when the output file has no SCHISM_hgrid_face_nodes
+    """
+    nnodes = len(frame.x)
+    if nnodes not in _TRIANGULATIONS:
+        faces = read_output_faces(frame.file_path)
+        if faces is None:
+            if hgrid_path is None:
+                raise ValueError(f"{frame.file_path} has no SCHISM_hgrid_face_nodes; pass hgrid_path")
+            faces = read_hgrid_faces(hgrid_path)
+        _TRIANGULATIONS[nnodes] = mtri.Triangulation(frame.x, frame.y, split_faces(faces))
+    return _TRIANGULATIONS[nnodes]
+
+def mask_dry(triangulation, values):
+    """
+    Mask triangles touching non-finite (dry/fill) node values so tricontourf accepts them.
+    The mask is reset for every frame since the shared triangulation is reused.
+    """
+    bad = ~np.isfinite(values)
+    if bad.any():
+        triangulation.set_mask(bad[triangulation.triangles].any(axis=1))
+    elif triangulation.mask is not None:
+        triangulation.set_mask(None)
+    return triangulation
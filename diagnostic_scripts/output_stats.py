@@ -0,0 +1,159 @@
+"""
+One-pass running statistics over all stacks of a SCHISM run (e.g. peak surge for Sandy).
+Per node: maximum, time of maximum, minimum and mean of each requested variable (vector
+variables such as wind_speed are reduced as magnitudes). Time blocks are reduced in parallel
+and merged as they arrive, so memory stays at a few node-sized arrays per variable regardless
+of the run length. The result is one summary NetCDF with the mesh, ready for mesh_plot.
+Usage: python output_stats.py --input schout_elev:elev --input schout_wind:wind_speed -o run_stats.nc
+"""
+
+import os
+import argparse
+from multiprocessing import Pool
+
+import numpy as np
+from netCDF4 import Dataset
+
+from mesh_plot import read_output_faces
+from schism_stacks import StackDataset, open_stacks
+
+# Time records reduced per task
+DEFAULT_BLOCK_TIME = 96
+
+class RunningStats:
+    """Per-node max, record of max, min, sum and count of finite values."""
+
+    def __init__(self, nnodes):
+        self.max = np.full(nnodes, -np.inf)
+        self.argmax = np.full(nnodes, -1, dtype=np.int64)
+        self.min = np.full(nnodes, np.inf)
+        self.sum = np.zeros(nnodes)
+        self.count = np.zeros(nnodes, dtype=np.int64)
+
+    def update(self, values, t0):
+        """Add a (ntime, nnodes) block whose first record is global record t0."""
+        finite = np.isfinite(values)
+        high = np.where(finite, values, -np.inf)
+        block_arg = high.argmax(axis=0)
+        block_max = np.take_along_axis(high, block_arg[None], axis=0)[0]
+        self.merge_max(block_max, block_arg + t0)
+        self.min = np.minimum(self.min, np.where(finite, values, np.inf).min(axis=0))
+        self.sum += np.where(finite, values, 0).sum(axis=0)
+        self.count += finite.sum(axis=0)
+        return self
+
+    def merge_max(self, other_max, other_arg):
+        # Ties keep the earliest record
+        better = (other_max > self.max) | ((other_max == self.max) & (other_arg < self.argmax) & (other_arg >= 0))
+        better &= np.isfinite(other_max)
+        self.max = np.where(better, other_max, self.max)
+        self.argmax = np.where(better, other_arg, self.argmax)
+
+    def merge(self, other):
+        """Combine with the statistics of another block."""
+        self.merge_max(other.max, other.argmax)
+        self.min = np.minimum(self.min, other.min)
+        self.sum += other.sum
+        self.count += other.count
+        return self
+
+    @property
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.count > 0, self.sum / self.count, np.nan)
+
+def node_values(values):
+    """Scalar per-node values; (time, node, 2) vectors become magnitudes."""
+    if values.ndim == 3:
+        return np.sqrt((values ** 2).sum(axis=-1))
+    return values
+
+def block_stats(prefix, directory, var, t0, t1):
+    """Statistics of records [t0, t1) of one variable (runs in a worker process)."""
+    dataset = open_stacks(prefix, directory)
+    values = node_values(dataset.read(var, time=slice(t0, t1)))
+    return RunningStats(values.shape[1]).update(values, t0)
+
+def _block_task(task):
+    return block_stats(*task)
+
+def reduce_variable(prefix, var, directory='.', block_time=DEFAULT_BLOCK_TIME, nprocs=1):
+    """
+    Reduce one variable over every record of a stack series.
+
+    :return: (RunningStats, StackDataset)
+    """
+    dataset = StackDataset(prefix, directory)
+    blocks = [(t0, min(t0 + block_time, len(dataset))) for t0 in range(0, len(dataset), block_time)]
+    tasks = [(prefix, directory, var, t0, t1) for t0, t1 in blocks]
+    stats = RunningStats(dataset.nnodes)
+    if nprocs <= 1:
+        for task in tasks:
+            stats.merge(block_stats(*task))
+    else:
+        with Pool(nprocs) as pool:
+            # Blocks are merged as they finish, so only a few partial results are held at once
+            for block in pool.imap_unordered(_block_task, tasks):
+                stats.merge(block)
+    return stats, dataset
+
+def write_stats(output, results):
+    """
+    Write the summary NetCDF.
+
+    :param results: List of (var, RunningStats, StackDataset)
+    """
+    _, _, first = results[0]
+    x, y = first.coords
+    faces = read_output_faces(first.files[0])
+    reference = first.times[0]
+    units = f"seconds since {reference:%Y-%m-%d %H:%M:%S}"
+
+    with Dataset(output, 'w', format='NETCDF4') as nc:
+        nc.createDimension('nSCHISM_hgrid_node', len(x))
+        nc.createVariable('SCHISM_hgrid_node_x', 'f8', ('nSCHISM_hgrid_node',))[:] = x
+        nc.createVariable('SCHISM_hgrid_node_y', 'f8', ('nSCHISM_hgrid_node',))[:] = y
+        if faces is not None:
+            nc.createDimension('nSCHISM_hgrid_face', len(faces))
+            nc.createDimension('nMaxSCHISM_hgrid_face_nodes', faces.shape[1])
+            face_nodes = nc.createVariable('SCHISM_hgrid_face_nodes', 'i4',
+                                           ('nSCHISM_hgrid_face', 'nMaxSCHISM_hgrid_face_nodes'), fill_value=-1)
+            face_nodes.start_index = 1
+            face_nodes[:] = np.where(faces >= 0, faces + 1, -1)
+
+        for var, stats, dataset in results:
+            if dataset.nnodes != len(x):
+                raise ValueError(f"{var} is on a different mesh ({dataset.nnodes} vs {len(x)} nodes)")
+            have = stats.count > 0
+            seconds = np.full(len(x), np.nan)
+            seconds[have] = (dataset.times[stats.argmax[have]] - reference).total_seconds()
+            fields = {'max': np.where(have, stats.max, np.nan), 'min': np.where(have, stats.min, np.nan),
+                      'mean': stats.mean, 'time_of_max': seconds}
+            for name, values in fields.items():
+                out = nc.createVariable(f'{var}_{name}', 'f8', ('nSCHISM_hgrid_node',), zlib=True,
+                                        fill_value=np.nan)
+                out[:] = values
+                if name == 'time_of_max':
+                    out.units = units
+            nc.variables[f'{var}_max'].long_name = f"maximum of {var} over {dataset.times[0]} to {dataset.times[-1]}"
+        nc.history = "Created by output_stats.py"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-node max/min/mean over all SCHISM output stacks")
+    parser.add_argument('--input', action='append',
+                        help="PREFIX:VAR to reduce (repeatable, default: schout_elev:elev)")
+    parser.add_argument('--dir', default='.', help="directory with the output stacks")
+    parser.add_argument('--block-time', type=int, default=DEFAULT_BLOCK_TIME, help="time records per task")
+    parser.add_argument('--nprocs', type=int, default=int(os.environ.get('SLURM_CPUS_PER_TASK', 1)),
+                        help="worker processes")
+    parser.add_argument('-o', '--output', default='run_stats.nc', help="summary NetCDF")
+    args = parser.parse_args()
+
+    results = []
+    for spec in args.input or ['schout_elev:elev']:
+        prefix, var = spec.split(':')
+        stats, dataset = reduce_variable(prefix, var, args.dir, args.block_time, args.nprocs)
+        print(f"{var}: {len(dataset)} records, max {np.nanmax(np.where(stats.count > 0, stats.max, np.nan)):.3f}")
+        results.append((var, stats, dataset))
+    write_stats(args.output, results)
+    print(f"Summary written to {args.output}")
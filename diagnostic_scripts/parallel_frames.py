@@ -0,0 +1,68 @@
+"""
+Parallel, resumable frame rendering for the map plotting scripts.
+Frames (file, time step) are split across SLURM tasks (--task-id/--ntasks, e.g. an srun task
+array) and then, in per-file jobs that open each file once, across a local process pool.
+Frames whose PNG already exists are skipped; frame_renderer writes PNGs through a temporary
+file so an interrupted job never leaves a truncated image.
+"""
+
+import os
+from multiprocessing import Pool
+
+# Frames rendered per job (one file open per job)
+DEFAULT_FRAMES_PER_JOB = 24
+
+def add_parallel_args(parser):
+    """Add --nprocs/--task-id/--ntasks/--overwrite, defaulting to the SLURM environment."""
+    parser.add_argument('--nprocs', type=int, default=int(os.environ.get('SLURM_CPUS_PER_TASK', 1)),
+                        help="worker processes per task")
+    parser.add_argument('--task-id', type=int,
+                        default=int(os.environ.get('SLURM_ARRAY_TASK_ID', os.environ.get('SLURM_PROCID', 0))),
+                        help="index of this task when frames are split across tasks")
+    parser.add_argument('--ntasks', type=int,
+                        default=int(os.environ.get('SLURM_ARRAY_TASK_COUNT', os.environ.get('SLURM_NTASKS', 1))),
+                        help="number of tasks the frames are split across")
+    parser.add_argument('--overwrite', action='store_true', help="re-render frames whose PNG already exists")
+    return parser
+
+def group_frames(frames, frames_per_job):
+    """
+    Group consecutive frames of the same file into jobs of at most frames_per_job, so each
+    job opens its file once: (file_index, file_path, [(time_index, time_value), ...]).
+    """
+    jobs = []
+    for frame in frames:
+        file_index, file_path, time_index, time_value = frame
+        if not jobs or jobs[-1][1] != file_path or len(jobs[-1][2]) >= frames_per_job:
+            jobs.append((file_index, file_path, []))
+        jobs[-1][2].append((time_index, time_value))
+    return jobs
+
+def run_frames(render_job, frames, output_path, nprocs=1, task_id=0, ntasks=1, overwrite=False,
+               frames_per_job=DEFAULT_FRAMES_PER_JOB):
+    """
+    Render this task's share of frames, skipping frames whose output already exists.
+
+    :param render_job: module-level callable taking (file_index, file_path, steps) where steps
+                       is a list of (time_index, time_value) to render from that file
+    :param frames: list of (file_index, file_path, time_index, time_value) from StackDataset.frames()
+    :param output_path: callable mapping a frame tuple to its PNG path
+    :param frames_per_job: Maximum frames rendered per file open
+    :return: number of frames rendered by this task
+    """
+    # Contiguous share per task keeps each file's frames together
+    start = len(frames) * task_id // ntasks
+    stop = len(frames) * (task_id + 1) // ntasks
+    frames = frames[start:stop]
+    if not overwrite:
+        frames = [frame for frame in frames if not os.path.exists(output_path(*frame))]
+    jobs = group_frames(frames, frames_per_job)
+    print(f"Task {task_id}/{ntasks}: rendering {len(frames)} frames in {len(jobs)} jobs with {nprocs} processes")
+
+    if nprocs <= 1:
+        for job in jobs:
+            render_job(*job)
+    else:
+        with Pool(nprocs) as pool:
+            pool.starmap(render_job, jobs, chunksize=1)
+    return len(frames)
@@ -1,20 +1,20 @@
-import xarray as xr
 import matplotlib.pyplot as plt
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
 import numpy as np
-from scipy.interpolate import griddata
+from regrid_operator import get_regrid_operator
+from parallel_frames import add_parallel_args, run_frames
+from schism_frames import iter_frames, iter_all_frames
+from schism_stacks import open_stacks
+from frame_renderer import FrameRenderer
+from mesh_plot import get_triangulation, mask_dry
+import argparse
 import os
-import pandas as pd
 import geocat.viz as gv
 
-# List of NetCDF files
-
-file_list = ['schout_elev_1.nc', 'schout_elev_2.nc', 'schout_elev_3.nc', 'schout_elev_4.nc',
-             'schout_elev_5.nc', 'schout_elev_6.nc', 'schout_elev_7.nc', 'schout_elev_8.nc',
-             'schout_elev_9.nc', 'schout_elev_10.nc', 'schout_elev_11.nc', 'schout_elev_12.nc',
-             'schout_elev_13.nc', 'schout_elev_14.nc', 'schout_elev_15.nc', 'schout_elev_16.nc']
+# Output stacks (schout_elev_1.nc, schout_elev_2.nc, ...) found in the working directory
+stack_prefix = 'schout_elev'
 
 # Create output directory if it doesn't exist
 
@@ -33,30 +33,15 @@ LEVELS = np.linspace(VMIN, VMAX, 61)  # 20 intervals between 0 and 20
 print(LEVELS)
 TICK_LEVELS = np.arange(VMIN, VMAX + 0.5, 0.5)
 
-def plot_velocity(file_path, time_index, time_value):
-    # Open the NetCDF file
-    ds = xr.open_dataset(file_path)
-
-    # Extract necessary variables
-    x = ds.SCHISM_hgrid_node_x.values
-    y = ds.SCHISM_hgrid_node_y.values
-    elev = ds.elev.isel(time=time_index).values
-
-    # Calculate wind speed magnitude
-    elev = elev
-
-    # Calculate true min/max
-    elev_min = np.min(elev)
-    elev_max = np.max(elev)
-    print(f"Wind Speed Range: {elev_min:.2f} to {elev_max:.2f} m/s")
+# Rendering options set from the command line (inherited by worker processes)
+options = {'regrid': False, 'hgrid': None}
 
-    # Create a regular grid for interpolation
-    xi = np.linspace(x.min(), x.max(), 500)
-    yi = np.linspace(y.min(), y.max(), 500)
-    xi, yi = np.meshgrid(xi, yi)
+def frame_output_file(time_value):
+    return os.path.join(output_dir, f"welev_plot_{time_value.strftime('%Y%m%d_%H%M%S')}.png")
 
-    # Interpolate wind speed onto the regular grid
-    zi = griddata((x, y), elev, (xi, yi), method='linear')
+def setup_figure(frame):
+    """Build the figure, projection, extent, gridlines, labels and title once."""
+    x, y = frame.x, frame.y
 
     # Create figure and axes
     fig = plt.figure(figsize=(12, 8))
@@ -72,21 +57,6 @@ def plot_velocity(file_path, time_index, time_value):
         y.max() + padding
     ])
 
-    # Create filled contour plot
-    cf = ax.contourf(xi, yi, zi,
-                     levels=LEVELS,
-                     transform=projection,
-                     cmap='jet',
-                     extend='max')
-
-    # Add contour lines for better detail
-    cs = ax.contour(xi, yi, zi,
-                    levels=LEVELS[::2],  # Use fewer levels for contour lines
-                    colors='black',
-                    linewidths=0.5,
-                    alpha=0.3,
-                    transform=projection)
-
     # Add map features
     # Explicitly set axis labels with larger font size
     ax.text(-0.15, 0.5, 'Latitude', va='center', ha='center',
@@ -107,53 +77,102 @@ def plot_velocity(file_path, time_index, time_value):
     gl.xlabel_style = {'size': 12}
     gl.ylabel_style = {'size': 12}
 
-    
-    # Add colorbar
+    # Title text is updated in place for every frame
+    title = ax.set_title('', pad=15, fontsize=12)
 
-#    cbar = plt.colorbar(cf, ax=ax, orientation='vertical', pad=0.02)
-#    cbar.set_label('water elevation (m)', fontsize=12)
-#    cbar.ax.tick_params(labelsize=10)
+    return {'fig': fig, 'ax': ax, 'projection': projection, 'title': title, 'cbar': None}
 
+def draw_frame(state, frame):
+    """Draw one frame's contours into the reusable figure; returns the artists to remove."""
+    ax, projection = state['ax'], state['projection']
+    elev = frame.values
+    time_value = frame.time_value
 
-    cbar = plt.colorbar(cf, ax=ax, orientation='vertical', pad=0.02, 
-                       ticks=TICK_LEVELS)  # Set specific tick locations
-    cbar.set_label('Water Elevation (m)', fontsize=12)
-    cbar.ax.tick_params(labelsize=10)
-    
-    # Format colorbar tick labels to show one decimal place
-    cbar.ax.set_yticklabels([f'{tick:.1f}' for tick in TICK_LEVELS])
+    # Calculate true min/max
+    elev_min = np.nanmin(elev)
+    elev_max = np.nanmax(elev)
+    print(f"Wind Speed Range: {elev_min:.2f} to {elev_max:.2f} m/s")
 
-    
-    # Set title
+    if options['regrid']:
+        # Interpolate wind speed onto the regular grid
+        # (the triangulation and weights are built once and cached in .regrid_cache)
+        regrid = get_regrid_operator(frame.x, frame.y, nx=500, ny=500)
+        grid = (regrid.xi, regrid.yi, regrid(elev))
+    else:
+        # Contour directly on the model mesh (triangulation built once from its elements)
+        triangulation = mask_dry(get_triangulation(frame, options['hgrid']), elev)
+        grid = (triangulation, elev)
+    contourf, contour = (ax.contourf, ax.contour) if options['regrid'] else (ax.tricontourf, ax.tricontour)
 
-    plt.title(f"Hurricane Sandy (2012) Water Elevation (With ATM Forcing)\n{time_value.strftime('%Y-%m-%d %H:%M')} UTC\nMax: {elev_max:.1f} m/s", 
-              pad=15, fontsize=12)
+    # Create filled contour plot
+    cf = contourf(*grid,
+                  levels=LEVELS,
+                  transform=projection,
+                  cmap='jet',
+                  extend='max')
 
-    # Adjust layout
+    # Add contour lines for better detail
+    cs = contour(*grid,
+                 levels=LEVELS[::2],  # Use fewer levels for contour lines
+                 colors='black',
+                 linewidths=0.5,
+                 alpha=0.3,
+                 transform=projection)
+
+    # Add colorbar (once; the levels are fixed so it stays valid for every frame)
+    if state['cbar'] is None:
+        cbar = plt.colorbar(cf, ax=ax, orientation='vertical', pad=0.02, 
+                           ticks=TICK_LEVELS)  # Set specific tick locations
+        cbar.set_label('Water Elevation (m)', fontsize=12)
+        cbar.ax.tick_params(labelsize=10)
+
+        # Format colorbar tick labels to show one decimal place
+        cbar.ax.set_yticklabels([f'{tick:.1f}' for tick in TICK_LEVELS])
+        state['cbar'] = cbar
+
+        # Adjust layout
+        plt.tight_layout()
 
-    plt.tight_layout()
+    # Set title
+    state['title'].set_text(f"Hurricane Sandy (2012) Water Elevation (With ATM Forcing)\n{time_value.strftime('%Y-%m-%d %H:%M')} UTC\nMax: {elev_max:.1f} m/s")
 
-    # Save the plot
+    return [cf, cs]
 
-    output_file = os.path.join(output_dir, f"welev_plot_{time_value.strftime('%Y%m%d_%H%M%S')}.png")
-    plt.savefig(output_file, dpi=300, bbox_inches='tight')
-    plt.close()
+# Figure reused for every frame rendered by this process
+renderer = FrameRenderer(setup_figure, draw_frame, dpi=300)
 
-    ds.close()
+def render_job(file_index, file_path, steps):
+    # Open the file once and render all requested time steps from it
+    for frame in iter_frames(open_stacks(stack_prefix), 'elev', file_index,
+                             [time_index for time_index, _ in steps]):
+        print(f"Processing {file_path} time step {frame.time_index + 1}: {frame.time_value}")
+        renderer.render(frame)
+        renderer.save(frame_output_file(frame.time_value))
 
 # Process files
-for file_index, file_path in enumerate(file_list):
-    print(f"\nProcessing {file_path}...")
-
-    # Open the NetCDF file
-    ds = xr.open_dataset(file_path)
-    time_values = pd.to_datetime(ds.time.values)
-    ds.close()
-
-    # Process every timestep
-    for time_index in range(len(time_values)):
-        time_value = time_values[time_index]
-        print(f"Processing time step {time_index + 1}: {time_value}")
-        plot_velocity(file_path, time_index, time_value)
-
-print("\nAnalysis complete. Check the 'wspd_maps' directory for output plots.")
+if __name__ == "__main__":
+    parser = add_parallel_args(argparse.ArgumentParser(description="Plot water elevation maps"))
+    parser.add_argument('--movie', help="write all frames to this MP4/GIF instead of PNGs")
+    parser.add_argument('--fps', type=int, default=4, help="movie frames per second")
+    parser.add_argument('--regrid', action='store_true',
+                        help="interpolate to a 500x500 grid instead of contouring on the mesh")
+    parser.add_argument('--hgrid', help="hgrid.gr3 for element connectivity if outputs lack SCHISM_hgrid_face_nodes")
+    args = parser.parse_args()
+    options.update(regrid=args.regrid, hgrid=args.hgrid)
+
+    if args.movie:
+        # Frames must be in time order for a movie, so they are rendered in this process
+        renderer.start_movie(args.movie, fps=args.fps)
+        for frame in iter_all_frames(open_stacks(stack_prefix), 'elev'):
+            print(f"Processing {frame.file_path} time step {frame.time_index + 1}: {frame.time_value}")
+            renderer.render(frame)
+            renderer.grab()
+        renderer.finish()
+        print(f"\nAnalysis complete. Movie written to {args.movie}.")
+    else:
+        # Each frame reads only its own time slice, so frames can be rendered in any order
+        frames = open_stacks(stack_prefix).frames()
+        run_frames(render_job, frames, lambda *frame: frame_output_file(frame[3]),
+                   nprocs=args.nprocs, task_id=args.task_id, ntasks=args.ntasks, overwrite=args.overwrite)
+
+        print("\nAnalysis complete. Check the 'welev_maps' directory for output plots.")
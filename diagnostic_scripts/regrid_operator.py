@@ -0,0 +1,105 @@
+"""
+Reusable linear regridding operator from SCHISM mesh nodes to a regular plotting grid.
+Builds the Delaunay triangulation and barycentric weights once (the same interpolation as
+scipy.interpolate.griddata(method='linear')), saves them to disk, and then regrids each
+timestep with a sparse matrix-vector product.
+"""
+
+import os
+import hashlib
+import numpy as np
+from scipy import sparse
+from scipy.spatial import Delaunay
+
+# Operators already built or loaded in this process, keyed like the disk cache
+_OPERATORS = {}
+
+class RegridOperator:
+    """
+    Sparse linear map from node values to a (ny, nx) regular grid.
+
+    xi, yi: 2D meshgrid of the target grid
+    weights: CSR matrix (ny * nx, nnodes)
+    outside: boolean mask of target points outside the mesh convex hull (NaN in the output)
+    """
+
+    def __init__(self, xi, yi, weights, outside):
+        self.xi = xi
+        self.yi = yi
+        self.weights = weights
+        self.outside = outside
+
+    def __call__(self, values):
+        """Regrid node values (nnodes,) to the target grid (ny, nx)."""
+        zi = self.weights.dot(np.asarray(values, dtype='f8'))
+        zi[self.outside] = np.nan
+        return zi.reshape(self.xi.shape)
+
+def _key(x, y, nx, ny):
+    h = hashlib.sha1()
+    h.update(np.ascontiguousarray(x, dtype='f8').tobytes())
+    h.update(np.ascontiguousarray(y, dtype='f8').tobytes())
+    h.update(f'{nx}x{ny}'.encode())
+    return h.hexdigest()[:16]
+
+def build_regrid_operator(x, y, nx=500, ny=500):
+    """
+    Triangulate the nodes and compute barycentric weights for a regular grid spanning them.
+
+    :param x, y: 1D node coordinates
+    :param nx, ny: Target grid size
+    """
+    x = np.asarray(x, dtype='f8')
+    y = np.asarray(y, dtype='f8')
+    xi, yi = np.meshgrid(np.linspace(x.min(), x.max(), nx), np.linspace(y.min(), y.max(), ny))
+    points = np.column_stack([xi.ravel(), yi.ravel()])
+
+    tri = Delaunay(np.column_stack([x, y]))
+    simplex = tri.find_simplex(points)
+    outside = simplex < 0
+    simplex = np.where(outside, 0, simplex)
+
+    # Barycentric coordinates from the triangulation's affine transforms
+    transform = tri.transform[simplex]
+    b = np.einsum('ijk,ik->ij', transform[:, :2, :], points - transform[:, 2, :])
+    bary = np.column_stack([b, 1 - b.sum(axis=1)])
+    bary[outside] = 0
+
+    npts = len(points)
+    rows = np.repeat(np.arange(npts), 3)
+    cols = tri.simplices[simplex].ravel()
+    weights = sparse.csr_matrix((bary.ravel(), (rows, cols)), shape=(npts, len(x)))
+    return RegridOperator(xi, yi, weights, outside)
+
+def get_regrid_operator(x, y, nx=500, ny=500, cache_dir='.regrid_cache'):
+    """
+    Return the regrid operator for these nodes, from memory, the disk cache or built fresh.
+
+    :param cache_dir: Directory for the on-disk cache (None disables it)
+    """
+    key = _key(x, y, nx, ny)
+    if key in _OPERATORS:
+        return _OPERATORS[key]
+
+    cache_path = None if cache_dir is None else os.path.join(cache_dir, f'regrid_{key}.npz')
+    if cache_path is not None and os.path.exists(cache_path):
+        cached = np.load(cache_path)
+        weights = sparse.csr_matrix((cached['data'], cached['indices'], cached['indptr']),
+                                    shape=tuple(cached['shape']))
+        xi, yi = np.meshgrid(cached['xaxis'], cached['yaxis'])
+        op = RegridOperator(xi, yi, weights, cached['outside'])
+    else:
+        op = build_regrid_operator(x, y, nx, ny)
+        if cache_path is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Write to a per-process temporary file first so concurrent workers building the
+            # same operator never load a partial npz
+            tmp = f'{cache_path}.tmp{os.getpid()}'
+            with open(tmp, 'wb') as f:
+                np.savez(f, data=op.weights.data, indices=op.weights.indices,
+                         indptr=op.weights.indptr, shape=np.array(op.weights.shape),
+                         xaxis=op.xi[0], yaxis=op.yi[:, 0], outside=op.outside)
+            os.replace(tmp, cache_path)
+
+    _OPERATORS[key] = op
+    return op
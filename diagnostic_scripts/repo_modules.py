@@ -0,0 +1,16 @@
+"""
+Access to the modules in the repository root (hgrid_reader, boundary_forcing, ...) from the
+script directories, so the root only has to be put on sys.path in one place.
+"""
+
+import os
+import sys
+import importlib
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+def repo_module(name):
+    """Import a module from the repository root (appended to sys.path once, so it never shadows local modules)."""
+    if REPO_ROOT not in sys.path:
+        sys.path.append(REPO_ROOT)
+    return importlib.import_module(name)
@@ -0,0 +1,22 @@
+#!/bin/bash
+#SBATCH --job-name=combine_py        # Job name
+#SBATCH --account=nosofs             # Account/Project
+#SBATCH --time=02:00:00             # Wall time limit (2 hours)
+#SBATCH --nodes=1                    # Number of nodes
+#SBATCH --ntasks-per-node=1         # Tasks per node
+#SBATCH --cpus-per-task=16           # Worker processes (one stack each)
+#SBATCH --output=combine_py_%j.log   # Standard output log
+#SBATCH --error=combine_py_%j.err    # Standard error log
+
+# Load conda environment
+
+source /apps/spack-managed/gcc-11.3.1/miniconda3-24.3.0-avnaftwsbozuvtsq7jrmpmcvf6c7yzlt/etc/profile.d/conda.sh
+conda activate pyschism_mjisan
+
+# Python equivalent of combine_schism.sh (combine_output11_MPI -b 1 -e 17 -w 1 -v "elev" -o schout_elev).
+# Stacks already combined are skipped and stacks still being written are combined up to their
+# last complete record, so this can be rerun while the model is running.
+python combine_schism.py -b 1 -e 17 -v elev -o schout_elev --nprocs ${SLURM_CPUS_PER_TASK:-1}
+
+# Deactivate conda environment
+conda deactivate
@@ -4,6 +4,7 @@
 #SBATCH --time=02:00:00             # Wall time limit (2 hours)
 #SBATCH --nodes=1                    # Number of nodes
 #SBATCH --ntasks-per-node=1         # Tasks per node
+#SBATCH --cpus-per-task=16           # Worker processes for frame rendering
 #SBATCH --output=plot_elev_%j.log    # Standard output log
 #SBATCH --error=plot_elev_%j.err     # Standard error log
 
@@ -12,8 +13,9 @@
 source /apps/spack-managed/gcc-11.3.1/miniconda3-24.3.0-avnaftwsbozuvtsq7jrmpmcvf6c7yzlt/etc/profile.d/conda.sh
 conda activate pyschism_mjisan
 
-# Run the Python script
-python plot_wspd.py
+# Run the Python script (frames are rendered by a process pool; existing PNGs are skipped,
+# so a resubmitted job resumes where the previous one stopped)
+python plot_wspd.py --nprocs ${SLURM_CPUS_PER_TASK:-1}
 
 # Deactivate conda environment
 conda deactivate
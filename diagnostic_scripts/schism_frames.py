@@ -0,0 +1,32 @@
+"""
+Frame iterator over SCHISM output stacks (schout_*.nc, out2d_*.nc).
+Node coordinates, decoded times and the open files all come from schism_stacks.StackDataset;
+each frame's field is read lazily (one time slice) only when the frame is consumed.
+"""
+
+from collections import namedtuple
+
+Frame = namedtuple('Frame', ['file_index', 'file_path', 'time_index', 'time_value', 'x', 'y', 'values'])
+
+def iter_frames(dataset, var, file_index, time_indices=None):
+    """
+    Yield a Frame per time step of one stack.
+
+    :param dataset: schism_stacks.StackDataset of the output series
+    :param var: Output variable to read (e.g. 'elev', 'elevation', 'wind_speed')
+    :param file_index: Stack to read, as in StackDataset.frames()
+    :param time_indices: Time steps within the stack to yield (default: all)
+    """
+    x, y = dataset.coords
+    first = int(dataset.offsets[file_index])
+    if time_indices is None:
+        time_indices = range(int(dataset.offsets[file_index + 1]) - first)
+    for time_index in time_indices:
+        record = first + time_index
+        values = dataset.read(var, time=record)[0]
+        yield Frame(file_index, dataset.files[file_index], time_index, dataset.times[record], x, y, values)
+
+def iter_all_frames(dataset, var):
+    """Yield every frame of every stack in order."""
+    for file_index in range(len(dataset.files)):
+        yield from iter_frames(dataset, var, file_index)
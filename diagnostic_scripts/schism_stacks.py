@@ -0,0 +1,222 @@
+"""
+Virtual time series over all stacks of a SCHISM output (out2d_N.nc, schout_elev_N.nc, ...).
+Stacks are discovered by prefix and ordered by N; their time axes are concatenated once and
+cached in a small sidecar index (.<prefix>_index.json next to the files), which is only
+updated for stacks whose size or modification time changed. Reads of a time range and/or a
+set of nodes then open only the stacks that overlap the request.
+Usage: ds = StackDataset('out2d'); ds.read('elevation', time=slice('2012-10-28', '2012-10-29'), nodes=[10, 20])
+"""
+
+import os
+import re
+import glob
+import json
+
+import numpy as np
+import pandas as pd
+from netCDF4 import Dataset, num2date
+
+# Bump when the sidecar index layout changes
+INDEX_VERSION = 1
+
+# Stacks kept open between reads
+MAX_OPEN_FILES = 8
+
+# Datasets opened by this (worker) process, keyed by (prefix, directory)
+_DATASETS = {}
+
+def discover_stacks(prefix, directory='.'):
+    """Paths of <prefix>_N.nc in directory, ordered by N."""
+    stacks = []
+    for path in glob.glob(os.path.join(directory, f'{prefix}_*.nc')):
+        match = re.search(rf'{re.escape(prefix)}_(\d+)\.nc$', os.path.basename(path))
+        if match is not None:
+            stacks.append((int(match.group(1)), path))
+    return [path for _, path in sorted(stacks)]
+
+def _stack_entry(path):
+    """Index entry of one stack: stat signature, node count and raw time values."""
+    stat = os.stat(path)
+    with Dataset(path, 'r') as nc:
+        time = nc.variables['time']
+        return {'file': os.path.basename(path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+                'units': time.units, 'times': np.asarray(time[:], dtype='f8').tolist(),
+                'nnodes': nc.dimensions['nSCHISM_hgrid_node'].size}
+
+def build_index(prefix, directory='.', index_path=None):
+    """
+    Load the sidecar index of a stack series, re-reading only new or changed stacks.
+
+    :param index_path: Sidecar file (default: .<prefix>_index.json in directory; '' disables it)
+    :return: List of index entries in stack order
+    """
+    if index_path is None:
+        index_path = os.path.join(directory, f'.{prefix}_index.json')
+    cached = {}
+    if index_path and os.path.exists(index_path):
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+            if index.get('version') == INDEX_VERSION:
+                cached = {entry['file']: entry for entry in index['stacks']}
+        except (OSError, ValueError):
+            cached = {}
+
+    entries = []
+    changed = False
+    for path in discover_stacks(prefix, directory):
+        stat = os.stat(path)
+        entry = cached.get(os.path.basename(path))
+        if entry is None or entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+            entry = _stack_entry(path)
+            changed = True
+        entries.append(entry)
+    changed = changed or len(entries) != len(cached)
+
+    if index_path and changed:
+        # Per-process temporary file, so concurrent tasks never share a partial index; the
+        # index is only a cache, so an unwritable directory just leaves the series uncached
+        tmp = f'{index_path}.tmp{os.getpid()}'
+        try:
+            with open(tmp, 'w') as f:
+                json.dump({'version': INDEX_VERSION, 'prefix': prefix, 'stacks': entries}, f)
+            os.replace(tmp, index_path)
+        except OSError as e:
+            print(f"Not caching the {prefix} stack index ({str(e)})")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return entries
+
+class StackDataset:
+    """
+    All stacks of one output series as a single time axis.
+
+    files: stack paths in order
+    times: DatetimeIndex of every record
+    offsets: first global record of each stack (len(files) + 1 entries)
+    """
+
+    def __init__(self, prefix, directory='.', index_path=None):
+        entries = build_index(prefix, directory, index_path)
+        if not entries:
+            raise FileNotFoundError(f"No {prefix}_N.nc stacks in {directory}")
+        self.prefix = prefix
+        self.files = [os.path.join(directory, entry['file']) for entry in entries]
+        self.nnodes = entries[0]['nnodes']
+        self.offsets = np.concatenate([[0], np.cumsum([len(entry['times']) for entry in entries])])
+        self.times = pd.DatetimeIndex(np.concatenate([
+            pd.to_datetime(num2date(np.asarray(entry['times']), units=entry['units'], only_use_cftime_datetimes=False,
+                                    only_use_python_datetimes=True)) for entry in entries]))
+        self._open = {}
+        self._coords = None
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def _dataset(self, stack):
+        """Open stack (kept open for later reads, at most MAX_OPEN_FILES at a time)."""
+        if stack not in self._open:
+            if len(self._open) >= MAX_OPEN_FILES:
+                self._open.pop(next(iter(self._open))).close()
+            self._open[stack] = Dataset(self.files[stack], 'r')
+        return self._open[stack]
+
+    def close(self):
+        for nc in self._open.values():
+            nc.close()
+        self._open = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def coords(self):
+        """(x, y) node coordinates, read from the first stack."""
+        if self._coords is None:
+            nc = self._dataset(0)
+            self._coords = (np.asarray(nc.variables['SCHISM_hgrid_node_x'][:], dtype='f8'),
+                            np.asarray(nc.variables['SCHISM_hgrid_node_y'][:], dtype='f8'))
+        return self._coords
+
+    def time_range(self, time=None):
+        """
+        Global record range [t0, t1) for a time selection.
+
+        :param time: None (all), a record index (negative counts from the end), a slice of record
+                     indexes, or a slice of dates/strings (inclusive, like pandas label slicing)
+        """
+        if time is None:
+            return 0, len(self)
+        if isinstance(time, (int, np.integer)):
+            if not -len(self) <= time < len(self):
+                raise IndexError(f"record {time} out of range for {len(self)} records")
+            index = int(time) % len(self)
+            return index, index + 1
+        if isinstance(time, slice) and (isinstance(time.start, (int, np.integer, type(None))) and
+                                        isinstance(time.stop, (int, np.integer, type(None)))):
+            t0, t1, _ = time.indices(len(self))
+            return t0, max(t0, t1)
+        if isinstance(time, slice):
+            t0 = 0 if time.start is None else int(self.times.searchsorted(pd.Timestamp(time.start), side='left'))
+            t1 = len(self) if time.stop is None else int(self.times.searchsorted(pd.Timestamp(time.stop), side='right'))
+            return t0, max(t0, t1)
+        index = int(self.times.get_indexer([pd.Timestamp(time)], method='nearest')[0])
+        return index, index + 1
+
+    def locate(self, record):
+        """(stack, record within the stack) of a global record index."""
+        stack = int(np.searchsorted(self.offsets, record, side='right')) - 1
+        return stack, int(record - self.offsets[stack])
+
+    def frames(self):
+        """(file_index, file_path, time_index, time_value) of every record, for parallel_frames.run_frames."""
+        return [(stack, path, index, self.times[self.offsets[stack] + index])
+                for stack, path in enumerate(self.files)
+                for index in range(self.offsets[stack + 1] - self.offsets[stack])]
+
+    def read(self, var, time=None, nodes=None):
+        """
+        Read var over a time selection and optional node subset, opening only the stacks involved.
+
+        :param time: See time_range
+        :param nodes: None (all nodes) or an array of 0-based node indexes
+        :return: Array (ntime, nnodes_selected, ...) with fill values as NaN
+        """
+        t0, t1 = self.time_range(time)
+        parts = []
+        first = self.locate(t0)[0] if t1 > t0 else 0
+        for stack in range(first, len(self.files)):
+            s0, s1 = self.offsets[stack], self.offsets[stack + 1]
+            if s0 >= t1:
+                break
+            a, b = max(t0, s0) - s0, min(t1, s1) - s0
+            parts.append(read_nodes(self._dataset(stack).variables[var], slice(a, b), nodes))
+        if not parts:
+            raise IndexError(f"No records selected by {time!r}")
+        return np.concatenate(parts)
+
+def read_nodes(variable, time_slice, nodes=None):
+    """
+    Read a (time, node, ...) variable for a time slice and a node subset with hyperslab reads.
+    Nearby nodes are read as one contiguous span, scattered nodes one column at a time.
+    """
+    if nodes is None:
+        return np.ma.filled(variable[time_slice], np.nan)
+    nodes = np.asarray(nodes, dtype=np.int64)
+    unique, inverse = np.unique(nodes, return_inverse=True)
+    lo, hi = int(unique[0]), int(unique[-1]) + 1
+    if hi - lo <= 4 * len(unique):
+        block = np.ma.filled(variable[time_slice, lo:hi], np.nan)[:, unique - lo]
+    else:
+        block = np.stack([np.ma.filled(variable[time_slice, int(n)], np.nan) for n in unique], axis=1)
+    return block[:, inverse.ravel()]
+
+def open_stacks(prefix, directory='.'):
+    """StackDataset for prefix, opened once per process (for pool workers)."""
+    key = (prefix, directory)
+    if key not in _DATASETS:
+        _DATASETS[key] = StackDataset(prefix, directory)
+    return _DATASETS[key]
@@ -0,0 +1,164 @@
+"""
+Lightweight reader for SCHISM hgrid.gr3 / hgrid.ll files.
+Parses nodes, elements and the open/land boundary sections with NumPy bulk text parsing, and
+caches the result as .npy arrays keyed by the file hash so later runs memory-map them instead
+of parsing text (and never import pyschism or pyproj).
+Usage: grid = read_hgrid('fixed_files/hgrid.gr3'); grid.coords, grid.elements, grid.open_boundaries
+"""
+
+import os
+import shutil
+import hashlib
+import numpy as np
+
+# Bump when the cached array layout changes
+CACHE_VERSION = 1
+
+class Gr3Grid:
+    """
+    Horizontal grid arrays from a gr3 file.
+
+    coords: (np, 2) node x/y (lon/lat for hgrid.ll)
+    values: (np,) node depths
+    elements: (ne, 4) 0-based node indexes; the 4th column is -1 for triangles
+    open_boundaries / land_boundaries: lists of 0-based node index arrays
+    land_flags: land boundary flags (0 = land, 1 = island)
+    """
+
+    def __init__(self, coords, values, elements, open_boundaries, land_boundaries, land_flags):
+        self.coords = coords
+        self.values = values
+        self.elements = elements
+        self.open_boundaries = open_boundaries
+        self.land_boundaries = land_boundaries
+        self.land_flags = land_flags
+
+    @property
+    def nOpenBndNodes(self):
+        return sum(len(boundary) for boundary in self.open_boundaries)
+
+    @property
+    def triangles(self):
+        """Elements split into triangles, (ntri, 3) 0-based, for matplotlib.tri."""
+        tri = self.elements[:, :3]
+        quads = self.elements[self.elements[:, 3] >= 0]
+        if len(quads) == 0:
+            return np.asarray(tri)
+        return np.concatenate([tri, quads[:, [0, 2, 3]]])
+
+def file_hash(path):
+    """SHA-1 of the file contents."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _parse_boundaries(lines):
+    """Parse the open and land boundary sections that follow the element table."""
+    open_boundaries, land_boundaries, land_flags = [], [], []
+    if not lines:
+        return open_boundaries, land_boundaries, land_flags
+
+    pos = 0
+    nope = int(lines[pos].split()[0]); pos += 2  # skip total number of open boundary nodes
+    for _ in range(nope):
+        nond = int(lines[pos].split()[0]); pos += 1
+        ids = np.array([ln.split()[0] for ln in lines[pos:pos + nond]], dtype=int) - 1
+        open_boundaries.append(ids); pos += nond
+
+    if pos >= len(lines) or not lines[pos].strip():
+        return open_boundaries, land_boundaries, land_flags
+    nland = int(lines[pos].split()[0]); pos += 2  # skip total number of land boundary nodes
+    for _ in range(nland):
+        header = lines[pos].split(); pos += 1
+        nlnd = int(header[0])
+        flag = int(header[1]) if len(header) > 1 and header[1].lstrip('-').isdigit() else 0
+        ids = np.array([ln.split()[0] for ln in lines[pos:pos + nlnd]], dtype=int) - 1
+        land_boundaries.append(ids); land_flags.append(flag); pos += nlnd
+    return open_boundaries, land_boundaries, land_flags
+
+def parse_hgrid(path):
+    """
+    Parse a gr3 file into a Gr3Grid.
+
+    :param path: Path to hgrid.gr3 or hgrid.ll
+    """
+    with open(path, 'r') as f:
+        lines = f.read().splitlines()
+
+    ne, nn = (int(v) for v in lines[1].split()[:2])
+
+    # Nodes: "id x y depth"
+    nodes = np.array(' '.join(lines[2:2 + nn]).split(), dtype='f8').reshape(nn, 4)
+    coords = np.ascontiguousarray(nodes[:, 1:3])
+    values = np.ascontiguousarray(nodes[:, 3])
+
+    # Elements: "id nvert n1 n2 n3 [n4]"
+    elem_lines = lines[2 + nn:2 + nn + ne]
+    tokens = np.array(' '.join(elem_lines).split(), dtype=np.int64)
+    elements = np.full((ne, 4), -1, dtype=np.int64)
+    if len(tokens) == 5 * ne:
+        elements[:, :3] = tokens.reshape(ne, 5)[:, 2:] - 1
+    else:
+        # Mixed triangles and quads
+        for i, ln in enumerate(elem_lines):
+            parts = ln.split()
+            nv = int(parts[1])
+            elements[i, :nv] = np.array(parts[2:2 + nv], dtype=np.int64) - 1
+
+    open_boundaries, land_boundaries, land_flags = _parse_boundaries(lines[2 + nn + ne:])
+    return Gr3Grid(coords, values, elements, open_boundaries, land_boundaries, land_flags)
+
+def _pack(boundaries):
+    """Concatenate index arrays into (flat, offsets) for storage."""
+    offsets = np.cumsum([0] + [len(b) for b in boundaries]).astype(np.int64)
+    flat = np.concatenate(boundaries).astype(np.int64) if boundaries else np.zeros(0, dtype=np.int64)
+    return flat, offsets
+
+def _unpack(flat, offsets):
+    return [flat[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+
+def read_hgrid(path, cache_dir=None):
+    """
+    Read a gr3 file, using the binary cache in cache_dir when it matches the file hash.
+
+    :param path: Path to hgrid.gr3 or hgrid.ll
+    :param cache_dir: Directory for the cache (default: .hgrid_cache next to the grid file;
+                      an empty string disables caching)
+    :return: Gr3Grid whose arrays are read-only memory maps when loaded from cache
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), '.hgrid_cache')
+    if not cache_dir:
+        return parse_hgrid(path)
+
+    entry = os.path.join(cache_dir, f'{os.path.basename(path)}.v{CACHE_VERSION}.{file_hash(path)[:16]}')
+    names = ['coords', 'values', 'elements', 'open', 'open_offsets', 'land', 'land_offsets', 'land_flags']
+    if all(os.path.exists(os.path.join(entry, f'{n}.npy')) for n in names):
+        a = {n: np.load(os.path.join(entry, f'{n}.npy'), mmap_mode='r') for n in names}
+        return Gr3Grid(a['coords'], a['values'], a['elements'],
+                       _unpack(a['open'], a['open_offsets']),
+                       _unpack(a['land'], a['land_offsets']),
+                       [int(v) for v in a['land_flags']])
+
+    grid = parse_hgrid(path)
+    open_flat, open_offsets = _pack(grid.open_boundaries)
+    land_flat, land_offsets = _pack(grid.land_boundaries)
+    arrays = {
+        'coords': grid.coords, 'values': grid.values, 'elements': grid.elements,
+        'open': open_flat, 'open_offsets': open_offsets,
+        'land': land_flat, 'land_offsets': land_offsets,
+        'land_flags': np.asarray(grid.land_flags, dtype=np.int64),
+    }
+    # Write to a temporary directory first so concurrent jobs never see a partial cache
+    tmp = f'{entry}.tmp{os.getpid()}'
+    os.makedirs(tmp, exist_ok=True)
+    for n, arr in arrays.items():
+        np.save(os.path.join(tmp, f'{n}.npy'), arr)
+    try:
+        os.replace(tmp, entry)
+    except OSError:
+        # Another process won the race; its cache is identical
+        shutil.rmtree(tmp, ignore_errors=True)
+    return grid
@@ -1,16 +1,121 @@
-import xarray as xr
-file_path = "elev2D.th.nc"
-ds = xr.open_dataset(file_path)
-print(ds)
-tt1 = ds.time_series.isel(nOpenBndNodes=0, nLevels=0, nComponents=0)
-print(f"Variable: tt1")
-print(f"Type: {tt1.dtype}")
-print(f"Total Size: {tt1.nbytes} bytes")
-print(f"Number of Dimensions: {tt1.ndim}")
-print(f"Dimensions and sizes: {tt1.dims}")
-print(f"Coordinates: time: [{tt1.time.min().values}..{tt1.time.max().values}]")
-
-# Loop through and print the values with their corresponding index
-for idx, value in enumerate(tt1.values):
-    print(f"({idx}) {value}")
+"""
+Inspect an elev2D.th.nc boundary forcing file.
+Reads time_series for all open boundary nodes in large time blocks and reports summary
+statistics, time-step uniformity, gaps and NaN/fill counts instead of printing every value.
+Usage: python read_elev2d.py [elev2D.th.nc] [--csv nodes.csv | --parquet nodes.parquet] [--node N --values]
+"""
 
+import argparse
+import numpy as np
+import pandas as pd
+from netCDF4 import Dataset
+from validate_elev2d import check_time_axis, fill_value
+
+# Time records read per block (bounds memory for very long files)
+DEFAULT_BLOCK_SIZE = 100000
+
+def inspect_elev2d(path, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Summarize an elev2D.th.nc file.
+
+    :return: (report dict, per-node DataFrame with min/max/mean/std/nan/fill counts)
+    """
+    with Dataset(path, 'r') as nc:
+        var = nc.variables['time_series']
+        var.set_auto_mask(False)
+        fill = fill_value(var)
+        time = np.asarray(nc.variables['time'][:], dtype='f8')
+        time_step = float(np.ravel(nc.variables['time_step'][:])[0]) if 'time_step' in nc.variables else None
+        ntimes, nnodes, nlevels, ncomponents = var.shape
+
+        values_shape = (nnodes * nlevels * ncomponents,)
+        count = np.zeros(values_shape, dtype=np.int64)
+        nan_count = np.zeros(values_shape, dtype=np.int64)
+        fill_count = np.zeros(values_shape, dtype=np.int64)
+        total = np.zeros(values_shape)
+        total2 = np.zeros(values_shape)
+        vmin = np.full(values_shape, np.inf)
+        vmax = np.full(values_shape, -np.inf)
+        for t0 in range(0, ntimes, block_size):
+            block = np.asarray(var[t0:t0 + block_size], dtype='f8').reshape(-1, values_shape[0])
+            is_nan = np.isnan(block)
+            is_fill = (block == fill) if fill is not None else np.zeros_like(is_nan)
+            valid = ~is_nan & ~is_fill
+            nan_count += is_nan.sum(axis=0)
+            fill_count += is_fill.sum(axis=0)
+            count += valid.sum(axis=0)
+            values = np.where(valid, block, 0)
+            total += values.sum(axis=0)
+            total2 += (values ** 2).sum(axis=0)
+            vmin = np.minimum(vmin, np.where(valid, block, np.inf).min(axis=0))
+            vmax = np.maximum(vmax, np.where(valid, block, -np.inf).max(axis=0))
+        attrs = {name: nc.getncattr(name) for name in nc.ncattrs()}
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        std = np.sqrt(np.maximum(total2 / count - mean ** 2, 0))
+    have = count > 0
+    index = pd.MultiIndex.from_product([range(nnodes), range(nlevels), range(ncomponents)],
+                                       names=['node', 'level', 'component'])
+    nodes = pd.DataFrame({'min': np.where(have, vmin, np.nan), 'max': np.where(have, vmax, np.nan),
+                          'mean': mean, 'std': std, 'valid': count, 'nan': nan_count, 'fill': fill_count},
+                         index=index)
+    if nlevels == 1 and ncomponents == 1:
+        nodes = nodes.droplevel(['level', 'component'])
+
+    report = {'file': path, 'ntimes': ntimes, 'nOpenBndNodes': nnodes, 'nLevels': nlevels,
+              'nComponents': ncomponents, 'time_start': float(time[0]) if ntimes else np.nan,
+              'time_end': float(time[-1]) if ntimes else np.nan, 'time_step': time_step,
+              'nan': int(nan_count.sum()), 'fill': int(fill_count.sum()),
+              'min': float(np.nanmin(nodes['min'])) if have.any() else np.nan,
+              'max': float(np.nanmax(nodes['max'])) if have.any() else np.nan,
+              'mean': float(total.sum() / count.sum()) if have.any() else np.nan,
+              'attributes': attrs}
+    report.update(check_time_axis(time, time_step))
+    return report, nodes
+
+def print_report(report, nodes, max_rows=10):
+    """Print a compact report."""
+    print(f"File: {report['file']}")
+    print(f"Shape: time={report['ntimes']}, nOpenBndNodes={report['nOpenBndNodes']}, "
+          f"nLevels={report['nLevels']}, nComponents={report['nComponents']}")
+    print(f"Time: {report['time_start']:g} .. {report['time_end']:g} s "
+          f"({(report['time_end'] - report['time_start']) / 86400:.3f} days)")
+    print(f"time_step: {report['time_step']} s; dt range {report['dt_min']:g} .. {report['dt_max']:g} s; "
+          f"uniform={report['uniform']}, monotonic={report['monotonic']}, "
+          f"matches time_step={report['time_step_matches']}")
+    print(f"Gaps: {len(report['gaps'])}")
+    for index, before, after in report['gaps'][:max_rows]:
+        print(f"  after record {index}: {before:g} -> {after:g} s")
+    print(f"Values: min {report['min']:.4f}, max {report['max']:.4f}, mean {report['mean']:.4f}; "
+          f"NaN {report['nan']}, fill {report['fill']}")
+    bad = nodes[(nodes['nan'] > 0) | (nodes['fill'] > 0)]
+    if len(bad):
+        print(f"Nodes with NaN/fill values: {len(bad)}")
+        print(bad.head(max_rows).to_string())
+    print("Per-node summary:")
+    print(nodes.describe().loc[['min', 'max', 'mean']].to_string())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect an elev2D.th.nc file")
+    parser.add_argument('file', nargs='?', default="elev2D.th.nc", help="elev2D.th.nc to inspect")
+    parser.add_argument('--csv', help="write the per-node summary to this CSV file")
+    parser.add_argument('--parquet', help="write the per-node summary to this Parquet file")
+    parser.add_argument('--node', type=int, help="with --values, the boundary node to print")
+    parser.add_argument('--values', action='store_true', help="print the time series of --node (default 0)")
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE, help="time records per read")
+    args = parser.parse_args()
+
+    report, nodes = inspect_elev2d(args.file, args.block_size)
+    print_report(report, nodes)
+    if args.csv:
+        nodes.to_csv(args.csv)
+        print(f"Per-node summary written to {args.csv}")
+    if args.parquet:
+        nodes.to_parquet(args.parquet)
+        print(f"Per-node summary written to {args.parquet}")
+    if args.values:
+        with Dataset(args.file, 'r') as nc:
+            series = pd.Series(nc.variables['time_series'][:, args.node or 0, 0, 0],
+                               index=pd.Index(nc.variables['time'][:], name='time'), name='elev')
+        print(series.to_string())
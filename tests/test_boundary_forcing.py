@@ -0,0 +1,31 @@
+"""
+Bilinear node weights of boundary_forcing.py.
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from boundary_forcing import bilinear_weights
+
+def test_weights_interpolate_linear_fields():
+    src_lon = np.array([-76.0, -75.5, -75.0])
+    src_lat = np.array([36.0, 35.5, 35.0])  # descending, as in many parent-model grids
+    lon = np.array([-75.9, -75.25, -75.0])
+    lat = np.array([35.1, 35.75, 36.0])
+    field = (2 * src_lon[None, :] + 3 * src_lat[:, None]).ravel()
+    weights = bilinear_weights(lon, lat, src_lon, src_lat)
+    assert np.allclose(weights.dot(field), 2 * lon + 3 * lat)
+
+def test_single_column_or_row_source():
+    lon = np.array([-75.9, -75.25])
+    lat = np.array([35.1, 35.75])
+    src_lat = np.array([35.0, 36.0])
+    field = np.array([1.0, 3.0])
+    weights = bilinear_weights(lon, lat, np.array([-75.5]), src_lat)
+    assert np.isfinite(weights.toarray()).all()
+    assert np.allclose(weights.dot(field), 1.0 + 2.0 * (lat - 35.0))
+    weights = bilinear_weights(lon, lat, np.array([-75.5]), np.array([35.5]))
+    assert np.allclose(weights.toarray(), 1.0)
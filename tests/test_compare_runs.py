@@ -0,0 +1,113 @@
+"""
+Regression gate of diagnostic_scripts/compare_runs.py on small synthetic out2d stacks.
+"""
+
+import os
+import sys
+import subprocess
+
+import numpy as np
+import pytest
+from netCDF4 import Dataset
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'diagnostic_scripts')
+sys.path.insert(0, SCRIPTS)
+from compare_runs import compare_runs
+
+NNODES = 20
+NTIMES = 12
+
+def write_run(directory, elevation, nstacks=2):
+    """Write elevation (time, node) as nstacks out2d_N.nc files of equal length."""
+    os.makedirs(directory, exist_ok=True)
+    per_stack = len(elevation) // nstacks
+    for stack in range(nstacks):
+        records = slice(stack * per_stack, (stack + 1) * per_stack)
+        with Dataset(os.path.join(directory, f'out2d_{stack + 1}.nc'), 'w') as nc:
+            nc.createDimension('time', None)
+            nc.createDimension('nSCHISM_hgrid_node', NNODES)
+            time = nc.createVariable('time', 'f8', ('time',))
+            time.units = 'seconds since 2012-10-27 00:00:00'
+            time[:] = np.arange(len(elevation))[records] * 900.0
+            nc.createVariable('SCHISM_hgrid_node_x', 'f8', ('nSCHISM_hgrid_node',))[:] = np.linspace(-76, -75, NNODES)
+            nc.createVariable('SCHISM_hgrid_node_y', 'f8', ('nSCHISM_hgrid_node',))[:] = np.linspace(35, 36, NNODES)
+            nc.createVariable('elevation', 'f4', ('time', 'nSCHISM_hgrid_node'))[:] = elevation[records]
+
+def reference_elevation():
+    return np.sin(np.arange(NTIMES)[:, None] / 3.0 + np.arange(NNODES)[None, :]).astype('f4')
+
+def run_gate(tmp_path, tolerance=1e-3):
+    """Run the compare_runs CLI with --tolerance; return (exit code, stdout)."""
+    result = subprocess.run([sys.executable, os.path.join(SCRIPTS, 'compare_runs.py'), str(tmp_path / 'ref'),
+                             str(tmp_path / 'test'), '--tolerance', str(tolerance), '-o', str(tmp_path / 'compare')],
+                            capture_output=True, text=True, cwd=tmp_path)
+    return result.returncode, result.stdout + result.stderr
+
+def test_identical_runs_pass(tmp_path):
+    write_run(tmp_path / 'ref', reference_elevation())
+    write_run(tmp_path / 'test', reference_elevation())
+    code, output = run_gate(tmp_path)
+    assert code == 0, output
+    assert 'PASS' in output
+
+@pytest.mark.parametrize('blow_up', ['all_nan', 'partial_nan', 'inf'])
+def test_blown_up_test_run_fails(tmp_path, blow_up):
+    elevation = reference_elevation()
+    broken = elevation.copy()
+    if blow_up == 'all_nan':
+        broken[:] = np.nan
+    elif blow_up == 'partial_nan':
+        broken[7:, 3:5] = np.nan
+    else:
+        broken[5, 0] = np.inf
+    write_run(tmp_path / 'ref', elevation)
+    write_run(tmp_path / 'test', broken)
+
+    nodes, table, _ = compare_runs((str(tmp_path / 'ref'), None), (str(tmp_path / 'test'), None), 'elevation')
+    expected = np.count_nonzero(~np.isfinite(broken))
+    assert nodes['nonfinite'].sum() == expected
+    assert table['nonfinite'].sum() == expected
+    assert np.array_equal(nodes['nonfinite'].values, (~np.isfinite(broken)).sum(axis=0))
+
+    code, output = run_gate(tmp_path)
+    assert code == 1, output
+    assert 'FAIL' in output
+
+def test_nan_in_both_runs_is_not_counted(tmp_path):
+    elevation = reference_elevation()
+    elevation[:, 0] = np.nan  # e.g. a node that is dry in both runs
+    write_run(tmp_path / 'ref', elevation)
+    write_run(tmp_path / 'test', elevation)
+    nodes, _, _ = compare_runs((str(tmp_path / 'ref'), None), (str(tmp_path / 'test'), None), 'elevation')
+    assert nodes['nonfinite'].sum() == 0
+    code, output = run_gate(tmp_path)
+    assert code == 0, output
+
+def write_wind(path, u, v, vector_name=None):
+    """One stack of wind as out2d windSpeedX/windSpeedY, or as a 2-component schout vector_name."""
+    with Dataset(path, 'w') as nc:
+        nc.createDimension('time', None)
+        nc.createDimension('nSCHISM_hgrid_node', NNODES)
+        nc.createDimension('two', 2)
+        time = nc.createVariable('time', 'f8', ('time',))
+        time.units = 'seconds since 2012-10-27 00:00:00'
+        time[:] = np.arange(len(u)) * 900.0
+        nc.createVariable('SCHISM_hgrid_node_x', 'f8', ('nSCHISM_hgrid_node',))[:] = np.linspace(-76, -75, NNODES)
+        nc.createVariable('SCHISM_hgrid_node_y', 'f8', ('nSCHISM_hgrid_node',))[:] = np.linspace(35, 36, NNODES)
+        if vector_name is None:
+            nc.createVariable('windSpeedX', 'f4', ('time', 'nSCHISM_hgrid_node'))[:] = u
+            nc.createVariable('windSpeedY', 'f4', ('time', 'nSCHISM_hgrid_node'))[:] = v
+        else:
+            nc.createVariable(vector_name, 'f4', ('time', 'nSCHISM_hgrid_node', 'two'))[:] = np.stack([u, v], axis=-1)
+
+def test_out2d_vector_pair_matches_schout_vector(tmp_path):
+    u = reference_elevation() * 10
+    v = np.cos(u)
+    os.makedirs(tmp_path / 'ref')
+    os.makedirs(tmp_path / 'test')
+    write_wind(tmp_path / 'ref' / 'schout_1.nc', u, v, 'wind_speed')
+    write_wind(tmp_path / 'test' / 'out2d_1.nc', v, u)  # components swapped: same magnitude
+
+    nodes, table, _ = compare_runs((str(tmp_path / 'ref'), None), (str(tmp_path / 'test'), None), 'wind_speed')
+    assert nodes['count'].sum() == NTIMES * NNODES
+    assert nodes['max_abs_diff'].max() < 1e-5
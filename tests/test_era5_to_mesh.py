@@ -0,0 +1,30 @@
+"""
+Grid extent check of Wind_Interp/era5_to_mesh.py.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+import xarray as xr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Wind_Interp'))
+from era5_to_mesh import interpolate_to_mesh
+
+def era5_grid(longitude):
+    lat = np.array([36.0, 35.5, 35.0])
+    u10 = np.broadcast_to(np.asarray(longitude, dtype='f4')[None, None, :], (2, len(lat), len(longitude)))
+    return xr.Dataset({'u10': (('valid_time', 'latitude', 'longitude'), u10.copy())},
+                      coords={'valid_time': [0, 3600], 'latitude': lat, 'longitude': longitude})
+
+def test_nodes_inside_the_grid_are_interpolated():
+    ds = era5_grid(np.array([-76.0, -75.5, -75.0]))
+    result = interpolate_to_mesh(ds, np.array([-75.8, -75.1]), np.array([35.2, 35.9]), variables=['u10'])
+    assert np.allclose(result['u10'].values, [[-75.8, -75.1]] * 2)
+
+def test_nodes_outside_the_grid_raise():
+    # 0..360 longitudes for a -180..180 mesh would otherwise give edge-clamped winds everywhere
+    ds = era5_grid(np.array([284.0, 284.5, 285.0]))
+    with pytest.raises(Exception, match='outside the grid'):
+        interpolate_to_mesh(ds, np.array([-75.8, -75.1]), np.array([35.2, 35.9]), variables=['u10'])
@@ -0,0 +1,35 @@
+"""
+Sidecar index and record selection of diagnostic_scripts/schism_stacks.py.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'diagnostic_scripts'))
+from schism_stacks import StackDataset
+from test_compare_runs import write_run, reference_elevation, NTIMES
+
+def test_unwritable_index_leaves_the_series_uncached(tmp_path):
+    write_run(tmp_path, reference_elevation())
+    index_path = str(tmp_path / 'missing' / 'index.json')
+    dataset = StackDataset('out2d', str(tmp_path), index_path=index_path)
+    assert len(dataset) == NTIMES
+    assert not os.path.exists(index_path)
+    assert not [name for name in os.listdir(tmp_path) if '.tmp' in name]
+
+def test_index_is_written_without_temporary_files(tmp_path):
+    write_run(tmp_path, reference_elevation())
+    StackDataset('out2d', str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ['.out2d_index.json', 'out2d_1.nc', 'out2d_2.nc']
+
+def test_out_of_range_record_raises(tmp_path):
+    write_run(tmp_path, reference_elevation())
+    dataset = StackDataset('out2d', str(tmp_path))
+    assert dataset.time_range(-1) == (NTIMES - 1, NTIMES)
+    assert dataset.time_range(np.int64(3)) == (3, 4)
+    for record in (NTIMES, -NTIMES - 1):
+        with pytest.raises(IndexError):
+            dataset.time_range(record)
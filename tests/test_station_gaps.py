@@ -0,0 +1,56 @@
+"""
+--max-gap handling of Wind_Interp/interp_obs_wind_to_era5_grid.py when blending several stations.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray as xr
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Wind_Interp'))
+from interp_obs_wind_to_era5_grid import interpolate_era5_with_obs_wind
+
+def era5_dataset(times):
+    """Hourly ERA5-like dataset on a 4 x 5 grid with constant, distinguishable u10/v10."""
+    lat = np.array([36.0, 35.75, 35.5, 35.25])
+    lon = np.array([-76.0, -75.75, -75.5, -75.25, -75.0])
+    shape = (len(times), len(lat), len(lon))
+    return xr.Dataset(
+        {'u10': (('valid_time', 'latitude', 'longitude'), np.full(shape, -3.0, dtype='f4')),
+         'v10': (('valid_time', 'latitude', 'longitude'), np.full(shape, 4.0, dtype='f4')),
+         'msl': (('valid_time', 'latitude', 'longitude'), np.full(shape, 101325.0, dtype='f4'))},
+        coords={'valid_time': (times - pd.Timestamp('1970-01-01')) // pd.Timedelta('1s'),
+                'latitude': lat, 'longitude': lon})
+
+def write_station(path, times):
+    with open(path, 'w') as f:
+        for t in times:
+            f.write(f"{t:%Y-%m-%d %H:%M:%S} 5.0 270.0\n")
+
+@pytest.mark.parametrize('lazy', [False, True])
+def test_shared_gap_uses_era5(tmp_path, lazy):
+    times = pd.date_range('2012-10-27', periods=13, freq='h')
+    # Both stations miss 03:00 .. 08:00
+    observed = times[(times < '2012-10-27 03:00') | (times > '2012-10-27 08:00')]
+    write_station(tmp_path / 'a.txt', observed)
+    write_station(tmp_path / 'b.txt', observed)
+    stations = pd.DataFrame({'name': ['a', 'b'], 'lon': [-75.8, -75.2], 'lat': [35.9, 35.3],
+                             'path': [str(tmp_path / 'a.txt'), str(tmp_path / 'b.txt')]})
+    ds = era5_dataset(times)
+    if lazy:
+        ds = ds.chunk({'valid_time': 4})
+
+    result = interpolate_era5_with_obs_wind(ds, None, lazy=lazy, stations=stations, max_gap='2h')
+    u10 = np.asarray(result['u10'].values)
+    v10 = np.asarray(result['v10'].values)
+    assert not np.isnan(u10).any() and not np.isnan(v10).any()
+
+    gap = pd.DatetimeIndex(pd.to_datetime(result['valid_time'].values, unit='s'))
+    gap = ((gap > pd.Timestamp('2012-10-27 02:00')) & (gap < pd.Timestamp('2012-10-27 09:00')))
+    assert gap.any() and not gap.all()
+    assert np.allclose(u10[gap], -3.0) and np.allclose(v10[gap], 4.0)
+    # West wind of 5 m/s from the stations outside the gap
+    assert np.allclose(u10[~gap], 5.0) and np.allclose(v10[~gap], 0.0, atol=1e-6)
@@ -0,0 +1,46 @@
+"""
+Fill-value detection of validate_elev2d.py and read_elev2d.py on partially written elev2D.th.nc files.
+"""
+
+import os
+import sys
+
+import numpy as np
+from netCDF4 import Dataset
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from write_elev2dnc import define_elev2d_th_nc
+from validate_elev2d import validate_elev2d_th_nc
+from read_elev2d import inspect_elev2d
+
+NNODES = 4
+NTIMES = 10
+DT = 900.0
+
+def write_file(path, written):
+    """elev2D.th.nc with NTIMES time records of which only the first `written` hold elevations."""
+    with Dataset(path, 'w') as nc:
+        time, time_series, time_step = define_elev2d_th_nc(nc, NNODES, chunk_time=2)
+        time_step[:] = DT
+        time[:] = np.arange(NTIMES) * DT
+        time_series[:written, :, 0, 0] = np.full((written, NNODES), 0.5, dtype='f4')
+
+def test_complete_file_is_valid(tmp_path):
+    path = str(tmp_path / 'elev2D.th.nc')
+    write_file(path, NTIMES)
+    assert validate_elev2d_th_nc(path) == []
+    report, nodes = inspect_elev2d(path)
+    assert report['fill'] == 0
+    assert report['max'] == 0.5
+
+def test_unwritten_records_are_reported(tmp_path):
+    path = str(tmp_path / 'elev2D.th.nc')
+    write_file(path, 5)
+    problems = validate_elev2d_th_nc(path)
+    assert any('fill values' in problem for problem in problems), problems
+
+    report, nodes = inspect_elev2d(path)
+    assert report['fill'] == 5 * NNODES
+    assert report['max'] == 0.5
+    assert report['mean'] == 0.5
+    assert list(nodes['valid']) == [5] * NNODES
@@ -0,0 +1,49 @@
+"""
+Fixed-format timestamp parsing of Wind_Interp/wind_qc.py.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Wind_Interp'))
+from wind_qc import parse_fixed_datetime, read_observation_text
+from interp_obs_wind_to_era5_grid import read_wind_data
+
+def test_matches_pandas_for_valid_dates():
+    index = pd.date_range('1999-12-31 23:00', '2001-03-02', freq='97min')
+    date = index.strftime('%Y-%m-%d').to_numpy()
+    time = index.strftime('%H:%M:%S').to_numpy()
+    assert np.array_equal(parse_fixed_datetime(date, time), index.to_numpy())
+
+def test_impossible_dates_are_nat():
+    date = np.array(['2012-02-30', '2011-02-29', '2012-04-31', '2012-13-01', '2012-00-10', '2012-01-00'])
+    time = np.array(['00:00:00'] * len(date))
+    assert np.isnat(parse_fixed_datetime(date, time)).all()
+
+def test_leap_days_and_month_ends():
+    date = np.array(['2012-02-29', '2000-02-29', '2012-04-30', '2012-12-31'])
+    time = np.array(['23:59:59', '00:00:00', '12:00:00', '06:30:00'])
+    expected = pd.to_datetime(pd.Series(date) + ' ' + pd.Series(time)).to_numpy()
+    assert np.array_equal(parse_fixed_datetime(date, time), expected)
+
+def test_other_layouts_fall_back_to_pandas():
+    parsed = parse_fixed_datetime(np.array(['2012/10/26', 'garbage']), np.array(['01:02:03', '00:00:00']))
+    assert parsed[0] == np.datetime64('2012-10-26T01:02:03')
+    assert np.isnat(parsed[1])
+
+def test_impossible_date_row_is_dropped(tmp_path):
+    path = tmp_path / 'obs.txt'
+    path.write_text("2012-02-28 12:00:00 5.0 90.0\n2012-02-30 12:00:00 6.0 90.0\n2012-03-01 12:00:00 7.0 90.0\n")
+    df = read_observation_text(path)
+    assert df.index.isna().sum() == 1
+    wind = read_wind_data(str(path))
+    assert list(wind['speed']) == [5.0, 7.0]
+    assert list(wind.index) == [pd.Timestamp('2012-02-28 12:00'), pd.Timestamp('2012-03-01 12:00')]
+
+def test_fractional_seconds_are_not_truncated():
+    parsed = parse_fixed_datetime(np.array(['2012-10-26', '2012-10-26']), np.array(['01:02:03.5', '01:02:03']))
+    assert parsed[0] == np.datetime64('2012-10-26T01:02:03.500')
+    assert parsed[1] == np.datetime64('2012-10-26T01:02:03')
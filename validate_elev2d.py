@@ -0,0 +1,139 @@
+"""
+Pre-flight validator for elev2D.th.nc, meant to gate job submission.
+Checks that nOpenBndNodes matches the open boundary nodes of hgrid.gr3, that the time axis is
+monotonic and uniform and matches time_step, that the forcing covers the run length (rnday,
+given directly or read from param.nml) and that time_series holds no NaN or fill values.
+Exits with status 1 and lists every problem found, e.g.:
+    python validate_elev2d.py elev2D.th.nc --param param.nml && sbatch run_schism.sh
+"""
+
+import os
+import re
+import sys
+import argparse
+import numpy as np
+from netCDF4 import Dataset, default_fillvals
+
+# Time records scanned per read for NaN/fill values
+DEFAULT_BLOCK_SIZE = 100000
+
+def check_time_axis(time, time_step=None, rtol=1e-6):
+    """
+    Time-step uniformity and gaps of a time axis (seconds).
+
+    :param time_step: The file's time_step value (None to use the median step)
+    :return: dict with dt_min, dt_max, dt_expected, uniform, monotonic, time_step_matches and gaps
+             (list of (index, t_before, t_after) where the step exceeds the expected step)
+    """
+    time = np.asarray(time, dtype='f8')
+    if len(time) < 2:
+        return {'dt_min': np.nan, 'dt_max': np.nan, 'dt_expected': time_step, 'uniform': True,
+                'monotonic': True, 'time_step_matches': True, 'gaps': []}
+    dt = np.diff(time)
+    expected = float(time_step) if time_step is not None else float(np.median(dt))
+    tolerance = rtol * max(abs(expected), 1.0)
+    gap_index = np.nonzero(dt > expected + tolerance)[0]
+    return {
+        'dt_min': float(dt.min()), 'dt_max': float(dt.max()), 'dt_expected': expected,
+        'uniform': bool(np.all(np.abs(dt - dt[0]) <= tolerance)),
+        'monotonic': bool(np.all(dt > 0)),
+        'time_step_matches': bool(np.all(np.abs(dt - expected) <= tolerance)),
+        'gaps': [(int(i), float(time[i]), float(time[i + 1])) for i in gap_index],
+    }
+
+def fill_value(var):
+    """
+    Fill value of a netCDF4 variable: its _FillValue, or the netCDF default fill for its type
+    (what unwritten records hold when the variable was created without one).
+    """
+    fill = getattr(var, '_FillValue', None)
+    if fill is None and var.dtype.kind in 'iuf':
+        fill = default_fillvals[var.dtype.str[1:]]
+    return fill
+
+def read_rnday(param_path):
+    """Run length in days from the rnday entry of param.nml."""
+    with open(param_path) as f:
+        for line in f:
+            match = re.match(r'\s*rnday\s*=\s*([-+0-9.eEdD]+)', line.split('!')[0])
+            if match:
+                return float(match.group(1).replace('d', 'e').replace('D', 'e'))
+    raise ValueError(f"No rnday in {param_path}")
+
+def validate_elev2d_th_nc(path, hgrid=None, rnday=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Validate an elev2D.th.nc file.
+
+    :param hgrid: Gr3Grid from hgrid_reader.read_hgrid (None skips the node count check)
+    :param rnday: Run length in days (None skips the coverage check)
+    :return: List of problems (empty if the file is valid)
+    """
+    problems = []
+    with Dataset(path, 'r') as nc:
+        for name in ('time', 'time_step', 'time_series'):
+            if name not in nc.variables:
+                problems.append(f"missing variable {name}")
+        if problems:
+            return problems
+        var = nc.variables['time_series']
+        var.set_auto_mask(False)
+        ntimes, nnodes, nlevels, ncomponents = var.shape
+
+        if hgrid is not None and nnodes != hgrid.nOpenBndNodes:
+            problems.append(f"nOpenBndNodes is {nnodes} but hgrid has {hgrid.nOpenBndNodes} open boundary nodes")
+        if nlevels != 1 or ncomponents != 1:
+            problems.append(f"expected nLevels=1 and nComponents=1 for elevation, got {nlevels} and {ncomponents}")
+        if ntimes < 2:
+            problems.append(f"only {ntimes} time records")
+
+        time = np.asarray(nc.variables['time'][:], dtype='f8')
+        time_step = float(np.ravel(nc.variables['time_step'][:])[0])
+        if ntimes >= 2:
+            axis = check_time_axis(time, time_step)
+            if not axis['monotonic']:
+                problems.append("time is not strictly increasing")
+            if not axis['uniform']:
+                problems.append(f"time step is not uniform ({axis['dt_min']:g} .. {axis['dt_max']:g} s, "
+                                f"{len(axis['gaps'])} gaps, first after record "
+                                f"{axis['gaps'][0][0] if axis['gaps'] else '?'})")
+            elif not axis['time_step_matches']:
+                problems.append(f"time_step is {time_step:g} s but time advances by {axis['dt_min']:g} s")
+        if len(time) and time[0] > 0:
+            problems.append(f"time starts at {time[0]:g} s; SCHISM needs a record at 0")
+        if rnday is not None and (not len(time) or time[-1] < rnday * 86400):
+            end = time[-1] / 86400 if len(time) else 0
+            problems.append(f"forcing ends at {end:g} days, before rnday = {rnday:g} days")
+
+        fill = fill_value(var)
+        nan_count = fill_count = 0
+        for t0 in range(0, ntimes, block_size):
+            block = var[t0:t0 + block_size]
+            nan_count += int(np.isnan(block).sum())
+            if fill is not None:
+                fill_count += int((block == fill).sum())
+        if nan_count:
+            problems.append(f"time_series has {nan_count} NaN values")
+        if fill_count:
+            problems.append(f"time_series has {fill_count} fill values ({fill})")
+    return problems
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate elev2D.th.nc before submitting a run")
+    parser.add_argument('file', nargs='?', default='elev2D.th.nc', help="elev2D.th.nc to validate")
+    parser.add_argument('--hgrid', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixed_files', 'hgrid.gr3'),
+                        help="hgrid.gr3 with the open boundary definition")
+    parser.add_argument('--rnday', type=float, help="run length in days")
+    parser.add_argument('--param', help="param.nml to read rnday from")
+    args = parser.parse_args()
+
+    from hgrid_reader import read_hgrid
+    hgrid = read_hgrid(args.hgrid) if args.hgrid else None
+    rnday = args.rnday if args.rnday is not None else (read_rnday(args.param) if args.param else None)
+
+    problems = validate_elev2d_th_nc(args.file, hgrid, rnday)
+    if problems:
+        print(f"{args.file}: {len(problems)} problem(s)")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)
+    print(f"{args.file}: OK")
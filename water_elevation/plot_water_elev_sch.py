@@ -1,15 +1,24 @@
 #water elevation plotting code
 import numpy as np
 import matplotlib.pyplot as plt
-from netCDF4 import Dataset, num2date
 import cartopy.crs as ccrs
 import cartopy.feature as cfeature
 from cartopy.mpl.ticker import LongitudeFormatter, LatitudeFormatter
 import os
+import sys
+import argparse
 
-# List of NetCDF files
-#file_list = ['schout_1.nc', 'schout_2.nc', 'schout_3.nc', 'schout_4.nc', 'schout_5.nc', 'schout_6.nc', 'schout_7.nc', 'schout_8.nc']
-file_list = ['out2d_1.nc', 'out2d_2.nc', 'out2d_3.nc', 'out2d_4.nc', 'out2d_5.nc', 'out2d_6.nc', 'out2d_7.nc', 'out2d_8.nc']
+# Shared rendering helpers live in diagnostic_scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'diagnostic_scripts'))
+from parallel_frames import add_parallel_args, run_frames
+from schism_frames import iter_frames, iter_all_frames
+from schism_stacks import open_stacks
+from frame_renderer import FrameRenderer
+from mesh_plot import get_triangulation, mask_dry
+
+# Output stacks (out2d_1.nc, out2d_2.nc, ...) found in the working directory
+#stack_prefix = 'schout'
+stack_prefix = 'out2d'
 
 # Create output directory if it doesn't exist
 output_dir = 'elevation_maps'
@@ -21,70 +30,99 @@ contour_levels = np.linspace(0, 1, 50)
 # Define colorbar ticks from 0 to 1 with 0.1 spacing
 colorbar_ticks = np.arange(0, 1.1, 0.1)
 
-# Loop over each file
-for file_index, file_path in enumerate(file_list):
-    print(f"Processing {file_path}...")
-
-    # Open the NetCDF file
-    dataset = Dataset(file_path, 'r')
-
-    # Extract time, longitude, latitude, and elevation data
-    time = dataset.variables['time'][:]
-    time_units = dataset.variables['time'].units
-    time_values = num2date(time, units=time_units)
-
-    lon = dataset.variables['SCHISM_hgrid_node_x'][:]
-    lat = dataset.variables['SCHISM_hgrid_node_y'][:]
-    elevation = dataset.variables['elevation'][:]
-
-    print(np.min(elevation))
-    print(np.max(elevation))
-    
-    # Loop over all time steps in the file
-    for time_index, time_value in enumerate(time_values):
-        # Print the current time value
-        print(f"Processing file {file_index + 1}, time step {time_index + 1}: {time_value.strftime('%Y-%m-%d %H:%M:%S')}")
-
-        # Extract elevation for the current time step
-        elevation_at_time = elevation[time_index, :]
-
-        # Set up the plot with a geographical projection
-        fig, ax = plt.subplots(figsize=(10, 8), subplot_kw={'projection': ccrs.PlateCarree()})
-
-        # Plot the water elevation using tricontourf, with a fixed colorbar range from 0 to 1
-        cs = ax.tricontourf(lon, lat, elevation_at_time, levels=contour_levels, cmap='jet',
-                            vmin=0, vmax=1, transform=ccrs.PlateCarree())
-
-        # Add coastlines, borders, and land features
-#        ax.add_feature(cfeature.COASTLINE)
-#        ax.add_feature(cfeature.BORDERS)
-#        ax.add_feature(cfeature.LAND, facecolor='lightgray')
-
-        # Add colorbar with fixed ticks from 0 to 1 with 0.1 spacing
-        cbar = plt.colorbar(cs, ax=ax, orientation='vertical', pad=0.02, aspect=30, ticks=colorbar_ticks)
-        cbar.set_label('Water Elevation (m)')
-
-        # Format the longitude and latitude labels without gridlines
-        ax.set_xticks(np.linspace(min(lon), max(lon), 5), crs=ccrs.PlateCarree())
-        ax.set_yticks(np.linspace(min(lat), max(lat), 5), crs=ccrs.PlateCarree())
-        ax.xaxis.set_major_formatter(LongitudeFormatter())
-        ax.yaxis.set_major_formatter(LatitudeFormatter())
-        ax.tick_params(labelsize=10)
-
-        # Set titles and labels
-        ax.set_title(f"Water Elevation (SCHISM Standalone) at {time_value.strftime('%Y-%m-%d %H:%M:%S')}", fontsize=14)
-
-        # Set extent based on your lat/lon ranges
-        ax.set_extent([min(lon), max(lon), min(lat), max(lat)])
-
-        # Save the plot to a file
-        output_file = os.path.join(output_dir, f'elevation_map_file{file_index+1}_time{time_index+1}.png')
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-
-        # Close the plot to free up memory
-        plt.close()
-
-    # Close the dataset
-    dataset.close()
-
-print("Elevation maps generated for all files and time steps.")
+# hgrid.gr3 used when output files carry no element connectivity (set from the command line)
+hgrid_path = None
+
+def frame_output_file(file_index, file_path, time_index, time_value):
+    return os.path.join(output_dir, f'elevation_map_file{file_index+1}_time{time_index+1}.png')
+
+def setup_figure(frame):
+    """Build the figure, projection, ticks, extent and title once."""
+    lon, lat = frame.x, frame.y
+
+    # Set up the plot with a geographical projection
+    fig, ax = plt.subplots(figsize=(10, 8), subplot_kw={'projection': ccrs.PlateCarree()})
+
+    # Add coastlines, borders, and land features
+#    ax.add_feature(cfeature.COASTLINE)
+#    ax.add_feature(cfeature.BORDERS)
+#    ax.add_feature(cfeature.LAND, facecolor='lightgray')
+
+    # Format the longitude and latitude labels without gridlines
+    ax.set_xticks(np.linspace(min(lon), max(lon), 5), crs=ccrs.PlateCarree())
+    ax.set_yticks(np.linspace(min(lat), max(lat), 5), crs=ccrs.PlateCarree())
+    ax.xaxis.set_major_formatter(LongitudeFormatter())
+    ax.yaxis.set_major_formatter(LatitudeFormatter())
+    ax.tick_params(labelsize=10)
+
+    # Title text is updated in place for every frame
+    title = ax.set_title('', fontsize=14)
+
+    # Set extent based on your lat/lon ranges
+    ax.set_extent([min(lon), max(lon), min(lat), max(lat)])
+
+    return {'fig': fig, 'ax': ax, 'title': title, 'cbar': None}
+
+def draw_frame(state, frame):
+    """Draw one frame's elevation into the reusable figure; returns the artists to remove."""
+    file_index, file_path, time_index, time_value = frame[:4]
+    ax = state['ax']
+
+    # Print the current time value
+    print(f"Processing file {file_index + 1}, time step {time_index + 1}: {time_value.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    # This time step of elevation (mesh coordinates are read once for all files)
+    elevation_at_time = frame.values
+
+    print(np.nanmin(elevation_at_time))
+    print(np.nanmax(elevation_at_time))
+
+    # Plot the water elevation using tricontourf on the model's own elements (no per-frame
+    # Delaunay), with a fixed colorbar range from 0 to 1
+    triangulation = mask_dry(get_triangulation(frame, hgrid_path), elevation_at_time)
+    cs = ax.tricontourf(triangulation, elevation_at_time, levels=contour_levels, cmap='jet',
+                        vmin=0, vmax=1, transform=ccrs.PlateCarree())
+
+    # Add colorbar with fixed ticks from 0 to 1 with 0.1 spacing (once; the levels are fixed)
+    if state['cbar'] is None:
+        state['cbar'] = plt.colorbar(cs, ax=ax, orientation='vertical', pad=0.02, aspect=30, ticks=colorbar_ticks)
+        state['cbar'].set_label('Water Elevation (m)')
+
+    # Set titles and labels
+    state['title'].set_text(f"Water Elevation (SCHISM Standalone) at {time_value.strftime('%Y-%m-%d %H:%M:%S')}")
+
+    return [cs]
+
+# Figure reused for every frame rendered by this process
+renderer = FrameRenderer(setup_figure, draw_frame, dpi=300)
+
+def render_job(file_index, file_path, steps):
+    # Open the file once and render all requested time steps from it
+    for frame in iter_frames(open_stacks(stack_prefix), 'elevation', file_index,
+                             [time_index for time_index, _ in steps]):
+        renderer.render(frame)
+        renderer.save(frame_output_file(*frame[:4]))
+
+if __name__ == "__main__":
+    parser = add_parallel_args(argparse.ArgumentParser(description="Plot water elevation maps"))
+    parser.add_argument('--movie', help="write all frames to this MP4/GIF instead of PNGs")
+    parser.add_argument('--fps', type=int, default=4, help="movie frames per second")
+    parser.add_argument('--hgrid', help="hgrid.gr3 for element connectivity if outputs lack SCHISM_hgrid_face_nodes")
+    args = parser.parse_args()
+    hgrid_path = args.hgrid
+
+    if args.movie:
+        # Frames must be in time order for a movie, so they are rendered in this process
+        renderer.start_movie(args.movie, fps=args.fps)
+        for frame in iter_all_frames(open_stacks(stack_prefix), 'elevation'):
+            renderer.render(frame)
+            renderer.grab()
+        renderer.finish()
+        print(f"Elevation movie written to {args.movie}.")
+    else:
+        # Frames (file, time step) are independent, so they can be split across tasks and processes
+        frames = open_stacks(stack_prefix).frames()
+        run_frames(render_job, frames, frame_output_file,
+                   nprocs=args.nprocs, task_id=args.task_id, ntasks=args.ntasks, overwrite=args.overwrite)
+
+        print("Elevation maps generated for all files and time steps.")
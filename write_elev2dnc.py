@@ -1,73 +1,334 @@
 """
 This script generates an elev2D.th.nc (type 4 Boundary Condition) file for SCHISM model from grid files and timeseries data.
-It reads hgrid.gr3 and vgrid.in files, processes open boundary information, and uses elev.th for timeseries data.
+It reads hgrid.gr3 (through the cached reader in hgrid_reader.py), processes open boundary information, and uses elev.th for timeseries data.
 Usage: Ensure grid files and elev.th are in the specified paths, then run the script to create elev2D.th.nc.
 """
 
 import os
+import sys
+import argparse
+from datetime import datetime
+from itertools import islice
 import numpy as np
 from netCDF4 import Dataset
-from pyschism.mesh.hgrid import Hgrid
-from pyschism.mesh.vgrid import Vgrid
+from hgrid_reader import read_hgrid
+from validate_elev2d import validate_elev2d_th_nc, read_rnday
 
-def create_elev2d_th_nc(filename, timeseries_data, hgrid, vgrid):
+# Number of time records per HDF5 chunk of time_series (and per bulk write block)
+DEFAULT_CHUNK_TIME = 1024
+
+def write_time_series_blocks(time_series, elev_data, nOpenBndNodes, start=0, block_size=DEFAULT_CHUNK_TIME):
+    """
+    Write elevations into the time_series variable in large time blocks.
+
+    A 1D elev_data (time,) is broadcast to every open boundary node without
+    copying; a 2D elev_data (time, nOpenBndNodes) is written as is.
+
+    :param time_series: netCDF4 variable with dims (time, nOpenBndNodes, nLevels, nComponents)
+    :param elev_data: numpy array of shape (time,) or (time, nOpenBndNodes)
+    :param nOpenBndNodes: Number of open boundary nodes
+    :param start: Index along the time dimension of the first record to write
+    :param block_size: Number of time records per write (None writes everything at once)
+    """
+    elev_data = np.asarray(elev_data, dtype='f4')
+    ntimes = elev_data.shape[0]
+    if block_size is None:
+        block_size = max(ntimes, 1)
+
+    for t0 in range(0, ntimes, block_size):
+        t1 = min(t0 + block_size, ntimes)
+        block = elev_data[t0:t1]
+        if block.ndim == 1:
+            block = np.broadcast_to(block[:, None], (t1 - t0, nOpenBndNodes))
+        time_series[start + t0:start + t1, :, 0, 0] = block
+
+def define_elev2d_th_nc(nc, nOpenBndNodes, chunk_time=DEFAULT_CHUNK_TIME, zlib=False, complevel=4, shuffle=True):
+    """
+    Define the elev2D.th.nc dimensions, variables and global attributes.
+
+    :param nc: netCDF4 Dataset opened for writing
+    :param nOpenBndNodes: Number of open boundary nodes
+    :return: (time, time_series, time_step) variables
+    """
+    # Define dimensions
+    nc.createDimension('nComponents', 1)
+    nc.createDimension('nLevels', 1)
+    nc.createDimension('time', None)  # unlimited dimension
+    nc.createDimension('nOpenBndNodes', nOpenBndNodes)
+    nc.createDimension('one', 1)
+    
+    # Create variables
+    nComponents = nc.createVariable('nComponents', 'f8', ('nComponents',))
+    nComponents.point_spacing = "even"
+    nComponents.axis = "X"
+    
+    nLevels = nc.createVariable('nLevels', 'f8', ('nLevels',))
+    nLevels.point_spacing = "even"
+    nLevels.axis = "Y"
+    
+    time = nc.createVariable('time', 'f8', ('time',))
+    
+    time_series = nc.createVariable('time_series', 'f4', ('time', 'nOpenBndNodes', 'nLevels', 'nComponents'),
+                                    chunksizes=(chunk_time, nOpenBndNodes, 1, 1),
+                                    zlib=zlib, complevel=complevel, shuffle=shuffle)
+    
+    time_step = nc.createVariable('time_step', 'f4', ('one',))
+    
+    # Add global attributes
+    nc.Conventions = "CF-1.6"
+    nc.history = "Created by elev2D.th.nc generator script"
+    return time, time_series, time_step
+
+def check_uniform_time_step(times, step=None, previous=None, rtol=1e-6):
+    """
+    Return the (uniform) time step of times; SCHISM requires a uniform elev2D.th.nc time axis.
+
+    :param times: 1D array of times in seconds
+    :param step: Step established by earlier blocks (None to take it from times)
+    :param previous: Last time of the previous block, so the step is also checked across blocks
+    :raises ValueError: If the step is not uniform or not positive
+    """
+    times = np.asarray(times, dtype='f8')
+    if previous is not None:
+        times = np.concatenate([[previous], times])
+    if len(times) < 2:
+        return step
+    dt = np.diff(times)
+    if step is None:
+        step = float(dt[0])
+    bad = np.nonzero(np.abs(dt - step) > rtol * max(abs(step), 1.0))[0]
+    if step <= 0 or len(bad):
+        i = bad[0] if len(bad) else 0
+        raise ValueError(f"Time step is not uniform: {times[i]:g} -> {times[i + 1]:g} s (expected {step:g} s)")
+    return step
+
+def create_elev2d_th_nc(filename, timeseries_data, hgrid, vgrid=None, chunk_time=DEFAULT_CHUNK_TIME,
+                        block_size=DEFAULT_CHUNK_TIME, zlib=False, complevel=4, shuffle=True,
+                        node_elev=None):
     """
     Create elev2D.th.nc file from timeseries water elevation data.
     
     :param filename: Name of the output NetCDF file
     :param timeseries_data: 2D numpy array of shape (time, 2) with time and elevation data
-    :param hgrid: Hgrid object from pyschism
-    :param vgrid: Vgrid object from pyschism
+    :param hgrid: Gr3Grid from hgrid_reader.read_hgrid
+    :param vgrid: Unused; kept for compatibility (elev2D.th.nc has a single level)
+    :param chunk_time: Number of time records per chunk of time_series
+    :param block_size: Number of time records written per call (None writes all at once)
+    :param zlib: Compress time_series with zlib
+    :param complevel: zlib compression level (1-9)
+    :param shuffle: Apply the HDF5 shuffle filter when compressing
+    :param node_elev: Optional (time, nOpenBndNodes) array of per-node elevations that replaces
+                      the single elev.th value copied to every node
     """
-    open_boundaries = hgrid.boundaries.open
-    nOpenBndNodes = sum(len(boundary) for boundary in open_boundaries['indexes'])
+    nOpenBndNodes = hgrid.nOpenBndNodes
     
     time_data = timeseries_data[:, 0]
-    elev_data = timeseries_data[:, 1]
+    elev_data = timeseries_data[:, 1] if node_elev is None else node_elev
+    step = check_uniform_time_step(time_data)
     
     with Dataset(filename, 'w', format='NETCDF4') as nc:
-        # Define dimensions
-        nc.createDimension('nComponents', 1)
-        nc.createDimension('nLevels', 1)
-        nc.createDimension('time', None)  # unlimited dimension
-        nc.createDimension('nOpenBndNodes', nOpenBndNodes)
-        nc.createDimension('one', 1)
-        
-        # Create variables
-        nComponents = nc.createVariable('nComponents', 'f8', ('nComponents',))
-        nComponents.point_spacing = "even"
-        nComponents.axis = "X"
-        
-        nLevels = nc.createVariable('nLevels', 'f8', ('nLevels',))
-        nLevels.point_spacing = "even"
-        nLevels.axis = "Y"
-        
-        time = nc.createVariable('time', 'f8', ('time',))
+        time, time_series, time_step = define_elev2d_th_nc(nc, nOpenBndNodes, chunk_time=chunk_time,
+                                                           zlib=zlib, complevel=complevel, shuffle=shuffle)
         time[:] = time_data
+        write_time_series_blocks(time_series, elev_data, nOpenBndNodes, block_size=block_size)
+        if step is not None:
+            time_step[:] = step
+
+def elev_th_offset_after(path, after):
+    """
+    Byte offset of the first elev.th line whose time is greater than after.
+    elev.th times increase, so the line is found by bisection on byte offsets and only
+    O(log(file size)) lines are read, however long the record already is.
+    """
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        lo, hi = 0, f.tell()
+
+        def line_start(offset):
+            # Start of the first line at or after offset
+            if offset == 0:
+                return 0
+            f.seek(offset - 1)
+            f.readline()
+            return f.tell()
+
+        def is_after(offset):
+            f.seek(line_start(offset))
+            fields = f.readline().split()
+            return not fields or float(fields[0]) > after
+
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if is_after(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return line_start(lo)
+
+def iter_elev_th_blocks(path, block_size=DEFAULT_CHUNK_TIME, offset=0):
+    """
+    Read elev.th in blocks of at most block_size lines.
+
+    :param path: Path to the two-column (time, elevation) elev.th file
+    :param offset: Byte offset to start reading from (see elev_th_offset_after)
+    :return: generator of (n, 2) float arrays
+    """
+    with open(path, 'r') as f:
+        f.seek(offset)
+        while True:
+            lines = list(islice(f, block_size))
+            if not lines:
+                break
+            block = np.loadtxt(lines, ndmin=2)
+            if block.size:
+                yield block
+
+def stream_elev2d_th_nc(filename, elev_th_path, hgrid, block_size=DEFAULT_CHUNK_TIME, chunk_time=DEFAULT_CHUNK_TIME,
+                        zlib=False, complevel=4, shuffle=True, node_elev_func=None):
+    """
+    Create elev2D.th.nc by appending elev.th to the unlimited time dimension one block at a time,
+    so memory use does not depend on the length of the record.
+
+    :param filename: Name of the output NetCDF file
+    :param elev_th_path: Path to elev.th
+    :param hgrid: Gr3Grid from hgrid_reader.read_hgrid
+    :param block_size: Number of elev.th lines read and written per block
+    :param node_elev_func: Optional callable mapping a block of times to a (time, nOpenBndNodes)
+                           array of per-node elevations (e.g. from boundary_forcing)
+    :return: Number of time records written
+    """
+    nOpenBndNodes = hgrid.nOpenBndNodes
+    
+    with Dataset(filename, 'w', format='NETCDF4') as nc:
+        time, time_series, time_step = define_elev2d_th_nc(nc, nOpenBndNodes, chunk_time=chunk_time,
+                                                           zlib=zlib, complevel=complevel, shuffle=shuffle)
+        ntimes = 0
+        step = None
+        previous = None
+        for block in iter_elev_th_blocks(elev_th_path, block_size):
+            n = block.shape[0]
+            step = check_uniform_time_step(block[:, 0], step, previous)
+            previous = block[-1, 0]
+            time[ntimes:ntimes + n] = block[:, 0]
+            elev_data = block[:, 1] if node_elev_func is None else node_elev_func(block[:, 0])
+            write_time_series_blocks(time_series, elev_data, nOpenBndNodes, start=ntimes, block_size=None)
+            ntimes += n
         
-        time_series = nc.createVariable('time_series', 'f4', ('time', 'nOpenBndNodes', 'nLevels', 'nComponents'))
-        for t in range(len(time_data)):
-            time_series[t, :, 0, 0] = elev_data[t]
-        
-        time_step = nc.createVariable('time_step', 'f4', ('one',))
-        time_step[:] = time_data[1] - time_data[0]  # uniform time step
-        
-        # Add global attributes
-        nc.Conventions = "CF-1.6"
-        nc.history = "Created by elev2D.th.nc generator script"
+        if step is not None:
+            time_step[:] = step
+    return ntimes
+
+def append_elev2d_th_nc(filename, elev_th_path, hgrid, block_size=DEFAULT_CHUNK_TIME, node_elev_func=None,
+                        **create_kwargs):
+    """
+    Extend an existing elev2D.th.nc in place with the elev.th lines after its last time
+    (creating it with stream_elev2d_th_nc if it does not exist yet), so each real-time cycle
+    only reads and writes the new records. time_step and history are updated.
+
+    :param create_kwargs: chunk_time/zlib/complevel/shuffle used if the file is created
+    :return: Number of time records appended
+    """
+    if not os.path.exists(filename):
+        return stream_elev2d_th_nc(filename, elev_th_path, hgrid, block_size=block_size,
+                                   node_elev_func=node_elev_func, **create_kwargs)
+
+    nOpenBndNodes = hgrid.nOpenBndNodes
+    with Dataset(filename, 'a') as nc:
+        if len(nc.dimensions['nOpenBndNodes']) != nOpenBndNodes:
+            raise ValueError(f"{filename} has {len(nc.dimensions['nOpenBndNodes'])} open boundary nodes "
+                             f"but hgrid has {nOpenBndNodes}")
+        time, time_series, time_step = (nc.variables[name] for name in ('time', 'time_series', 'time_step'))
+        ntimes = start = len(time)
+        previous = float(time[-1]) if ntimes else None
+        step = float(np.ravel(time_step[:])[0]) if ntimes > 1 else None
+
+        offset = elev_th_offset_after(elev_th_path, previous) if previous is not None else 0
+        for block in iter_elev_th_blocks(elev_th_path, block_size, offset):
+            n = block.shape[0]
+            step = check_uniform_time_step(block[:, 0], step, previous)
+            previous = block[-1, 0]
+            time[ntimes:ntimes + n] = block[:, 0]
+            elev_data = block[:, 1] if node_elev_func is None else node_elev_func(block[:, 0])
+            write_time_series_blocks(time_series, elev_data, nOpenBndNodes, start=ntimes, block_size=None)
+            ntimes += n
+
+        if ntimes > start:
+            if step is not None:
+                time_step[:] = step
+            nc.history = (f"{nc.getncattr('history')}\n" if 'history' in nc.ncattrs() else "") + \
+                (f"{datetime.now():%Y-%m-%d %H:%M:%S}: appended {ntimes - start} records "
+                 f"({time[start]:g} .. {previous:g} s) by write_elev2dnc.py")
+    return ntimes - start
 
 # Example usage
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create elev2D.th.nc from elev.th")
+    parser.add_argument('--chunk-time', type=int, default=DEFAULT_CHUNK_TIME,
+                        help="time records per chunk (and per write) of time_series")
+    parser.add_argument('--zlib', action='store_true', help="compress time_series with zlib")
+    parser.add_argument('--complevel', type=int, default=4, help="zlib compression level")
+    parser.add_argument('--no-shuffle', action='store_true', help="disable the shuffle filter")
+    parser.add_argument('--stream', action='store_true',
+                        help="read elev.th in blocks and append them to elev2D.th.nc (flat memory use)")
+    parser.add_argument('--block-size', type=int, default=100000,
+                        help="elev.th lines per block in --stream and --append mode")
+    parser.add_argument('--append', action='store_true',
+                        help="extend an existing elev2D.th.nc with the elev.th lines after its last time")
+    parser.add_argument('--source', help="gridded, multi-station or tidal-constituent NetCDF file "
+                                         "interpolated to each open boundary node (elev.th gives the time axis)")
+    parser.add_argument('--source-var', default='elev', help="elevation variable in --source")
+    parser.add_argument('--start-date', help="run start (YYYY-MM-DDTHH:MM:SS) for source times with units")
+    parser.add_argument('--rnday', type=float, help="run length in days; the output must cover it")
+    parser.add_argument('--param', help="param.nml to read rnday from")
+    parser.add_argument('--weights-cache', help="directory for cached node-to-source weights "
+                                                "(default: fixed_files/weights next to this script)")
+    args = parser.parse_args()
+
     script_dir = os.path.dirname(os.path.abspath(__file__))
     fixed_files_dir = os.path.join(script_dir, 'fixed_files')
+    weights_cache = args.weights_cache or os.path.join(fixed_files_dir, 'weights')
     
     hgrid_path = os.path.join(fixed_files_dir, 'hgrid.gr3')
-    vgrid_path = os.path.join(fixed_files_dir, 'vgrid.in')
     
-    hgrid = Hgrid.open(hgrid_path, crs='epsg:4326')
-    vgrid = Vgrid.open(vgrid_path)
+    hgrid = read_hgrid(hgrid_path)
     
-    timeseries_data = np.loadtxt('elev.th')
+    node_elev_func = None
+    if args.source:
+        from boundary_forcing import open_boundary_indexes, interpolate_boundary_elev
+
+        bnd_coords = hgrid.coords[open_boundary_indexes(hgrid)]
+        start_date = datetime.fromisoformat(args.start_date) if args.start_date else None
+
+        def node_elev_func(times):
+            return interpolate_boundary_elev(bnd_coords[:, 0], bnd_coords[:, 1], args.source, times,
+                                             var=args.source_var, start_date=start_date,
+                                             cache_dir=weights_cache)
+
+    if args.append:
+        ntimes = append_elev2d_th_nc('elev2D.th.nc', 'elev.th', hgrid, block_size=args.block_size,
+                                     node_elev_func=node_elev_func, chunk_time=args.chunk_time, zlib=args.zlib,
+                                     complevel=args.complevel, shuffle=not args.no_shuffle)
+        print(f"elev2D.th.nc extended by {ntimes} time records.")
+    elif args.stream:
+        ntimes = stream_elev2d_th_nc('elev2D.th.nc', 'elev.th', hgrid, block_size=args.block_size,
+                                     chunk_time=args.chunk_time, zlib=args.zlib, complevel=args.complevel,
+                                     shuffle=not args.no_shuffle, node_elev_func=node_elev_func)
+        print(f"elev2D.th.nc file created successfully ({ntimes} time records streamed).")
+    else:
+        timeseries_data = np.loadtxt('elev.th')
+        node_elev = node_elev_func(timeseries_data[:, 0]) if node_elev_func else None
     
-    create_elev2d_th_nc('elev2D.th.nc', timeseries_data, hgrid, vgrid)
-    print("elev2D.th.nc file created successfully.")
+        create_elev2d_th_nc('elev2D.th.nc', timeseries_data, hgrid,
+                            chunk_time=args.chunk_time, block_size=args.chunk_time,
+                            zlib=args.zlib, complevel=args.complevel, shuffle=not args.no_shuffle,
+                            node_elev=node_elev)
+        print("elev2D.th.nc file created successfully.")
+
+    # Pre-flight check of the written file (exits non-zero so it can gate job submission)
+    rnday = args.rnday if args.rnday is not None else (read_rnday(args.param) if args.param else None)
+    problems = validate_elev2d_th_nc('elev2D.th.nc', hgrid, rnday)
+    if problems:
+        print("elev2D.th.nc failed validation:")
+        for problem in problems:
+            print(f"  - {problem}")
+        sys.exit(1)